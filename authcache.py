@@ -0,0 +1,164 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from objects import UserBObj
+
+
+def token_key(jwt: str) -> bytes:
+    """ The cache key of a token, the token itself is never kept in memory """
+    return hashlib.sha256(jwt.encode('utf-8')).digest()
+
+
+def token_expiry(jwt: str) -> Optional[float]:
+    """ Returns the `exp` claim of the token as unix timestamp, None when it has none or can't be read.
+    The signature isn't checked, the Api did that when it accepted the token.
+    """
+
+    try:
+        payload = jwt.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class AuthCache:
+    def __init__(self, ttl: float = 300.0, max_size: int = 10_000, metrics=None):
+        """ Keeps the users of validated tokens, so `auth_me` doesn't need a round trip per call.
+
+        An entry lives until the `exp` claim of the token or `ttl` seconds, whatever comes
+        first. Tokens without a readable `exp` only live for the `ttl`.
+
+        Parameters
+        ----------
+        ttl : [:class:`float`]
+            The longest time in seconds a user is served from memory.
+
+        max_size : [:class:`int`]
+            The amount of tokens, the least recently used one is dropped first.
+
+        metrics : Optional[:class:`metrics.ClientMetrics`]
+            Counts the hits and misses as the `auth` cache.
+
+        Examples
+        --------
+        >>> api = AniApi(token, auth_cache=AuthCache(ttl=60))
+        >>> api.auth_me(jwt)  # the Api is asked
+        >>> api.auth_me(jwt)  # from memory
+        >>> api.auth_cache.invalidate(jwt)  # e.x. on logout
+        """
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.metrics = metrics
+
+        self.hits = 0
+        self.misses = 0
+
+        # The key is the hash of the token, the value the time the entry expires and the user.
+        self._entries: 'OrderedDict[bytes, Tuple[float, UserBObj]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if self.metrics is not None:
+            self.metrics.record_cache('auth', hit)
+
+    def get(self, jwt: str) -> Optional[UserBObj]:
+        """ Returns the user of the token, None when it isn't cached or expired """
+
+        key = token_key(jwt)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            self._count(entry is not None)
+
+        return entry[1] if entry is not None else None
+
+    def put(self, jwt: str, user: UserBObj) -> None:
+        """ Keeps the user of a token that the Api accepted, expired tokens aren't kept """
+
+        now = time.time()
+        expires = now + self.ttl
+        exp = token_expiry(jwt)
+
+        if exp is not None:
+            expires = min(expires, exp)
+
+        if expires <= now:
+            return
+
+        key = token_key(jwt)
+
+        with self._lock:
+            self._entries[key] = (expires, user)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, jwt: str) -> bool:
+        """ Drops a token, e.x. after a logout. Returns if it was cached """
+
+        with self._lock:
+            return self._entries.pop(token_key(jwt), None) is not None
+
+    def invalidate_user(self, user_id: int) -> int:
+        """ Drops all tokens of a user, e.x. after a password change. Returns the amount of dropped tokens """
+
+        with self._lock:
+            keys = [key for key, (_, user) in self._entries.items() if user.id == user_id]
+
+            for key in keys:
+                del self._entries[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self):
+        return f'<size={len(self._entries)} hits={self.hits} misses={self.misses}>'
@@ -0,0 +1,211 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+from dataclasses import dataclass, replace
+from http.client import HTTPException
+from typing import Callable, Iterable, List, Optional
+
+from deadline import Deadline
+from objects import Context, DataObj
+from ratelimit import RateLimiter
+from utils import CircuitOpenError, DeadlineExceeded, InvalidParamsException
+
+# The exceptions that are worth another try.
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, HTTPException, OSError)
+
+# The status codes that are worth another try.
+TRANSIENT_STATUS = frozenset((408, 429, 500, 502, 503, 504))
+
+# The exceptions that are raised before the request is sent, a create can be sent again without a lookup.
+UNSENT_ERRORS = (ConnectionRefusedError, socket.gaierror, CircuitOpenError)
+
+
+@dataclass(frozen=True)
+class StoryResult:
+    """ The outcome of one record of a bulk upsert """
+
+    # The position of the record inside the given records.
+    index: int
+
+    # The record that was sent.
+    record: dict
+
+    # The last response of the Api, None when no response was received.
+    ctx: Optional[Context] = None
+
+    # The last error that was raised, None when a response was received.
+    error: Optional[BaseException] = None
+
+    # How many tries it took.
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.ctx is not None and self.ctx.status_code == 200
+
+    def __repr__(self):
+        return f'<index={self.index} ok={self.ok} attempts={self.attempts} ' \
+               f'status_code={self.ctx.status_code if self.ctx else None} error={self.error!r}>'
+
+
+def _write(client, record: dict) -> Context:
+    """ Creates the UserStory, or updates it when the record contains an `id` """
+
+    if 'id' in record:
+        return client.update_user_story(record['id'], record['user_id'], record['anime_id'], record['status'],
+                                        record['current_episode'], record['current_episode_ticks'])
+
+    extra = {k: record[k] for k in ('current_episode', 'current_episode_ticks') if k in record}
+    return client.create_user_story(record['user_id'], record['anime_id'], record['status'], **extra)
+
+
+def _find(client, record: dict) -> Optional[Context]:
+    """ Looks up the UserStory of a create whose outcome is unknown, None when it wasn't created
+
+    Raises
+    ------
+    ConnectionError
+        When the lookup answered an error, it's unknown if the UserStory exists.
+    """
+
+    ctx = client.get_user_story(user_id=record['user_id'], anime_id=record['anime_id'])
+
+    if ctx.status_code == 404:
+        return None
+
+    # The UserStory pages aren't built into objects, the page stays a dict.
+    documents = ctx.data.documents if isinstance(ctx.data, DataObj) else (ctx.data or {}).get('documents')
+
+    if ctx.status_code != 200 or documents is None:
+        raise ConnectionError(f'The UserStory lookup answered {ctx.status_code}')
+
+    return replace(ctx, data=documents[0]) if documents else None
+
+
+def upsert_user_stories(make_client: Callable, records: Iterable[dict], workers: int = 4,
+                        limiter: Optional[RateLimiter] = None, retries: int = 2,
+                        backoff: float = 0.5, deadline: Deadline = None) -> List[StoryResult]:
+    """ Creates or updates many UserStory's concurrently.
+
+    Every record is written on its own, a failed record never rolls back
+    or aborts the other ones. Check `StoryResult.ok` for each record.
+
+    Parameters
+    ----------
+    make_client : Callable[[], :class:`wrapper.AniApi`]
+        Creates a client, every worker thread gets its own connection,
+        e.x. `lambda: AniApi(token)`.
+
+    records : Iterable[:class:`dict`]
+        The UserStory's with `user_id`, `anime_id`, `status` and optional `current_episode`
+        and `current_episode_ticks`. A record with an `id` updates the existing UserStory,
+        for updates `current_episode` and `current_episode_ticks` are required.
+
+    workers : [:class:`int`]
+        The amount of concurrent writes.
+
+    limiter : Optional[:class:`RateLimiter`]
+        Shared between all workers, defaults to the Api's limit of 90 requests per minute.
+
+    retries : [:class:`int`]
+        How often a record is tried again after a connection error, a 429 or a 5xx.
+        A create isn't idempotent, after an error that it may have outlived, e.x. a read
+        timeout or a 5xx, the UserStory is looked up by `user_id` and `anime_id` first
+        and only created again when it doesn't exist.
+
+    backoff : [:class:`float`]
+        The first wait in seconds between tries, it doubles with every try.
+
+    deadline : Optional[:class:`Deadline`]
+        The budget for the whole import, records that weren't written in time
+        get a :class:`DeadlineExceeded` error.
+
+    Returns
+    -------
+    List[:class:`StoryResult`]
+        One result per record, in the same order as the records.
+    """
+
+    records = list(records)
+    limiter = limiter or RateLimiter()
+    local = threading.local()
+
+    def run(index: int, record: dict) -> StoryResult:
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+
+        ctx, error = None, None
+        creating = 'id' not in record
+        # The last create may have reached the Api, it's looked up before it's sent again.
+        unknown = False
+
+        for attempt in range(1, retries + 2):
+            timeout = None if deadline is None else deadline.remaining()
+
+            if (deadline is not None and deadline.expired) or not limiter.acquire(timeout):
+                return StoryResult(index, record, ctx=ctx, attempts=attempt - 1,
+                                   error=error or DeadlineExceeded('The deadline was exceeded'))
+
+            try:
+                with deadline or nullcontext():
+                    if unknown:
+                        found = _find(local.client, record)
+
+                        if found is not None:
+                            ctx, error = found, None
+                            break
+
+                        unknown = False
+
+                    ctx, error = _write(local.client, record), None
+            except TRANSIENT_ERRORS as e:
+                ctx, error = None, e
+                unknown = unknown or (creating and not isinstance(e, UNSENT_ERRORS))
+                local.client.close()
+            except (Exception, InvalidParamsException) as e:
+                # A broken record, e.x. missing keys, another try won't help.
+                return StoryResult(index, record, error=e, attempts=attempt)
+            else:
+                limiter.update(ctx.ratelimit)
+
+                if ctx.status_code not in TRANSIENT_STATUS:
+                    break
+
+                # A 429 is rejected before the Api writes anything.
+                unknown = creating and ctx.status_code != 429
+
+            if attempt <= retries:
+                delay = backoff * 2 ** (attempt - 1)
+                time.sleep(delay if deadline is None else deadline.clamp(delay))
+
+        return StoryResult(index, record, ctx=ctx, error=error, attempts=attempt)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Every submit needs its own context copy, so the writes become children of the caller's span.
+        futures = [pool.submit(copy_context().run, run, index, record) for index, record in enumerate(records)]
+        return [future.result() for future in futures]
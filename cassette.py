@@ -0,0 +1,192 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import base64
+import json
+import threading
+import time
+from collections import deque
+from http.client import HTTPMessage
+from typing import Deque, Dict, List, Optional, Tuple
+
+from utils import CassetteMissError
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+def _text(data: Optional[bytes]) -> Tuple[Optional[str], bool]:
+    """ Returns the bytes as text for the cassette, base64 when they aren't utf-8 """
+
+    if data is None:
+        return None, False
+
+    try:
+        return data.decode('utf-8'), False
+    except UnicodeDecodeError:
+        return base64.b64encode(data).decode('ascii'), True
+
+
+def _bytes(text: Optional[str], encoded: bool) -> Optional[bytes]:
+    if text is None:
+        return None
+
+    return base64.b64decode(text) if encoded else text.encode('utf-8')
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = REPLAY, speed: float = 1.0, repeat: bool = True):
+        """ Records request/response pairs to a file, or serves them from it instead of the network.
+
+        Parameters
+        ----------
+        path : [:class:`str`]
+            The cassette file, one JSON line per request.
+
+        mode : [:class:`str`]
+            `record` sends the requests and writes them down, a new cassette replaces the old file.
+            `replay` answers from the file without any network.
+
+        speed : [:class:`float`]
+            How fast the replay runs, 1 keeps the recorded timing, 10 is ten times faster
+            and 0 answers without any delay.
+
+        repeat : [:class:`bool`]
+            When the recorded answers of a request are used up, start over with the first one.
+            Otherwise :class:`CassetteMissError` is raised.
+
+        Examples
+        --------
+        >>> with Cassette('anime.jsonl', mode='record') as cassette:
+        ...     AniApi(cassette=cassette).get_anime(1)
+        >>> api = AniApi(cassette=Cassette('anime.jsonl', speed=0))
+        """
+
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'Unknown cassette mode {mode!r}, use record or replay')
+
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.repeat = repeat
+
+        # The amount of recorded and replayed requests.
+        self.recorded = 0
+        self.played = 0
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._tracks: Dict[Tuple, List[dict]] = {}
+        self._queues: Dict[Tuple, Deque[dict]] = {}
+
+        if mode == RECORD:
+            self._file = open(path, 'w', encoding='utf-8')
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @staticmethod
+    def _key(method: str, url: str, body: Optional[bytes]) -> Tuple:
+        return method, url, body
+
+    def _load(self) -> None:
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                entry = json.loads(line)
+                body = _bytes(entry['request_body'], entry.get('request_base64', False))
+                self._tracks.setdefault(self._key(entry['method'], entry['url'], body), []).append(entry)
+
+        self._queues = {key: deque(entries) for key, entries in self._tracks.items()}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._tracks.values()) if self.replaying else self.recorded
+
+    def record(self, method: str, url: str, body: Optional[bytes], status: int, headers: HTTPMessage,
+               response: bytes, duration: float) -> None:
+        """ Writes one request with its response and the time it took """
+
+        request_body, request_base64 = _text(body)
+        response_body, response_base64 = _text(response)
+
+        line = json.dumps({'method': method, 'url': url,
+                           'request_body': request_body, 'request_base64': request_base64,
+                           'status': status, 'headers': list(headers.items()),
+                           'body': response_body, 'base64': response_base64,
+                           'duration': round(duration, 6)}, ensure_ascii=False)
+
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.recorded += 1
+
+    def play(self, method: str, url: str, body: Optional[bytes]) -> Tuple[int, HTTPMessage, bytes, float]:
+        """ Returns the next recorded status, headers and body for the request, after the scaled delay.
+        The last value is the delay that was waited.
+
+        Raises
+        ------
+        CassetteMissError
+            When the request wasn't recorded, or its answers are used up without `repeat`.
+        """
+
+        key = self._key(method, url, body)
+
+        with self._lock:
+            queue = self._queues.get(key)
+
+            if not queue and self.repeat and key in self._tracks:
+                queue = self._queues[key] = deque(self._tracks[key])
+
+            if not queue:
+                raise CassetteMissError(f'No recorded response for {method} {url}')
+
+            entry = queue.popleft()
+            self.played += 1
+
+        delay = entry['duration'] / self.speed if self.speed else 0.0
+
+        if delay:
+            time.sleep(delay)
+
+        headers = HTTPMessage()
+
+        for name, value in entry['headers']:
+            headers[name] = value
+
+        return entry['status'], headers, _bytes(entry['body'], entry.get('base64', False)), delay
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'Cassette':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
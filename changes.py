@@ -0,0 +1,287 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from objects import AnimeObj, DataObj
+from projection import project
+from utils import AnimeStatus
+
+# Only the fields that the poller compares, and the titles for the events.
+TrackedAnime = project(AnimeObj, 'id', 'titles', 'status', 'episodes_count', 'score', name='TrackedAnime')
+
+
+@dataclass(frozen=True)
+class AnimeChange:
+    """ The base of all change events """
+
+    # The anime id.
+    anime_id: int
+
+    # The anime after the change, only the fields of `TrackedAnime`.
+    anime: TrackedAnime
+
+
+@dataclass(frozen=True)
+class NewEpisode(AnimeChange):
+    """ The episode count of a releasing anime went up """
+
+    previous: int = 0
+    current: int = 0
+
+    def __repr__(self):
+        return f'<anime_id={self.anime_id} episodes={self.previous}->{self.current}>'
+
+
+@dataclass(frozen=True)
+class StatusChanged(AnimeChange):
+    """ An anime started releasing or left the releasing status, `previous` is None for an anime seen the first time """
+
+    previous: Optional[AnimeStatus] = None
+    current: Optional[AnimeStatus] = None
+
+    def __repr__(self):
+        previous = self.previous.name if self.previous is not None else None
+        current = self.current.name if self.current is not None else None
+        return f'<anime_id={self.anime_id} status={previous}->{current}>'
+
+
+@dataclass(frozen=True)
+class ScoreChanged(AnimeChange):
+    """ The score of a releasing anime went up or down """
+
+    previous: float = 0.0
+    current: float = 0.0
+
+    def __repr__(self):
+        return f'<anime_id={self.anime_id} score={self.previous}->{self.current}>'
+
+
+def _fingerprint(anime) -> Tuple[int, int, float]:
+    return anime.status, anime.episodes_count, anime.score
+
+
+class ReleasingPoller:
+    def __init__(self, make_client: Callable, interval: float = 300.0, per_page: int = 100):
+        """ Tracks the releasing animes and sends change events to the subscribers.
+
+        A poll lists the releasing animes with a projection, so only the compared fields are built.
+        Every anime is kept as a small fingerprint, and the diff of a page whose fingerprints are
+        the same as in the last poll is skipped as a whole. Only the animes that left the releasing
+        list are fetched on their own, to find their new status.
+        The first poll only learns the current state, it sends no events.
+
+        Every poll lists all releasing pages, that costs one request per `per_page` releasing
+        animes, plus one per `per_page` animes that left the list. The Api can't list the
+        recently changed animes, and an unchanged page says nothing about the next one, so
+        the paging can't stop early. Pick the `interval` with that cost in mind.
+
+        Parameters
+        ----------
+        make_client : Callable[[], :class:`wrapper.AniApi`]
+            Creates the client for a poll, e.x. `lambda: AniApi(token)`.
+
+        interval : [:class:`float`]
+            The seconds between two polls of the background thread.
+
+        per_page : [:class:`int`]
+            The animes per listed page, every page costs one request.
+
+        Examples
+        --------
+        >>> poller = ReleasingPoller(lambda: AniApi(token), interval=120)
+        >>> poller.subscribe(notify, NewEpisode)
+        >>> poller.start()
+        """
+
+        self.make_client = make_client
+        self.interval = interval
+        self.per_page = per_page
+
+        # The error of the last failed poll or subscriber, None when it worked.
+        self.last_error: Optional[BaseException] = None
+
+        # The requests of the last poll and the pages whose diff was skipped, because they didn't change.
+        self.requests = 0
+        self.skipped_pages = 0
+
+        self._known: Dict[int, Tuple[int, int, float]] = {}
+        self._pages: Dict[int, int] = {}
+        self._subscribers: List[Tuple[Callable[[AnimeChange], None], Tuple[Type[AnimeChange], ...]]] = []
+        self._primed = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # The subscribers.
+
+    def subscribe(self, callback: Callable[[AnimeChange], None], *kinds: Type[AnimeChange]) -> None:
+        """ Registers a callback for the given event types, all events when no type is given """
+        self._subscribers.append((callback, kinds or (AnimeChange,)))
+
+    def unsubscribe(self, callback: Callable[[AnimeChange], None]) -> None:
+        self._subscribers = [(cb, kinds) for cb, kinds in self._subscribers if cb is not callback]
+
+    def _emit(self, events: List[AnimeChange]) -> None:
+        for event in events:
+            for callback, kinds in self._subscribers:
+                if isinstance(event, kinds):
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        # One broken subscriber doesn't stop the others.
+                        self.last_error = e
+
+    # Polling.
+
+    def _diff(self, known: dict, anime, events: List[AnimeChange]) -> None:
+        old = known.get(anime.id)
+        new = known[anime.id] = _fingerprint(anime)
+
+        if not self._primed or old == new:
+            return
+
+        if old is None or old[0] != new[0]:
+            previous = AnimeStatus(old[0]) if old is not None else None
+            events.append(StatusChanged(anime.id, anime, previous, AnimeStatus(new[0])))
+
+            if old is None:
+                return
+
+        if new[1] > old[1]:
+            events.append(NewEpisode(anime.id, anime, old[1], new[1]))
+
+        if new[2] != old[2]:
+            events.append(ScoreChanged(anime.id, anime, old[2], new[2]))
+
+    def poll(self) -> List[AnimeChange]:
+        """ Runs one poll, sends the events to the subscribers and returns them """
+
+        with self._lock:
+            client = self.make_client()
+            # A failed poll leaves the state untouched, the next one sends its events.
+            known = dict(self._known)
+            events: List[AnimeChange] = []
+            seen = set()
+            pages = {}
+
+            self.requests = self.skipped_pages = 0
+
+            try:
+                page_number = 1
+
+                while True:
+                    ctx = client.get_anime(status=AnimeStatus.RELEASING, page=page_number, per_page=self.per_page,
+                                           projection=TrackedAnime)
+                    self.requests += 1
+
+                    if ctx.status_code == 404:
+                        break
+
+                    if ctx.status_code != 200 or not isinstance(ctx.data, DataObj):
+                        raise RuntimeError(f'The releasing page {page_number} answered {ctx.status_code}')
+
+                    data = ctx.data
+                    ids = [anime.id for anime in data.documents]
+                    seen.update(ids)
+
+                    # The hash of all fingerprints of the page, an unchanged page needs no diff. It still had to be
+                    # requested, a change on any later page would be missed otherwise.
+                    page = pages[data.current_page] = hash(tuple(_fingerprint(anime) for anime in data.documents)
+                                                           + tuple(ids))
+
+                    if self._pages.get(data.current_page) == page:
+                        self.skipped_pages += 1
+                    else:
+                        for anime in data.documents:
+                            self._diff(known, anime, events)
+
+                    if page_number >= data.last_page:
+                        break
+
+                    page_number += 1
+
+                # The animes that aren't releasing anymore, only they are fetched again, a page of ids per request.
+                gone = [i for i in known if i not in seen]
+
+                for start in range(0, len(gone), self.per_page):
+                    batch = gone[start:start + self.per_page]
+                    ctx = client.get_anime(ids=batch, per_page=self.per_page, projection=TrackedAnime)
+                    self.requests += 1
+
+                    found = set()
+
+                    if ctx.status_code == 200 and isinstance(ctx.data, DataObj):
+                        for anime in ctx.data.documents:
+                            self._diff(known, anime, events)
+                            found.add(anime.id)
+                    elif ctx.status_code != 404:
+                        raise RuntimeError(f'The animes {batch} answered {ctx.status_code}')
+
+                    for anime_id in batch:
+                        # It's only kept while it's releasing, a releasing one moved between the pages while they
+                        # were listed.
+                        if anime_id not in found or known[anime_id][0] != AnimeStatus.RELEASING:
+                            del known[anime_id]
+            finally:
+                client.close()
+
+            self._known = known
+            self._pages = pages
+            self._primed = True
+
+        self._emit(events)
+        return events
+
+    # The background thread.
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='releasing-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.poll()
+                self.last_error = None
+            except (OSError, RuntimeError) as e:
+                # The state of the last complete poll stays, the next poll catches up.
+                self.last_error = e
+
+            if self._stop.wait(self.interval):
+                return
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def __repr__(self):
+        return f'<releasing={len(self._known)} requests={self.requests} skipped_pages={self.skipped_pages}>'
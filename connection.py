@@ -19,20 +19,196 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
-from http.client import HTTPSConnection, HTTPMessage
-from typing import Tuple
+import json
+import socket
+import time
+from http.client import HTTPConnection, HTTPMessage, HTTPResponse, HTTPSConnection
+from typing import TYPE_CHECKING, Callable, Tuple
+from urllib.parse import urlsplit
+
+from deadline import current_deadline
+from hooks import RequestTiming
+from retry import RETRYABLE_ERRORS, CircuitBreaker, RetryPolicy
+
+if TYPE_CHECKING:
+    # Only for the annotations, the cassette is only imported by the ones that use it.
+    from cassette import Cassette
 
 
 class ApiConnection(HTTPSConnection):
-    def __init__(self):
+    def __init__(self, timeout: float = None, connect_timeout: float = None, retry: RetryPolicy = None,
+                 breaker: CircuitBreaker = None, hedger=None, host: str = 'api.aniapi.com', port: int = None,
+                 scheme: str = 'https', cassette: 'Cassette' = None):
         """
         This is the Base connection class for the AniApi wrapper.
+
+        Parameters
+        ----------
+        timeout : Optional[:class:`float`]
+            The read timeout in seconds, how long a single socket read may block.
+            None blocks forever.
+
+        connect_timeout : Optional[:class:`float`]
+            The timeout for the connect and the TLS handshake, defaults to `timeout`.
+
+        retry : Optional[:class:`RetryPolicy`]
+            Retries idempotent requests on connection errors and 5xx responses.
+
+        breaker : Optional[:class:`CircuitBreaker`]
+            Fails fast with :class:`CircuitOpenError` while the upstream is unhealthy.
+
+        hedger : Optional[:class:`hedge.Hedger`]
+            Sends `GET` requests through the hedger's pool and hedges the slow ones.
+            A hedger without a factory gets one that copies the settings of this connection.
+
+        host : [:class:`str`]
+            The host of the Api, e.x. a local `server.StandInServer`.
+
+        port : Optional[:class:`int`]
+            The port, defaults to 443 for https and 80 for http.
+
+        scheme : [:class:`str`]
+            `https` or `http`, with `http` the TLS handshake is skipped.
+
+        cassette : Optional[:class:`cassette.Cassette`]
+            Records the requests with their responses, or replays them without any network.
+
+        Raises
+        ------
+        ValueError
+            When the scheme is neither `https` nor `http`.
+        """
+
+        if scheme not in ('https', 'http'):
+            raise ValueError(f'Unsupported scheme {scheme!r}, use https or http')
+
+        super().__init__(host=host, port=port or (443 if scheme == 'https' else 80), timeout=timeout)
+
+        self.scheme = scheme
+
+        self.read_timeout = timeout
+        self.connect_timeout = timeout if connect_timeout is None else connect_timeout
+
+        self.retry = retry
+        self.breaker = breaker
+        self.hedger = hedger
+        self.cassette = cassette
+
+        if hedger is not None and hedger.pool is None:
+            hedger.bind(self._connection_factory())
+
+        # The timing hooks, see `add_hook`.
+        self.hooks = []
+        self._timing = None
+        # The endpoint template of the next request, e.x. `anime/{}`, set by the wrapper.
+        self._endpoint = None
+
+        # Opens a child span per request when set, see `tracing.Tracer`.
+        self.tracer = None
+        self._span_attributes = {}
+
+        # The http status of the last response.
+        self.last_status = None
+
+        # Set by `abort`, the connection neither reconnects nor retries afterwards.
+        self._aborted = False
+
+    def _connection_factory(self) -> Callable[[], 'ApiConnection']:
+        """ Creates connections with the settings of this one, e.x. for the pool of a hedger.
+        They share the hook list, a hook that is added later also sees their requests.
         """
 
-        super().__init__(host='api.aniapi.com')
+        def factory() -> ApiConnection:
+            conn = ApiConnection(timeout=self.read_timeout, connect_timeout=self.connect_timeout, retry=self.retry,
+                                 breaker=self.breaker, host=self.host, port=self.port, scheme=self.scheme,
+                                 cassette=self.cassette)
+            conn.hooks = self.hooks
+            return conn
+
+        return factory
+
+    def add_hook(self, hook: Callable[[RequestTiming], None]) -> None:
+        """ Registers a hook that gets one :class:`RequestTiming` per request.
+
+        The phases are only measured while at least one hook is registered.
+        Requests sent through a hedger are measured without the decode and build phases.
+        """
+
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[RequestTiming], None]) -> None:
+        self.hooks.remove(hook)
+
+    def _finish_timing(self, endpoint: str = None, decode: float = 0.0, build: float = 0.0) -> None:
+        """ Sends the timing of the last request to the hooks, the wrapper adds the decode and build phases """
+
+        timing, self._timing = self._timing, None
+
+        if timing is None:
+            return
+
+        record = RequestTiming(endpoint=endpoint or urlsplit(timing['url']).path, decode=decode, build=build, **timing)
+
+        for hook in self.hooks:
+            hook(record)
+
+    def connect(self) -> None:
+        """ Connects with the connect timeout, afterwards the socket uses the read timeout.
+        Both are clamped to the current :class:`deadline.Deadline`.
+        """
+
+        if self._aborted:
+            raise ConnectionAbortedError('The connection was aborted')
+
+        deadline = current_deadline()
+        read = self.read_timeout
+
+        self.timeout = self.connect_timeout
+
+        if deadline is not None:
+            self.timeout = deadline.clamp(self.timeout)
+            read = deadline.clamp(read)
+
+        timing = self._timing
+        tls = self.scheme == 'https'
+
+        if timing is None:
+            if tls:
+                super().connect()
+            else:
+                HTTPConnection.connect(self)
+        else:
+            # The same as `HTTPSConnection.connect`, but with the tcp connect and the handshake timed on their own.
+            start = time.perf_counter()
+            HTTPConnection.connect(self)
+            connected = time.perf_counter()
+
+            if tls:
+                self.sock = self._context.wrap_socket(self.sock, server_hostname=self._tunnel_host or self.host)
+
+            timing['connect'] += connected - start
+            timing['tls'] += time.perf_counter() - connected
+
+        self.sock.settimeout(read)
+
+    def abort(self) -> None:
+        """ Stops a request that is running in another thread, e.x. the loser of a hedged request.
+        Closing alone doesn't wake a blocking read, the response still holds the socket open.
+        """
+
+        self._aborted = True
+        sock = self.sock
+
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        self.close()
 
     def get(self, url: str, headers: dict) -> Tuple[bytes, HTTPMessage]:
-        """ This will send a `GET` request to aniapi.com
+        """ This will send a `GET` request to aniapi.com, or the configured host
 
         Parameters
         ----------
@@ -51,14 +227,25 @@ class ApiConnection(HTTPSConnection):
         -----
         The JWT token will be only used for non-read-only requests.
         """
-        
-        res, header = self.__request('GET', headers, url)
 
-        self.close()
-        return res, header
+        if self.hedger is not None:
+            # The pooled connections time their own requests.
+            self._endpoint = None
+
+            if self.tracer is None:
+                return self.hedger.get(url, headers)
+
+            attributes, self._span_attributes = self._span_attributes, {}
+
+            with self.tracer.span('GET', url=url, hedged=True, **attributes):
+                return self.hedger.get(url, headers)
 
-    def __request(self, method: str, headers: dict, url: str) -> Tuple[bytes, HTTPMessage]:
-        """ This is just for preventing repetitive code samples
+        # The connection stays open for the next request, unless the server asked to close it.
+        return self.__request('GET', headers, url)
+
+    def __request(self, method: str, headers: dict, url: str, body=None) -> Tuple[bytes, HTTPMessage]:
+        """ This is just for preventing repetitive code samples.
+        When a retry policy or a circuit breaker is set, they are applied here.
 
         Parameters
         ----------
@@ -71,20 +258,172 @@ class ApiConnection(HTTPSConnection):
         url : [:class:`str`]
             The url to send the request to.
 
+        body : Optional
+            The body for PUT and POST requests.
+
         Returns
         -------
         :class:`bytes` and :class:`HTTPMessage`
             Returns the data
+
+        Raises
+        ------
+        CircuitOpenError
+            When the circuit breaker is open.
+
+        DeadlineExceeded
+            When the current deadline is spent.
         """
 
-        self.request(method, url, headers=headers)
+        tracer = self.tracer
 
-        data = self.getresponse()
-        res = data.read()
-        header = data.headers
+        if tracer is None:
+            return self.__send(method, headers, url, body)
+
+        attributes, self._span_attributes = self._span_attributes, {}
+
+        with tracer.span(method, url=url, **attributes) as span:
+            res, header = self.__send(method, headers, url, body)
+            span.set(**{'http.status': self.last_status, 'bytes': len(res)})
 
         return res, header
 
+    def __send(self, method: str, headers: dict, url: str, body=None) -> Tuple[bytes, HTTPMessage]:
+        """ Sends the request, see `__request` """
+
+        retry = self.retry
+        deadline = current_deadline()
+        timing = None
+        endpoint, self._endpoint = self._endpoint, None
+
+        if self.hooks:
+            # A record that the wrapper didn't finish, e.x. when `get` was called directly.
+            self._finish_timing()
+
+            timing = self._timing = {'method': method, 'url': url, 'status': None, 'bytes': 0, 'attempts': 0,
+                                     'connect': 0.0, 'tls': 0.0, 'ttfb': 0.0, 'read': 0.0}
+
+        if retry is not None:
+            retry.record_request()
+
+        try:
+            return self.__attempts(method, headers, url, body, timing, deadline)
+        except BaseException as e:
+            # Also an open circuit or a spent deadline, they are raised before anything was sent.
+            if timing is not None:
+                timing['error'] = e
+                self._finish_timing(endpoint)
+            raise
+
+    def __attempts(self, method: str, headers: dict, url: str, body, timing, deadline) -> Tuple[bytes, HTTPMessage]:
+        """ Sends the request until it worked, or the retry policy gives up, see `__send` """
+
+        retry, breaker = self.retry, self.breaker
+        attempt = 0
+
+        while True:
+            if deadline is not None:
+                deadline.check()
+
+                if self.sock is not None:
+                    self.sock.settimeout(deadline.clamp(self.read_timeout))
+
+            probe = breaker is not None and breaker.before()
+
+            try:
+                status, header, res = self.__exchange(method, headers, url, body, timing)
+                self.last_status = status
+
+                if timing is not None:
+                    timing['status'] = status
+                    timing['bytes'] = len(res)
+                    timing['ratelimit_remaining'] = header.get('X-RateLimit-Remaining')
+            except RETRYABLE_ERRORS:
+                # The connection is in an unknown state, the next request reconnects.
+                self.close()
+                # An aborted request isn't the upstream's fault.
+                aborted = self._aborted
+
+                if breaker is not None and not aborted:
+                    breaker.failure()
+
+                if aborted or retry is None or not retry.should_retry(method, attempt):
+                    raise
+            else:
+                # Only a 5xx counts against the upstream, a 429 can still be retried when it's one of the statuses.
+                if breaker is not None:
+                    if status < 500:
+                        breaker.success()
+                    else:
+                        breaker.failure()
+
+                if retry is None or status not in retry.statuses or not retry.should_retry(method, attempt):
+                    return res, header
+            finally:
+                # A probe that raised anything else, e.x. a cassette miss, must not keep the breaker half open.
+                if probe:
+                    breaker.release()
+
+            delay = retry.delay(attempt)
+            time.sleep(delay if deadline is None else deadline.clamp(delay))
+            attempt += 1
+
+    def __exchange(self, method: str, headers: dict, url: str, body, timing) -> Tuple[int, HTTPMessage, bytes]:
+        """ One request and its response, from the network or from a replaying cassette """
+
+        cassette = self.cassette
+
+        if timing is not None:
+            timing['attempts'] += 1
+
+        if cassette is not None and cassette.replaying:
+            status, header, res, delay = cassette.play(method, url, body)
+
+            if timing is not None:
+                timing['ttfb'] += delay
+
+            return status, header, res
+
+        if timing is None and cassette is None:
+            data = self.__roundtrip(method, headers, url, body)
+            return data.status, data.headers, data.read()
+
+        handshake = timing['connect'] + timing['tls'] if timing is not None else 0.0
+        start = time.perf_counter()
+
+        data = self.__roundtrip(method, headers, url, body)
+        received = time.perf_counter()
+        res = data.read()
+        done = time.perf_counter()
+
+        if timing is not None:
+            timing['read'] += done - received
+            timing['ttfb'] += received - start - (timing['connect'] + timing['tls'] - handshake)
+
+        if cassette is not None:
+            cassette.record(method, url, body, data.status, data.headers, res, done - start)
+
+        return data.status, data.headers, res
+
+    def __roundtrip(self, method: str, headers: dict, url: str, body) -> HTTPResponse:
+        """ Sends the request and waits for the response. The server may close a kept-alive
+        connection while it's idle, a `GET` on it is sent once more over a new connection.
+        """
+
+        reused = self.sock is not None
+
+        try:
+            self.request(method, url, headers=headers, body=body)
+            return self.getresponse()
+        except (ConnectionResetError, BrokenPipeError):
+            if not reused or method != 'GET' or self._aborted:
+                raise
+
+            self.close()
+
+        self.request(method, url, headers=headers, body=body)
+        return self.getresponse()
+
     def __requests_body(self, method: str, data: dict, headers: dict, url: str) -> Tuple[bytes, HTTPMessage]:
         """ the same as the __request method but for PUT and POST req
 
@@ -108,13 +447,10 @@ class ApiConnection(HTTPSConnection):
             The response that the api gives us back.
         """
 
-        self.request(method, url, headers=headers, body=data)
-
-        rdata = self.getresponse()
-        res = rdata.read()
-        header = rdata.headers
+        if isinstance(data, dict):
+            data = json.dumps(data).encode('utf-8')
 
-        return res, header
+        return self.__request(method, headers, url, body=data)
 
     def post(self, url: str, headers: dict, data: dict) -> Tuple[bytes, HTTPMessage]:
         """
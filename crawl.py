@@ -0,0 +1,456 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from objects import DataObj
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+from wrapper import AniApi
+
+# The entity name mapped to the `AniApi` method that lists it, the same as `export.CatalogExporter`.
+ENTITIES = {'anime': 'get_anime',
+            'episode': 'get_episode',
+            'song': 'get_song'}
+
+
+class SharedRateLimiter(RateLimiter):
+    def __init__(self, rate: float = 90, per: float = 60.0, burst: Optional[int] = None, context=None):
+        """ A :class:`RateLimiter` whose bucket lives in shared memory, so many processes share one budget.
+
+        Hand it to the worker processes when they are created, e.x. as an initializer argument.
+        """
+
+        super().__init__(rate, per, burst)
+
+        context = context or multiprocessing.get_context()
+        self._shared = context.Array('d', [self.capacity, time.monotonic()], lock=False)
+        self._lock = context.Lock()
+
+    @property
+    def _tokens(self) -> float:
+        return self._shared[0]
+
+    @_tokens.setter
+    def _tokens(self, value: float) -> None:
+        # Only set inside `__init__` before the shared memory exists, afterwards always under the lock.
+        if '_shared' in self.__dict__:
+            self._shared[0] = value
+
+    @property
+    def _updated(self) -> float:
+        return self._shared[1]
+
+    @_updated.setter
+    def _updated(self, value: float) -> None:
+        if '_shared' in self.__dict__:
+            self._shared[1] = value
+
+
+@dataclass
+class ShardStats:
+    """ The work of one shard """
+
+    # The number of the shard, shard 0 is the first page that the crawler fetched itself.
+    shard: int
+
+    # The first and the last page of the shard.
+    first_page: int
+    last_page: int
+
+    # The file the shard was written to.
+    path: str
+
+    # The process that crawled the shard.
+    pid: int = 0
+
+    # The written pages, records and bytes.
+    pages: int = 0
+    records: int = 0
+    bytes: int = 0
+
+    # The seconds the shard took, and the part of it spent waiting for the rate budget.
+    seconds: float = 0.0
+    waited: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return f'<shard={self.shard} pages={self.first_page}-{self.last_page} pid={self.pid} ' \
+               f'records={self.records} pages_per_second={self.pages_per_second:.1f}>'
+
+
+@dataclass
+class CrawlReport:
+    """ The outcome of a crawl, the merged file and the stats of every shard """
+
+    # The crawled entity and the merged file.
+    entity: str
+    path: str
+
+    # The last page of the entity, when the crawl started.
+    last_page: int = 0
+
+    # The total seconds, including the merge.
+    seconds: float = 0.0
+
+    shards: List[ShardStats] = field(default_factory=list)
+
+    @property
+    def pages(self) -> int:
+        return sum(s.pages for s in self.shards)
+
+    @property
+    def records(self) -> int:
+        return sum(s.records for s in self.shards)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    def per_worker(self) -> Dict[int, float]:
+        """ The pages per second of every worker process, the shards of one process are added up """
+
+        work: Dict[int, Tuple[int, float]] = {}
+
+        for s in self.shards[1:]:
+            pages, seconds = work.get(s.pid, (0, 0.0))
+            work[s.pid] = (pages + s.pages, seconds + s.seconds)
+
+        return {pid: pages / seconds if seconds else 0.0 for pid, (pages, seconds) in work.items()}
+
+    def __repr__(self):
+        return f'<entity={self.entity!r} pages={self.pages} records={self.records} seconds={self.seconds:.2f} ' \
+               f'pages_per_second={self.pages_per_second:.1f} shards={len(self.shards)}>'
+
+
+def _write_page(out, data: DataObj) -> Tuple[int, int]:
+    """ Writes the documents of a page as JSON Lines, returns the amount of records and bytes """
+
+    size = 0
+
+    for doc in data.documents:
+        line = json.dumps(asdict(doc), ensure_ascii=False, separators=(',', ':')) + '\n'
+        out.write(line)
+        size += len(line)
+
+    return len(data.documents), size
+
+
+def _fetch(api: AniApi, method: str, limiter: RateLimiter, page: int, per_page: int, filters: dict,
+           attempts: int = 5):
+    """ Fetches one page within the rate budget, a 429 waits for the budget and tries again """
+
+    for _ in range(attempts):
+        limiter.acquire()
+        ctx = getattr(api, method)(page=page, per_page=per_page, **filters)
+        limiter.update(ctx.ratelimit)
+
+        if ctx.status_code != 429:
+            return ctx
+
+    raise RuntimeError(f'Page {page} was rate limited {attempts} times in a row')
+
+
+def _page(api: AniApi, method: str, limiter: RateLimiter, page: int, per_page: int,
+          filters: dict) -> Optional[DataObj]:
+    """ Fetches one page, None when the page is past the end, a 404 or no documents
+
+    Raises
+    ------
+    RuntimeError
+        When the page answered any other error, the crawl would miss its records.
+    """
+
+    ctx = _fetch(api, method, limiter, page, per_page, filters)
+
+    if ctx.status_code == 404:
+        return None
+
+    if ctx.status_code != 200 or not isinstance(ctx.data, DataObj):
+        raise RuntimeError(f'Page {page} answered {ctx.status_code}')
+
+    return ctx.data if ctx.data.documents else None
+
+
+# The state of a worker process, set once by `_init_worker`.
+_worker: dict = {}
+
+
+def _init_worker(limiter: SharedRateLimiter, client_kwargs: dict) -> None:
+    _worker['limiter'] = limiter
+    _worker['client_kwargs'] = client_kwargs
+
+
+def _crawl_shard(stats: ShardStats, entity: str, per_page: int, filters: dict) -> ShardStats:
+    """ Fetches, decodes and writes the pages of one shard, runs inside a worker process """
+
+    limiter = _worker['limiter']
+    api = AniApi(retry=RetryPolicy(), **_worker['client_kwargs'])
+    method = ENTITIES[entity]
+
+    stats.pid = os.getpid()
+    start = time.perf_counter()
+    waited = limiter.waited
+
+    try:
+        with open(stats.path, 'w', encoding='utf-8') as out:
+            for page in range(stats.first_page, stats.last_page + 1):
+                data = _page(api, method, limiter, page, per_page, filters)
+
+                if data is None:
+                    break
+
+                records, size = _write_page(out, data)
+                stats.pages += 1
+                stats.records += records
+                stats.bytes += size
+    finally:
+        api.close()
+
+    stats.seconds = time.perf_counter() - start
+    stats.waited = limiter.waited - waited
+    return stats
+
+
+class ShardedCrawler:
+    def __init__(self, url: str = 'https://api.aniapi.com', processes: Optional[int] = None, shards: int = None,
+                 token: str = '', timeout: float = 30.0, rate: float = 90, per: float = 60.0,
+                 burst: Optional[int] = None):
+        """ Crawls every page of an entity with a pool of processes.
+
+        The decoding and the object building run in the workers, so the crawl isn't
+        bound by one interpreter. The page range is split into contiguous shards,
+        every shard goes to its own file and the files are merged in page order at the end.
+        All workers take their requests from one shared rate budget.
+
+        Parameters
+        ----------
+        url : [:class:`str`]
+            The base url of the Api, e.x. `http://127.0.0.1:8080` for a `server.StandInServer`.
+
+        processes : Optional[:class:`int`]
+            The worker processes, defaults to the cpu count.
+
+        shards : Optional[:class:`int`]
+            The amount of shards, defaults to two per process, so a slow shard doesn't hold up the others.
+
+        token : [:class:`str`]
+            The Api token.
+
+        rate, per, burst
+            The rate budget of all workers together, the AniApi allows 90 requests per minute.
+
+        Raises
+        ------
+        ValueError
+            When the url scheme is neither `http` nor `https`.
+
+        Examples
+        --------
+        >>> report = ShardedCrawler(processes=4, rate=90).crawl('anime', 'anime.jsonl')
+        >>> report.per_worker()
+        """
+
+        split = urlsplit(url)
+
+        if split.scheme not in ('http', 'https'):
+            raise ValueError(f'The url needs an http or https scheme, got {url!r}')
+
+        # Plain values only, they are pickled for the workers, every process creates its own retry policy.
+        self.client_kwargs = {'token': token, 'timeout': timeout, 'host': split.hostname, 'port': split.port,
+                              'scheme': split.scheme}
+
+        self.processes = processes or os.cpu_count() or 1
+        self.shards = shards or self.processes * 2
+        self.limiter = SharedRateLimiter(rate, per, burst)
+
+    @staticmethod
+    def split(first: int, last: int, shards: int) -> List[Tuple[int, int]]:
+        """ Splits the pages `first` to `last` into up to `shards` contiguous ranges of almost the same size """
+
+        total = last - first + 1
+
+        if total <= 0:
+            return []
+
+        shards = min(shards, total)
+        size, extra = divmod(total, shards)
+        ranges = []
+
+        for i in range(shards):
+            end = first + size + (i < extra) - 1
+            ranges.append((first, end))
+            first = end + 1
+
+        return ranges
+
+    def crawl(self, entity: str, path: str, per_page: int = 100, keep_shards: bool = False,
+              **filters) -> CrawlReport:
+        """ Crawls every page of an entity into one JSON Lines file.
+
+        Parameters
+        ----------
+        entity : [:class:`str`]
+            `anime`, `episode` or `song`.
+
+        path : [:class:`str`]
+            The merged file, the shards are written next to it as `path.00001` and so on.
+
+        per_page : [:class:`int`]
+            The amount of records per page.
+
+        keep_shards : [:class:`bool`]
+            Keeps the shard files after the merge.
+
+        filters
+            Extra filters for the list request, e.x. `status=1`.
+
+        Returns
+        -------
+        :class:`CrawlReport`
+
+        Raises
+        ------
+        ValueError
+            When the entity isn't supported.
+
+        RuntimeError
+            When a page failed, nothing is merged and the shard files are removed.
+        """
+
+        if entity not in ENTITIES:
+            raise ValueError(f'Unsupported entity: {entity!r}')
+
+        start = time.perf_counter()
+        report = CrawlReport(entity=entity, path=path)
+
+        # The first page is fetched here, it tells the last page.
+        first = ShardStats(shard=0, first_page=1, last_page=1, path=f'{path}.00000', pid=os.getpid())
+        api = AniApi(retry=RetryPolicy(), **self.client_kwargs)
+
+        try:
+            data = _page(api, ENTITIES[entity], self.limiter, 1, per_page, filters)
+        finally:
+            api.close()
+
+        with open(first.path, 'w', encoding='utf-8') as out:
+            if data is not None:
+                first.pages = 1
+                first.records, first.bytes = _write_page(out, data)
+                report.last_page = data.last_page
+
+        first.seconds = time.perf_counter() - start
+        report.shards.append(first)
+
+        shards = [ShardStats(shard=i, first_page=a, last_page=b, path=f'{path}.{i:05}')
+                  for i, (a, b) in enumerate(self.split(2, report.last_page, self.shards), 1)]
+
+        if shards:
+            with ProcessPoolExecutor(max_workers=min(self.processes, len(shards)), initializer=_init_worker,
+                                     initargs=(self.limiter, self.client_kwargs)) as pool:
+                futures = [pool.submit(_crawl_shard, s, entity, per_page, filters) for s in shards]
+
+                try:
+                    report.shards.extend(future.result() for future in futures)
+                except BaseException:
+                    # A failed shard leaves a hole in the catalog, a truncated merge would look complete.
+                    for future in futures:
+                        future.cancel()
+
+                    pool.shutdown(wait=True)
+
+                    for shard in [first] + shards:
+                        if os.path.exists(shard.path):
+                            os.remove(shard.path)
+                    raise
+
+        self.merge([s.path for s in report.shards], path, remove=not keep_shards)
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def merge(paths: List[str], path: str, remove: bool = True) -> None:
+        """ Concatenates the shard files in the given order into `path` """
+
+        tmp = f'{path}.tmp'
+
+        with open(tmp, 'wb') as out:
+            for shard in paths:
+                with open(shard, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+
+        os.replace(tmp, path)
+
+        if remove:
+            for shard in paths:
+                os.remove(shard)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Crawls every page of an AniApi entity with a pool of processes.')
+    parser.add_argument('entity', choices=ENTITIES)
+    parser.add_argument('output', help='the merged JSON Lines file')
+    parser.add_argument('--url', default='https://api.aniapi.com', help='e.x. http://127.0.0.1:8080')
+    parser.add_argument('-p', '--processes', type=int)
+    parser.add_argument('-s', '--shards', type=int)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--token', default='')
+    parser.add_argument('--rate', type=float, default=90, help='the requests per `--per` seconds of all workers')
+    parser.add_argument('--per', type=float, default=60.0)
+    parser.add_argument('--keep-shards', action='store_true')
+    args = parser.parse_args(argv)
+
+    try:
+        crawler = ShardedCrawler(args.url, processes=args.processes, shards=args.shards, token=args.token,
+                                 rate=args.rate, per=args.per)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = crawler.crawl(args.entity, args.output, per_page=args.per_page, keep_shards=args.keep_shards)
+
+    print(report)
+
+    for s in report.shards:
+        print(s)
+
+    for pid, rate in sorted(report.per_worker().items()):
+        print(f'worker {pid}: {rate:.1f} pages/s')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from utils import DeadlineExceeded
+
+_current: ContextVar[Optional['Deadline']] = ContextVar('deadline', default=None)
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        """ A time budget for an operation that sends many requests.
+
+        Use it as a context manager, every request that is sent inside the block
+        clamps its socket timeouts to the remaining time and raises
+        :class:`DeadlineExceeded` once the budget is spent. Nested deadlines
+        can only shorten the outer one.
+
+        Parameters
+        ----------
+        seconds : [:class:`float`]
+            The budget in seconds.
+
+        Examples
+        --------
+        >>> with Deadline(2.0):
+        ...     animes = get_many(api.get_anime, [1, 2, 3])
+        """
+
+        self.expires = time.monotonic() + seconds
+
+        outer = _current.get()
+
+        if outer is not None:
+            self.expires = min(self.expires, outer.expires)
+
+        # The context tokens are kept per thread, one deadline can be shared between worker threads.
+        self._local = threading.local()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self) -> None:
+        """
+        Raises
+        ------
+        DeadlineExceeded
+            When the budget is spent.
+        """
+
+        if self.expired:
+            raise DeadlineExceeded('The deadline was exceeded')
+
+    def clamp(self, timeout: Optional[float]) -> float:
+        """ Returns the given timeout, but never more than the remaining time """
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def __enter__(self):
+        if not hasattr(self._local, 'tokens'):
+            self._local.tokens = []
+
+        self._local.tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._local.tokens.pop())
+
+    def __repr__(self):
+        return f'<remaining={self.remaining():.3f}>'
+
+
+def current_deadline() -> Optional[Deadline]:
+    """ Returns the deadline of the surrounding `with Deadline(...)` block, if there is one """
+    return _current.get()
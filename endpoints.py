@@ -0,0 +1,257 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+from dataclasses import dataclass, field
+from enum import IntEnum
+from string import ascii_letters, digits
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional
+from urllib.parse import quote_plus
+
+from constants import API_VERSION
+from objects import AnimeObj, EpisodeObj, SongObj, UserSObj, UserBObj
+from utils import InvalidParamsException, InvalidParamsValueException
+
+
+# The characters that `quote_plus` keeps as they are.
+_SAFE = frozenset(ascii_letters + digits + '_.-~')
+
+
+def _quote(value) -> str:
+    """ The same as `quote_plus(str(value))`, but numbers and plain words skip the quoting """
+
+    if type(value) is int:
+        return str(value)
+
+    value = str(value)
+    return value if _SAFE.issuperset(value) else quote_plus(value)
+
+
+class Many:
+    """ Marks a parameter that takes a comma separated list of the given type, e.x. `formats=0,1` """
+
+    def __init__(self, _type: type):
+        self.type = _type
+
+
+def _scalar_check(name: str, _type: type) -> Callable[[Any], Any]:
+    """ Compiles the value check for a single parameter value """
+
+    if isinstance(_type, type) and issubclass(_type, IntEnum):
+        allowed = frozenset(int(member) for member in _type)
+
+        def check(value):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                value = None
+
+            if value not in allowed:
+                raise InvalidParamsValueException(f'Invalid value for {name!r}, expected one of {_type.__name__}')
+
+            return value
+
+        return check
+
+    if _type is bool:
+        def check(value):
+            if isinstance(value, str) and value.lower() in ('true', 'false'):
+                return value.lower()
+
+            if not isinstance(value, bool):
+                raise InvalidParamsValueException(f'Invalid value for {name!r}, expected a bool')
+
+            return str(value).lower()
+
+        return check
+
+    def check(value):
+        if type(value) is _type:
+            return value
+
+        if isinstance(value, bool) or not isinstance(value, _type):
+            try:
+                value = _type(value)
+            except (TypeError, ValueError):
+                raise InvalidParamsValueException(f'Invalid value for {name!r}, expected {_type.__name__}') from None
+
+        return value
+
+    return check
+
+
+def _compile_check(name: str, _type) -> Callable[[Any], Any]:
+    if not isinstance(_type, Many):
+        return _scalar_check(name, _type)
+
+    scalar = _scalar_check(name, _type.type)
+
+    def check(value):
+        if isinstance(value, str):
+            value = value.split(',') if _type.type is not str else [value]
+        elif not isinstance(value, (list, tuple, set, frozenset)):
+            value = [value]
+
+        return ','.join(str(scalar(v)) for v in value)
+
+    return check
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """ A declarative description of a `GET` endpoint.
+
+    The url template, the quoted parameter names and the parameter checks get
+    compiled once when the endpoint is created, so a call only has to run the
+    precompiled parts. `test/bench.py` compares `url.params` with the inline code
+    it replaced in `url.params_inline`.
+    """
+
+    # The url path after the api version, the `{}` will be filled with the positional segments.
+    path: str
+
+    # The object that the documents get converted into, None keeps the raw data.
+    model: Optional[type] = None
+
+    # The supported query parameters.
+    params: FrozenSet[str] = frozenset()
+
+    # The expected value type per parameter, enums only accept their members values.
+    types: Mapping[str, Any] = field(default_factory=dict, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_template', f'/{API_VERSION}/{self.path}')
+        object.__setattr__(self, '_checks', {name: _compile_check(name, _type)
+                                             for name, _type in self.types.items()})
+        object.__setattr__(self, '_keys', {name: f'{quote_plus(name)}=' for name in self.params})
+
+    def validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """ Check the given query parameters and normalize their values.
+
+        Raises
+        ------
+        InvalidParamsException
+            When a parameter is not supported by the endpoint.
+
+        InvalidParamsValueException
+            When a parameter value has the wrong type or is not a member of the expected enum.
+        """
+
+        if not params:
+            return params
+
+        invalid = params.keys() - self.params
+
+        if invalid:
+            raise InvalidParamsException(f'Invalid parameters: {invalid}')
+
+        checks = self._checks
+        return {k: checks[k](v) if k in checks else v for k, v in params.items()}
+
+    def url(self, *segments, params: Dict[str, Any] = None) -> str:
+        """ Builds the url for the given path segments and the (validated) query parameters,
+        the query is encoded the same as `urllib.parse.urlencode` does it.
+        """
+
+        url = self._template.format(*segments)
+
+        if not params:
+            return url
+
+        keys = self._keys
+        return url + '?' + '&'.join((keys.get(k) or f'{quote_plus(str(k))}=') + _quote(v) for k, v in params.items())
+
+
+# The registry by name, only annotated here, `__getattr__` builds it on the first access.
+ENDPOINTS: Dict[str, Endpoint]
+
+
+def _build_endpoints() -> Dict[str, Endpoint]:
+    """ Creates the registry, the enums and flags of `utils` are only loaded here """
+
+    from utils import (ANIME_REQ,
+                       EPISODE_REQ,
+                       SONG_REQ,
+                       USER_REQ,
+                       USER_STORY_REQ,
+                       AnimeFormat,
+                       AnimeStatus,
+                       SeasonPeriod,
+                       SongTypes,
+                       UserStoryStatus)
+
+    pagination = {'page': int,
+                  'per_page': int,
+                  'ids': Many(int),
+                  'locale': str,
+                  'sort_fields': Many(str),
+                  'sort_directions': Many(int)}
+
+    return {
+        'anime': Endpoint('anime/{}', AnimeObj, frozenset(ANIME_REQ),
+                          {'title': str,
+                           'anilist_id': int,
+                           'mal_id': int,
+                           'tmdb_id': int,
+                           'formats': Many(AnimeFormat),
+                           'status': AnimeStatus,
+                           'year': int,
+                           'season': SeasonPeriod,
+                           'genres': Many(str),
+                           'nsfw': bool,
+                           'with_episodes': bool,
+                           **pagination}),
+        'random_anime': Endpoint('random/anime/{}/{}', AnimeObj),
+        'episode': Endpoint('episode/{}', EpisodeObj, frozenset(EPISODE_REQ),
+                            {'anime_id': int,
+                             'number': int,
+                             'is_dub': bool,
+                             **pagination}),
+        'song': Endpoint('song/{}', SongObj, frozenset(SONG_REQ),
+                         {'anime_id': int,
+                          'title': str,
+                          'artist': str,
+                          'year': int,
+                          'season': SeasonPeriod,
+                          'type': SongTypes,
+                          **pagination}),
+        'random_song': Endpoint('random/song/{}', SongObj),
+        'resources': Endpoint('resources/{}/{}'),
+        'user_story': Endpoint('user_story/{}', None, frozenset(USER_STORY_REQ),
+                               {'anime_id': int,
+                                'user_id': int,
+                                'status': UserStoryStatus,
+                                'synced': bool}),
+        'user': Endpoint('user/{}', UserSObj, frozenset(USER_REQ),
+                         {'username': str,
+                          'email': str,
+                          **pagination}),
+        'auth_me': Endpoint('auth/me', UserBObj),
+    }
+
+
+def __getattr__(name):
+    # `import wrapper` doesn't load the enums and flags, the first request does.
+    if name != 'ENDPOINTS':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = globals()['ENDPOINTS'] = _build_endpoints()
+    return value
@@ -0,0 +1,265 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import gzip
+import json
+import os
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Callable, Dict, Optional
+
+from deadline import Deadline
+from objects import DataObj
+
+
+@dataclass
+class ExportStats:
+    """ Throughput information for one exported entity """
+
+    # The entity that got exported, e.x. `anime`.
+    entity: str
+
+    # The amount of pages written in this run.
+    pages: int = 0
+
+    # The amount of records written in this run.
+    records: int = 0
+
+    # The amount of (uncompressed) bytes written in this run.
+    bytes: int = 0
+
+    # The last page that was written to the file.
+    last_page: int = 0
+
+    # When the export was started, as `time.perf_counter` value.
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.records / elapsed if elapsed else 0.0
+
+    def __repr__(self):
+        return f'<entity={self.entity!r} pages={self.pages} records={self.records} ' \
+               f'last_page={self.last_page} records_per_second={self.records_per_second:.1f}>'
+
+
+class CatalogExporter:
+    # The entity name mapped to the `AniApi` method that lists it.
+    ENTITIES = {'anime': 'get_anime',
+                'episode': 'get_episode',
+                'song': 'get_song'}
+
+    def __init__(self, api, path: str, compress: bool = False, checkpoint: Optional[str] = None):
+        """ Streams paginated catalog results straight into JSON Lines files, one file per entity.
+
+        Only one page is held in memory at a time. Every written page is synced and its end
+        offset is recorded in the checkpoint file, a resumed export cuts the file back to that
+        offset, so a crash between the two never duplicates records.
+
+        Parameters
+        ----------
+        api : [:class:`wrapper.AniApi`]
+            The client that is used to fetch the pages.
+
+        path : [:class:`str`]
+            The file to write to, `{entity}` is replaced with the entity name. Without it the
+            name goes in front of the extensions, e.x. `catalog.jsonl` becomes `catalog.anime.jsonl`.
+
+        compress : [:class:`bool`]
+            Write the files gzip compressed, every page is its own gzip member. Default is False.
+
+        checkpoint : Optional[:class:`str`]
+            The checkpoint file of all entities, defaults to `path` + `.ckpt`.
+        """
+
+        self.api = api
+        self.path = path
+        self.compress = compress
+        self.checkpoint = checkpoint or f'{path}.ckpt'
+
+    def path_for(self, entity: str) -> str:
+        """ The file of one entity """
+
+        if '{entity}' in self.path:
+            return self.path.replace('{entity}', entity)
+
+        head, name = os.path.split(self.path)
+        base, dot, ext = name.partition('.')
+        return os.path.join(head, f'{base}.{entity}.{ext}' if dot else f'{name}.{entity}')
+
+    def load_checkpoint(self) -> Dict[str, dict]:
+        """ Returns the checkpoint state per entity, an empty dict when there is no checkpoint.
+
+        Every entity maps to `{'page': <last written page>, 'offset': <the file size after it>,
+        'done': <reached the last page>, 'per_page': <records per page>, 'filters': <the extra filters>}`.
+        """
+        try:
+            with open(self.checkpoint, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, state: Dict[str, dict]) -> None:
+        tmp = f'{self.checkpoint}.tmp'
+
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.checkpoint)
+
+    def _open(self, path: str, offset: Optional[int]) -> BinaryIO:
+        """ Opens the file of an entity, cut back to the checkpointed offset or empty """
+
+        if offset is None:
+            return open(path, 'wb')
+
+        try:
+            out = open(path, 'r+b')
+        except FileNotFoundError:
+            raise RuntimeError(f'{path!r} is missing, the checkpoint needs it to resume') from None
+
+        out.truncate(offset)
+        out.seek(offset)
+        return out
+
+    def export(self, entity: str = 'anime', per_page: int = 100, resume: bool = True,
+               progress: Optional[Callable[[ExportStats], None]] = None, deadline: Deadline = None,
+               **kwargs) -> ExportStats:
+        """ Export every page of an entity to its file.
+
+        Parameters
+        ----------
+        entity : [:class:`str`]
+            The entity to export, possible values: `anime`, `episode` or `song`.
+
+        per_page : [:class:`int`]
+            The amount of records to request per page.
+
+        resume : [:class:`bool`]
+            Continue after the last page in the checkpoint, otherwise the file gets truncated.
+            An entity that was already exported completely will not be requested again.
+
+        progress : Optional[Callable[[:class:`ExportStats`], None]]
+            Gets called after every written page.
+
+        deadline : Optional[:class:`Deadline`]
+            Stops cleanly after the last complete page when the deadline is spent,
+            the next run resumes from the checkpoint.
+
+        kwargs
+            Extra filters for the list request, e.x. `anime_id` for episodes.
+
+        Returns
+        -------
+        :class:`ExportStats`
+            The throughput information of this run.
+
+        Raises
+        ------
+        ValueError
+            When the entity is not supported, or the checkpoint was written with another
+            `per_page` or other filters. The pages wouldn't line up, pass `resume=False`.
+
+        RuntimeError
+            When a page answered an error other than a 404, the checkpoint keeps the last written page.
+        """
+
+        if entity not in self.ENTITIES:
+            raise ValueError(f'Unsupported entity: {entity!r}')
+
+        method = getattr(self.api, self.ENTITIES[entity])
+        # The filters the way the checkpoint stores them, e.x. a tuple becomes a list.
+        filters = json.loads(json.dumps(kwargs, default=str))
+        state = self.load_checkpoint()
+        entry = state.get(entity) if resume else None
+
+        if entry is not None and (entry.get('per_page'), entry.get('filters')) != (per_page, filters):
+            raise ValueError(f'The {entity} checkpoint was written with per_page={entry.get("per_page")} and the '
+                             f'filters {entry.get("filters")}, resume with the same ones or pass resume=False')
+
+        stats = ExportStats(entity=entity, last_page=entry['page'] if entry else 0)
+
+        if entry is not None and entry['done']:
+            return stats
+
+        page = stats.last_page + 1
+
+        # A fresh export forgets the old entry, the other entities keep theirs.
+        if entry is None:
+            state.pop(entity, None)
+
+        with self._open(self.path_for(entity), entry['offset'] if entry else None) as out:
+            while deadline is None or not deadline.expired:
+                try:
+                    with deadline or nullcontext():
+                        ctx = method(page=page, per_page=per_page, **kwargs)
+                except TimeoutError:
+                    if deadline is not None and deadline.expired:
+                        break
+                    raise
+
+                # The Api answers a page past the end with a 404.
+                if ctx.status_code == 404:
+                    break
+
+                data = ctx.data
+
+                if ctx.status_code != 200 or not isinstance(data, DataObj):
+                    raise RuntimeError(f'The {entity} page {page} answered {ctx.status_code}: {ctx.message}')
+
+                if not data.documents:
+                    break
+
+                chunk = ''.join(json.dumps(asdict(doc), ensure_ascii=False, separators=(',', ':')) + '\n'
+                                for doc in data.documents).encode('utf-8')
+                stats.bytes += len(chunk)
+
+                out.write(gzip.compress(chunk) if self.compress else chunk)
+                out.flush()
+                os.fsync(out.fileno())
+
+                stats.pages += 1
+                stats.records += len(data.documents)
+                stats.last_page = page
+
+                done = page >= data.last_page
+                state[entity] = {'page': page, 'offset': out.tell(), 'done': done, 'per_page': per_page,
+                                 'filters': filters}
+                self._save_checkpoint(state)
+
+                if progress:
+                    progress(stats)
+
+                if done:
+                    break
+
+                page += 1
+
+        return stats
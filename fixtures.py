@@ -0,0 +1,156 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import random
+from typing import Dict, List
+
+from utils.genres import genres as GENRES
+
+# The locales that the generated titles and descriptions use.
+LOCALES = ('en', 'it', 'jp')
+
+_WORDS = ('sky', 'blade', 'night', 'spirit', 'academy', 'dragon', 'moon', 'journey', 'hero', 'city',
+          'flower', 'storm', 'dream', 'shadow', 'star', 'ocean', 'song', 'fire', 'crystal', 'knight')
+
+_DAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+
+
+def _text(rnd: random.Random, words: int) -> str:
+    return ' '.join(rnd.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def make_anime(anime_id: int, seed: int = 0) -> dict:
+    """ Generates a deterministic anime document in the shape the Api returns """
+
+    rnd = random.Random(seed * 1_000_003 + anime_id)
+    title = _text(rnd, 3)
+    status = rnd.choice((0, 0, 0, 1, 2))
+    year = rnd.randint(1990, 2022)
+
+    return {'id': anime_id,
+            'anilist_id': anime_id + 1000,
+            'mal_id': anime_id + 2000,
+            'tmdb_id': anime_id + 3000,
+            'format': rnd.randint(0, 6),
+            'status': status,
+            'titles': {locale: f'{title} ({locale})' for locale in LOCALES},
+            'descriptions': {locale: _text(rnd, 60) for locale in LOCALES[:2]},
+            'episodes_count': rnd.randint(1, 48),
+            'cover_image': f'https://s4.anilist.co/file/anilistcdn/media/anime/cover/large/bx{anime_id}.jpg',
+            'has_cover_image': True,
+            'genres': rnd.sample(GENRES, 5),
+            'sagas': [],
+            'score': rnd.randint(30, 95),
+            'nsfw': rnd.random() < 0.05,
+            'recommendations': [rnd.randint(1, 20000) for _ in range(5)],
+            'trailer_url': None,
+            'sequel': None,
+            'prequel': None,
+            'cover_color': '#%06x' % rnd.randrange(1 << 24),
+            'banner_image': None,
+            'episode_duration': 24,
+            'start_date': f'{year}-04-01T00:00:00Z',
+            'end_date': None if status == 1 else f'{year}-06-30T00:00:00Z',
+            'weekly_airing_day': rnd.choice(_DAYS) if status == 1 else None,
+            'season_period': rnd.randint(0, 3),
+            'season_year': year}
+
+
+def make_episode(episode_id: int, anime_id: int, number: int) -> dict:
+    locale = LOCALES[episode_id % 2]
+
+    return {'id': episode_id,
+            'anime_id': anime_id,
+            'number': number,
+            'title': f'Episode {number}',
+            'video': f'https://example.org/video/{anime_id}/{number}.m3u8',
+            'video_headers': '',
+            'locale': locale,
+            'format': 'm3u8',
+            'is_dub': False,
+            'quality': 1080}
+
+
+def make_song(song_id: int, anime_id: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed * 1_000_003 + song_id)
+    track = rnd.randrange(1 << 40)
+
+    return {'id': song_id,
+            'anime_id': anime_id,
+            'title': _text(rnd, 2),
+            'artist': f'Artist {rnd.randint(1, 300)}',
+            'album': f'Album {rnd.randint(1, 500)}',
+            'year': rnd.randint(1990, 2022),
+            'season': rnd.randint(0, 3),
+            'duration': rnd.randint(60_000, 300_000),
+            'preview_url': f'https://p.scdn.co/mp3-preview/{track:x}',
+            'open_spotify_link': f'https://open.spotify.com/track/{track:x}',
+            'local_spotify_url': f'spotify:track:{track:x}',
+            'type': rnd.randint(0, 2)}
+
+
+def make_user(user_id: int, confidential: bool = False) -> dict:
+    user = {'id': user_id,
+            'username': f'user{user_id}',
+            'role': 0,
+            'gender': user_id % 3}
+
+    if confidential:
+        user.update({'email': f'user{user_id}@example.org',
+                     'email_verified': True,
+                     'avatar_tracker': 'none',
+                     'localization': 'en',
+                     'has_anilist': False,
+                     'has_mal': False})
+
+    return user
+
+
+def make_catalog(animes: int = 1000, seed: int = 0) -> Dict[str, List[dict]]:
+    """ Generates a catalog with the animes, 3 episodes and 2 songs per anime """
+
+    catalog = {'anime': [], 'episode': [], 'song': []}
+
+    for anime_id in range(1, animes + 1):
+        catalog['anime'].append(make_anime(anime_id, seed))
+
+        for number in range(1, 4):
+            episode_id = (anime_id - 1) * 3 + number
+            catalog['episode'].append(make_episode(episode_id, anime_id, number))
+
+        for n in range(2):
+            catalog['song'].append(make_song((anime_id - 1) * 2 + n + 1, anime_id, seed))
+
+    return catalog
+
+
+def page(documents: List[dict], page_number: int = 1, per_page: int = 100) -> dict:
+    """ Slices a page out of the documents, in the shape of a list response """
+
+    last_page = max(1, -(-len(documents) // per_page))
+    chunk = documents[(page_number - 1) * per_page:page_number * per_page]
+
+    return {'current_page': page_number, 'count': len(chunk), 'documents': chunk, 'last_page': last_page}
+
+
+def response(data, status_code: int = 200, message: str = 'ok') -> dict:
+    return {'status_code': status_code, 'message': message, 'data': data, 'version': '1'}
@@ -0,0 +1,244 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+import time
+from collections import deque
+from contextvars import copy_context
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.client import HTTPMessage
+from typing import Callable, Optional, Tuple
+
+from pool import ConnectionPool
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """ Keeps the latency of the last `window` requests to calculate percentiles """
+
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """ Returns the p-th percentile, None while there are less than `min_samples` samples """
+
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+
+            ordered = sorted(self._samples)
+
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class _Attempt:
+    """ One copy of a hedged request, the winner cancels the loser through it """
+
+    __slots__ = ('conn', 'cancelled', 'lock')
+
+    def __init__(self):
+        self.conn = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        """ Aborts the running request and takes its connection, that stops its blocking read.
+        Returns the connection so the caller can free its place in the pool right away.
+        """
+
+        with self.lock:
+            self.cancelled = True
+            conn, self.conn = self.conn, None
+
+        if conn is not None:
+            conn.abort()
+
+        return conn
+
+
+class Hedger:
+    def __init__(self, factory: Callable = None, percentile: float = 95, min_delay: float = 0.01,
+                 max_rate: float = 0.05, pool_size: int = 4, window: int = 200):
+        """ Sends a second copy of a slow `GET` request and takes the first answer.
+
+        When a request didn't answer within the `percentile` of the recent latency,
+        the same request is sent on another pooled connection. The loser gets
+        cancelled by aborting its connection. Hedges are capped at `max_rate` of all
+        requests, so a slow upstream doesn't get multiplied load.
+
+        Parameters
+        ----------
+        factory : Optional[Callable[[], :class:`connection.ApiConnection`]]
+            Creates the pooled connections. Without it, the first client that uses the hedger
+            binds it to connections with the client's own host, timeouts, retry policy and so on.
+
+        percentile : [:class:`float`]
+            The latency percentile after which the hedge is sent.
+
+        min_delay : [:class:`float`]
+            The minimum delay in seconds before a hedge is sent.
+
+        max_rate : [:class:`float`]
+            The maximum share of requests that get a hedge, e.x. 0.05 for 5%.
+
+        pool_size : [:class:`int`]
+            The amount of pooled connections.
+
+        window : [:class:`int`]
+            The amount of recent requests used for the percentile.
+        """
+
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+
+        self.pool_size = pool_size
+        self.pool: Optional[ConnectionPool] = None
+        self.latency = LatencyTracker(window)
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+
+        if factory is not None:
+            self.bind(factory)
+
+    def bind(self, factory: Callable) -> None:
+        """ Sets the factory of the pooled connections, only the first factory is used """
+
+        with self._lock:
+            if self.pool is None:
+                self.pool = ConnectionPool(factory, self.pool_size)
+
+    def _send(self, url: str, headers: dict, attempt: _Attempt) -> Tuple[bytes, HTTPMessage, float]:
+        conn = self.pool.acquire()
+
+        with attempt.lock:
+            if attempt.cancelled:
+                self.pool.release(conn)
+                raise ConnectionAbortedError('The hedged request was cancelled before it was sent')
+
+            attempt.conn = conn
+
+        start = time.perf_counter()
+
+        try:
+            res, header = conn.get(url, headers=headers)
+            # The wrapper only finishes the timing of its own connection.
+            conn._finish_timing()
+        finally:
+            with attempt.lock:
+                # A cancelled attempt's connection was aborted and discarded by the winner.
+                owned = attempt.conn is conn
+                attempt.conn = None
+
+            if owned:
+                self.pool.release(conn)
+
+        return res, header, time.perf_counter() - start
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.requests * self.max_rate:
+                return False
+
+            self.hedges += 1
+            return True
+
+    def get(self, url: str, headers: dict) -> Tuple[bytes, HTTPMessage]:
+        """ The same as :meth:`ApiConnection.get` but with a hedge for slow answers
+
+        Raises
+        ------
+        RuntimeError
+            When the hedger has no connection factory, see `bind`.
+        """
+
+        if self.pool is None:
+            raise RuntimeError('The hedger has no connection factory, pass it to a client or call bind')
+
+        with self._lock:
+            self.requests += 1
+
+        primary_attempt, hedge_attempt = _Attempt(), _Attempt()
+        # Every submit needs its own context copy, so the current deadline reaches the threads.
+        primary = self._executor.submit(copy_context().run, self._send, url, headers, primary_attempt)
+        hedge = None
+        futures = {primary}
+
+        delay = self.latency.percentile(self.percentile)
+
+        if delay is not None:
+            done, _ = wait(futures, timeout=max(delay, self.min_delay))
+
+            if not done and self._allow_hedge():
+                hedge = self._executor.submit(copy_context().run, self._send, url, headers, hedge_attempt)
+                futures.add(hedge)
+
+        error = None
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                futures.discard(future)
+
+                try:
+                    res, header, took = future.result()
+                except BaseException as e:
+                    error = e
+                    continue
+
+                # Cancel the loser, its place in the pool is free at once and not when its request unwinds.
+                loser, attempt = (hedge, hedge_attempt) if future is primary else (primary, primary_attempt)
+
+                if loser is not None:
+                    conn = attempt.cancel()
+
+                    if conn is not None:
+                        self.pool.discard(conn)
+
+                if future is not primary:
+                    with self._lock:
+                        self.hedge_wins += 1
+
+                self.latency.add(took)
+                return res, header
+
+        raise error
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+        if self.pool is not None:
+            self.pool.close()
+
+    def __repr__(self):
+        return f'<requests={self.requests} hedges={self.hedges} hedge_wins={self.hedge_wins}>'
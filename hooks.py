@@ -0,0 +1,80 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class RequestTiming:
+    """ The timing of one request, split into its phases. All durations are in seconds. """
+
+    # The request method, e.x. `GET`.
+    method: str
+
+    # The requested url with the query.
+    url: str
+
+    # The endpoint template, e.x. `anime/{}`, or the url path when it's not a declared endpoint.
+    endpoint: str
+
+    # The http status code, None when no response was received.
+    status: Optional[int] = None
+
+    # The size of the response body.
+    bytes: int = 0
+
+    # The `X-RateLimit-Remaining` header of the response.
+    ratelimit_remaining: Optional[str] = None
+
+    # The amount of tries, more than 1 when the retry policy kicked in.
+    attempts: int = 1
+
+    # Opening the tcp connection.
+    connect: float = 0.0
+
+    # The TLS handshake.
+    tls: float = 0.0
+
+    # From sending the request until the response headers arrived.
+    ttfb: float = 0.0
+
+    # Reading the response body.
+    read: float = 0.0
+
+    # Decoding the json in `dataproc.create_data_dict`.
+    decode: float = 0.0
+
+    # Building the objects, e.x. `AnimeObj(**doc)`.
+    build: float = 0.0
+
+    # The error that was raised, None when the request worked.
+    error: Optional[BaseException] = None
+
+    @property
+    def total(self) -> float:
+        return self.connect + self.tls + self.ttfb + self.read + self.decode + self.build
+
+    def __repr__(self):
+        return f'<endpoint={self.endpoint!r} status={self.status} bytes={self.bytes} ' \
+               f'connect={self.connect:.4f} tls={self.tls:.4f} ttfb={self.ttfb:.4f} read={self.read:.4f} ' \
+               f'decode={self.decode:.4f} build={self.build:.4f}>'
@@ -0,0 +1,133 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import sys
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# The fields whose dict keys are locales, e.x. `{'en': ..., 'jp': ...}`.
+KEY_FIELDS = frozenset(('titles', 'descriptions'))
+
+# The fields that contain a list of short repeating strings.
+LIST_FIELDS = frozenset(('genres',))
+
+# The fields that contain a short repeating string.
+VALUE_FIELDS = frozenset(('locale', 'format', 'artist', 'album', 'localization', 'weekly_airing_day'))
+
+
+@dataclass(frozen=True)
+class InternStats:
+    """ The counters of a :class:`StringInterner` """
+
+    # How often a string was replaced by an already known instance.
+    hits: int
+
+    # How often a string was added to the table.
+    misses: int
+
+    # How often a string wasn't added because the table was full.
+    rejected: int
+
+    # The amount of strings inside the table.
+    size: int
+
+    # The bytes that were saved by sharing instances, measured with `sys.getsizeof`.
+    bytes_saved: int
+
+    def __repr__(self):
+        return f'<size={self.size} hits={self.hits} misses={self.misses} ' \
+               f'rejected={self.rejected} bytes_saved={self.bytes_saved}>'
+
+
+class StringInterner:
+    def __init__(self, max_size: int = 65536, max_length: int = 64):
+        """ Shares one instance between equal strings while the objects get built.
+
+        The table is bounded, when it's full new strings are passed through
+        unchanged, so it can't grow without limit on long crawls.
+
+        Parameters
+        ----------
+        max_size : [:class:`int`]
+            The maximum amount of strings inside the table.
+
+        max_length : [:class:`int`]
+            Longer strings are never interned, they rarely repeat.
+        """
+
+        self.max_size = max_size
+        self.max_length = max_length
+
+        self._table: Dict[str, str] = {}
+        self._hits = 0
+        self._misses = 0
+        self._rejected = 0
+        self._saved = 0
+
+    def intern(self, value: Optional[str]) -> Optional[str]:
+        """ Returns the shared instance for the given string """
+
+        if value is None or len(value) > self.max_length:
+            return value
+
+        known = self._table.get(value)
+
+        if known is not None:
+            if known is not value:
+                self._hits += 1
+                self._saved += sys.getsizeof(value)
+            return known
+
+        if len(self._table) >= self.max_size:
+            self._rejected += 1
+            return value
+
+        self._misses += 1
+        self._table[value] = value
+        return value
+
+    def intern_document(self, doc: dict) -> dict:
+        """ Interns the known repeating fields of a raw Api document in place """
+
+        intern = self.intern
+
+        for key in KEY_FIELDS.intersection(doc):
+            if doc[key]:
+                doc[key] = {intern(k): v for k, v in doc[key].items()}
+
+        for key in LIST_FIELDS.intersection(doc):
+            if doc[key]:
+                doc[key] = [intern(v) for v in doc[key]]
+
+        for key in VALUE_FIELDS.intersection(doc):
+            if isinstance(doc[key], str):
+                doc[key] = intern(doc[key])
+
+        return doc
+
+    def stats(self) -> InternStats:
+        return InternStats(hits=self._hits, misses=self._misses, rejected=self._rejected,
+                           size=len(self._table), bytes_saved=self._saved)
+
+    def clear(self) -> None:
+        """ Empties the table, the counters are kept """
+        self._table.clear()
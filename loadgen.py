@@ -0,0 +1,431 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pool import ConnectionPool
+from ratelimit import RateLimiter
+from wrapper import AniApi
+
+MODES = ('sync', 'pooled', 'async')
+
+# The calls that a mix can contain, every one gets the client, a random generator and the highest id.
+OPERATIONS: Dict[str, Callable] = {
+    'anime': lambda api, rnd, ids: api.get_anime(rnd.randint(1, ids)),
+    'anime_page': lambda api, rnd, ids: api.get_anime(page=rnd.randint(1, max(1, ids // 100))),
+    'random_anime': lambda api, rnd, ids: api.get_random_anime(rnd.randint(1, 50)),
+    'episode': lambda api, rnd, ids: api.get_episode(rnd.randint(1, ids * 3)),
+    'episode_page': lambda api, rnd, ids: api.get_episode(anime_id=rnd.randint(1, ids)),
+    'song': lambda api, rnd, ids: api.get_song(rnd.randint(1, ids * 2)),
+    'random_song': lambda api, rnd, ids: api.get_random_song(rnd.randint(1, 50)),
+    'resources': lambda api, rnd, ids: api.get_resources(1.0, rnd.randint(0, 1)),
+    'user': lambda api, rnd, ids: api.get_user(rnd.randint(1, 100)),
+    'auth_me': lambda api, rnd, ids: api.auth_me(api.headers['Authorization'][7:]),
+}
+
+DEFAULT_MIX = 'anime=6,anime_page=2,episode=1,song=1'
+
+# The SLOs that are upper bounds, every other one (`throughput`) is a lower bound.
+MAX_SLOS = ('mean', 'p50', 'p90', 'p95', 'p99', 'max', 'error_rate')
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    """ Parses a mix like `anime=6,episode=1` into (operation, weight) pairs
+
+    Raises
+    ------
+    ValueError
+        When an operation is unknown or a weight isn't a positive number.
+    """
+
+    mix = []
+
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+
+        if name not in OPERATIONS:
+            raise ValueError(f'Unknown operation {name!r}, choose from {", ".join(OPERATIONS)}')
+
+        weight = float(weight or 1)
+
+        if weight <= 0:
+            raise ValueError(f'The weight of {name} must be positive')
+
+        mix.append((name, weight))
+
+    return mix
+
+
+def parse_slos(items: List[str]) -> Dict[str, float]:
+    """ Parses SLOs like `p99=0.25` (seconds), `error_rate=0.01` or `throughput=200` (per second) """
+
+    slos = {}
+
+    for item in items:
+        name, _, value = item.partition('=')
+
+        if name not in MAX_SLOS and name != 'throughput':
+            raise ValueError(f'Unknown SLO {name!r}, choose from {", ".join(MAX_SLOS + ("throughput",))}')
+
+        slos[name] = float(value)
+
+    return slos
+
+
+@dataclass
+class LoadReport:
+    """ The result of one load run, the latency values are in seconds """
+
+    # The client mode, one of `MODES`.
+    mode: str
+
+    # The concurrency and the measured time, without the ramp.
+    concurrency: int
+    duration: float
+
+    # The finished calls after the ramp, the failed ones and the ones answered with 429.
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+
+    # The calls per second after the ramp.
+    throughput: float = 0.0
+
+    # The share of failed calls, exceptions and 5xx responses.
+    error_rate: float = 0.0
+
+    # The time the workers waited for the rate limiter.
+    ratelimit_wait: float = 0.0
+
+    # mean, p50, p90, p95, p99 and max.
+    latency: Dict[str, float] = field(default_factory=dict)
+
+    # The calls and errors per operation, the errors by exception or status.
+    operations: Dict[str, int] = field(default_factory=dict)
+    error_types: Dict[str, int] = field(default_factory=dict)
+
+    def check(self, slos: Dict[str, float]) -> List[str]:
+        """ Returns the violated SLOs as readable lines, an empty list means pass """
+
+        failed = []
+
+        for name, limit in slos.items():
+            if name == 'throughput':
+                value = self.throughput
+
+                if value < limit:
+                    failed.append(f'throughput {value:.1f}/s < {limit:g}/s')
+                continue
+
+            value = self.error_rate if name == 'error_rate' else self.latency.get(name, float('inf'))
+
+            if value > limit:
+                failed.append(f'{name} {value:.4f} > {limit:g}')
+
+        return failed
+
+    def __str__(self):
+        lines = [f'mode={self.mode} concurrency={self.concurrency} duration={self.duration:.1f}s',
+                 f'requests={self.requests} throughput={self.throughput:.1f}/s errors={self.errors} '
+                 f'error_rate={self.error_rate:.2%} throttled={self.throttled} '
+                 f'ratelimit_wait={self.ratelimit_wait:.2f}s',
+                 'latency ' + ' '.join(f'{k}={v * 1000:.1f}ms' for k, v in self.latency.items())]
+
+        if self.error_types:
+            lines.append('error types ' + ' '.join(f'{k}={v}' for k, v in self.error_types.items()))
+
+        return '\n'.join(lines)
+
+
+class LoadGenerator:
+    def __init__(self, url: str, mode: str = 'sync', concurrency: int = 8, duration: float = 10.0,
+                 ramp: float = 0.0, mix: List[Tuple[str, float]] = None, token: str = '', rate: float = None,
+                 ids: int = 1000, timeout: float = 10.0, pool_size: int = None, seed: int = 0):
+        """ Drives a mix of :class:`AniApi` calls against a base url, e.x. a `server.StandInServer`.
+
+        Parameters
+        ----------
+        url : [:class:`str`]
+            The base url, e.x. `http://127.0.0.1:8080` or `https://api.aniapi.com`.
+
+        mode : [:class:`str`]
+            `sync` gives every worker thread its own client, `pooled` lets the workers share a
+            :class:`ConnectionPool` of `pool_size` clients and `async` runs the workers as asyncio
+            tasks that call the pooled clients through an executor.
+
+        concurrency : [:class:`int`]
+            The amount of workers.
+
+        duration : [:class:`float`]
+            The measured time in seconds, after the ramp.
+
+        ramp : [:class:`float`]
+            The time in seconds over which the workers start one after the other, it's not measured.
+
+        mix : Optional[List[Tuple[:class:`str`, :class:`float`]]]
+            The operations with their weight, see `OPERATIONS` and `parse_mix`.
+
+        token : [:class:`str`]
+            The Api token.
+
+        rate : Optional[:class:`float`]
+            The maximum requests per second of all workers together, waits are reported.
+
+        ids : [:class:`int`]
+            The highest anime id, the random ids are picked below it.
+
+        timeout : [:class:`float`]
+            The timeout per request.
+
+        pool_size : Optional[:class:`int`]
+            The amount of clients for `pooled` and `async`, defaults to `concurrency`.
+
+        seed : [:class:`int`]
+            The seed for the operation and id choice.
+
+        Raises
+        ------
+        ValueError
+            When the mode or the url scheme is unknown.
+        """
+
+        if mode not in MODES:
+            raise ValueError(f'Unknown mode {mode!r}, choose from {", ".join(MODES)}')
+
+        split = urlsplit(url)
+
+        if split.scheme not in ('http', 'https'):
+            raise ValueError(f'The url needs an http or https scheme, got {url!r}')
+
+        self.client_kwargs = {'token': token, 'timeout': timeout, 'host': split.hostname, 'port': split.port,
+                              'scheme': split.scheme}
+
+        self.mode = mode
+        self.concurrency = concurrency
+        self.duration = duration
+        self.ramp = ramp
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.ids = ids
+        self.pool_size = pool_size or concurrency
+        self.seed = seed
+        self.limiter = RateLimiter(rate, 1.0, burst=max(1, int(rate))) if rate else None
+
+        # (end time, latency, operation, error) per finished call.
+        self._samples: List[Tuple[float, float, str, Optional[str]]] = []
+        self._names = [name for name, _ in self.mix]
+        self._weights = [weight for _, weight in self.mix]
+
+    def _client(self) -> AniApi:
+        return AniApi(**self.client_kwargs)
+
+    def _call(self, api: AniApi, rnd: random.Random, end: float) -> None:
+        """ Sends one random operation of the mix and records its latency and outcome """
+
+        limiter = self.limiter
+
+        if limiter is not None:
+            left = end - time.perf_counter()
+
+            if left <= 0 or not limiter.acquire(timeout=left):
+                return
+
+        name = rnd.choices(self._names, self._weights)[0]
+        error = None
+        start = time.perf_counter()
+
+        try:
+            ctx = OPERATIONS[name](api, rnd, self.ids)
+        except Exception as e:
+            error = type(e).__name__
+        else:
+            if ctx.status_code == 429 or ctx.status_code >= 500:
+                error = str(ctx.status_code)
+
+            if limiter is not None:
+                limiter.update(ctx.ratelimit)
+
+        done = time.perf_counter()
+        self._samples.append((done, done - start, name, error))
+
+    def _worker(self, index: int, start: float, end: float, client: Callable) -> None:
+        rnd = random.Random(self.seed * 10_007 + index)
+        begin = start + self.ramp * index / self.concurrency
+
+        if begin > time.perf_counter():
+            time.sleep(begin - time.perf_counter())
+
+        while time.perf_counter() < end:
+            client(rnd, end)
+
+    def _run_threads(self, start: float, end: float) -> None:
+        if self.mode == 'sync':
+            local = threading.local()
+
+            def client(rnd, until):
+                api = getattr(local, 'api', None)
+
+                if api is None:
+                    api = local.api = self._client()
+
+                self._call(api, rnd, until)
+        else:
+            pool = ConnectionPool(self._client, self.pool_size)
+
+            def client(rnd, until):
+                with pool.connection() as api:
+                    self._call(api, rnd, until)
+
+        threads = [threading.Thread(target=self._worker, args=(i, start, end, client), daemon=True)
+                   for i in range(self.concurrency)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    async def _run_async(self, start: float, end: float) -> None:
+        loop = asyncio.get_running_loop()
+        pool = ConnectionPool(self._client, self.pool_size)
+
+        def call(rnd, until):
+            with pool.connection() as api:
+                self._call(api, rnd, until)
+
+        async def worker(index: int):
+            rnd = random.Random(self.seed * 10_007 + index)
+            await asyncio.sleep(max(0.0, start + self.ramp * index / self.concurrency - time.perf_counter()))
+
+            while time.perf_counter() < end:
+                await loop.run_in_executor(executor, call, rnd, end)
+
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='loadgen') as executor:
+            await asyncio.gather(*(worker(i) for i in range(self.concurrency)))
+
+    def run(self) -> LoadReport:
+        """ Runs the load for the ramp and the duration, returns the report of the measured part """
+
+        self._samples = []
+        start = time.perf_counter()
+        measured = start + self.ramp
+        end = measured + self.duration
+
+        if self.mode == 'async':
+            asyncio.run(self._run_async(start, end))
+        else:
+            self._run_threads(start, end)
+
+        return self._report(measured, time.perf_counter())
+
+    def _report(self, measured: float, stopped: float) -> LoadReport:
+        samples = [s for s in self._samples if s[0] >= measured]
+        duration = max(stopped - measured, 1e-9)
+
+        report = LoadReport(mode=self.mode, concurrency=self.concurrency, duration=duration,
+                            ratelimit_wait=self.limiter.waited if self.limiter is not None else 0.0)
+
+        if not samples:
+            return report
+
+        latencies = sorted(s[1] for s in samples)
+        n = len(latencies)
+
+        report.requests = n
+        report.throughput = n / duration
+        report.latency = {'mean': sum(latencies) / n,
+                          'p50': latencies[n // 2],
+                          'p90': latencies[min(n - 1, int(n * 0.90))],
+                          'p95': latencies[min(n - 1, int(n * 0.95))],
+                          'p99': latencies[min(n - 1, int(n * 0.99))],
+                          'max': latencies[-1]}
+
+        for _, _, name, error in samples:
+            report.operations[name] = report.operations.get(name, 0) + 1
+
+            if error is None:
+                continue
+
+            report.error_types[error] = report.error_types.get(error, 0) + 1
+
+            if error == '429':
+                report.throttled += 1
+            else:
+                report.errors += 1
+
+        report.error_rate = report.errors / n
+        return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Drives a mix of AniApi calls and checks the results against SLOs.')
+    parser.add_argument('url', help='the base url, e.x. http://127.0.0.1:8080')
+    parser.add_argument('-m', '--mode', choices=MODES, default='sync')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='the measured seconds')
+    parser.add_argument('-r', '--ramp', type=float, default=0.0, help='the seconds to start all workers')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'operation=weight pairs, from {", ".join(OPERATIONS)}')
+    parser.add_argument('--token', default='')
+    parser.add_argument('--rate', type=float, help='the maximum requests per second of all workers')
+    parser.add_argument('--ids', type=int, default=1000, help='the highest anime id of the catalog')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--pool-size', type=int, help='the clients of the pooled and async mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--slo', action='append', default=[],
+                        help='e.x. p99=0.25, error_rate=0.01 or throughput=200, can be repeated')
+    parser.add_argument('-o', '--output', help='write the report as json to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        slos = parse_slos(args.slo)
+        generator = LoadGenerator(args.url, mode=args.mode, concurrency=args.concurrency, duration=args.duration,
+                                  ramp=args.ramp, mix=parse_mix(args.mix), token=args.token, rate=args.rate,
+                                  ids=args.ids, timeout=args.timeout, pool_size=args.pool_size, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = generator.run()
+    failed = report.check(slos)
+
+    print(report)
+
+    for name, limit in slos.items():
+        print(f'SLO {name}={limit:g} ' + ('FAIL' if any(line.startswith(name + ' ') for line in failed) else 'PASS'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({**asdict(report), 'slos': slos, 'failed': failed}, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
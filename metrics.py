@@ -0,0 +1,345 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from hooks import RequestTiming
+
+# The default latency buckets in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} expects the labels {self.labels}, got {tuple(labels)}')
+
+        return tuple(labels[name] for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f'# HELP {self.name} {_escape(self.documentation)}\n# TYPE {self.name} {self.kind}\n'
+        return head + ''.join(line + '\n' for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """ The value is read from the function every time the metrics get rendered, it must only go up """
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+
+        if key in self._functions:
+            return self._functions[key]()
+
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            items += [(key, function()) for key, function in self._functions.items()]
+
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}' for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """ The value is read from the function every time the metrics get rendered """
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels) -> Optional[float]:
+        key = self._key(labels)
+
+        if key in self._functions:
+            return self._functions[key]()
+
+        return self._values.get(key)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            items += [(key, function()) for key, function in self._functions.items()]
+
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}' for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+        # Per label set: the count per bucket (the last one is +Inf), the sum and the count.
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            entry = self._values.get(key)
+
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+
+        lines = []
+
+        for key, counts, total, count in items:
+            cumulative = 0
+
+            for bound, amount in zip(self.buckets + (float('inf'),), counts):
+                cumulative += amount
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}')
+
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {count}')
+
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """ Holds the metrics and renders them in the Prometheus text format """
+
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'{name} is already registered as {metric.kind}')
+
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """ Returns all metrics in the Prometheus text exposition format """
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return ''.join(metric.render() for metric in metrics)
+
+
+class ClientMetrics:
+    # The numeric value of the circuit breaker states for the gauge.
+    BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def __init__(self, registry: MetricsRegistry = None, buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 prefix: str = 'aniapi'):
+        """ Feeds the request metrics of one or more clients into a registry.
+
+        Parameters
+        ----------
+        registry : Optional[:class:`MetricsRegistry`]
+            The registry for the metrics, a new one when not given.
+
+        buckets : Iterable[:class:`float`]
+            The latency histogram buckets in seconds.
+
+        prefix : [:class:`str`]
+            The prefix for all metric names.
+
+        Examples
+        --------
+        >>> metrics = ClientMetrics()
+        >>> metrics.attach(api)
+        >>> serve(metrics.registry, port=9100)
+        """
+
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+
+        self.requests = r.counter(f'{prefix}_requests_total', 'The sent requests.', ('endpoint', 'status'))
+        self.errors = r.counter(f'{prefix}_request_errors_total', 'The requests without a response.',
+                                ('endpoint', 'error'))
+        self.latency = r.histogram(f'{prefix}_request_duration_seconds', 'The request latency, including decode '
+                                   'and object build.', ('endpoint',), buckets=buckets)
+        self.bytes = r.counter(f'{prefix}_response_bytes_total', 'The received body bytes.', ('endpoint',))
+        self.ratelimit = r.gauge(f'{prefix}_ratelimit_remaining', 'The remaining requests reported by the Api.',
+                                 ('endpoint',))
+        self.cache = r.counter(f'{prefix}_cache_requests_total', 'The cache lookups.', ('cache', 'result'))
+        self.breaker = r.gauge(f'{prefix}_circuit_breaker_state', 'The breaker state, 0 closed, 1 half open, 2 open.',
+                               ('breaker',))
+        self.breaker_rejected = r.counter(f'{prefix}_circuit_breaker_rejected_total',
+                                          'The requests rejected by the breaker.', ('breaker',))
+
+    def attach(self, client) -> None:
+        """ Registers the metrics hook on the client, also watches its circuit breaker """
+
+        client.add_hook(self.observe)
+
+        if getattr(client, 'breaker', None) is not None:
+            self.watch_breaker(client.breaker)
+
+    def observe(self, timing: RequestTiming) -> None:
+        """ The hook, see :meth:`connection.ApiConnection.add_hook` """
+
+        endpoint = timing.endpoint
+
+        if timing.error is not None:
+            self.errors.inc(endpoint=endpoint, error=type(timing.error).__name__)
+            return
+
+        self.requests.inc(endpoint=endpoint, status=timing.status)
+        self.latency.observe(timing.total, endpoint=endpoint)
+        self.bytes.inc(timing.bytes, endpoint=endpoint)
+
+        if timing.ratelimit_remaining is not None:
+            try:
+                self.ratelimit.set(float(timing.ratelimit_remaining), endpoint=endpoint)
+            except ValueError:
+                pass
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """ Counts a cache lookup, the hit ratio is `hit / (hit + miss)` """
+        self.cache.inc(cache=cache, result='hit' if hit else 'miss')
+
+    def watch_breaker(self, breaker, name: str = 'default') -> None:
+        self.breaker.set_function(lambda: self.BREAKER_STATES[breaker.state], breaker=name)
+        self.breaker_rejected.set_function(lambda: breaker.rejected, breaker=name)
+
+
+def make_handler(registry: MetricsRegistry, path: str = '/metrics'):
+    """ Returns a :class:`BaseHTTPRequestHandler` class that serves the registry at `path` """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != path:
+                self.send_error(404)
+                return
+
+            body = registry.render().encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve(registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9100) -> ThreadingHTTPServer:
+    """ Serves the registry from a daemon thread, stop it with `server.shutdown()` """
+
+    server = ThreadingHTTPServer((host, port), make_handler(registry))
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
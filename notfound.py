@@ -0,0 +1,216 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+# The header of a saved bitmap, the magic and the highest id.
+_HEADER = struct.Struct('<4sQ')
+_MAGIC = b'AKID'
+
+
+class KnownIds:
+    def __init__(self, ids: Iterable[int] = ()):
+        """ A bitmap of the ids that exist, one bit per id up to the highest known id.
+
+        The AniApi ids are dense, so 20000 animes take 2.5KB. Ids above the highest
+        known id are never rejected, they may have been added after the bitmap was built.
+        Build it from an unfiltered crawl, an id that is left out is rejected.
+
+        Parameters
+        ----------
+        ids : Iterable[:class:`int`]
+            The existing ids, e.x. of a crawl.
+        """
+
+        self.max_id = 0
+        self._bits = bytearray()
+
+        for _id in ids:
+            self.add(_id)
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> 'KnownIds':
+        """ Builds the bitmap from the `id` of every line of a JSON Lines catalog, e.x. of `crawl.ShardedCrawler` """
+
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.loads(line)['id'] for line in f if line.strip())
+
+    @classmethod
+    def load(cls, path: str) -> 'KnownIds':
+        with open(path, 'rb') as f:
+            magic, max_id = _HEADER.unpack(f.read(_HEADER.size))
+
+            if magic != _MAGIC:
+                raise ValueError(f'{path!r} is not a known ids bitmap')
+
+            known = cls()
+            known.max_id = max_id
+            known._bits = bytearray(f.read())
+
+        return known
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.max_id))
+            f.write(self._bits)
+
+    def add(self, _id: int) -> None:
+        _id = int(_id)
+
+        if _id <= 0:
+            return
+
+        if _id >= len(self._bits) * 8:
+            self._bits.extend(bytes(_id // 8 + 1 - len(self._bits)))
+
+        self._bits[_id >> 3] |= 1 << (_id & 7)
+        self.max_id = max(self.max_id, _id)
+
+    def __contains__(self, _id: int) -> bool:
+        return 0 < _id <= self.max_id and bool(self._bits[_id >> 3] & (1 << (_id & 7)))
+
+    def rejects(self, _id: int) -> bool:
+        """ True when the id can't exist, it's inside the known range but not set """
+        return _id <= 0 or (_id <= self.max_id and not self._bits[_id >> 3] & (1 << (_id & 7)))
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+    def __repr__(self):
+        return f'<max_id={self.max_id} bytes={len(self._bits)}>'
+
+
+class NegativeCache:
+    def __init__(self, ttl: float = 60.0, max_size: int = 100_000, known: Optional[Dict[str, KnownIds]] = None,
+                 metrics=None):
+        """ Remembers the ids that answered 404, so the same miss doesn't cost another round trip.
+
+        Parameters
+        ----------
+        ttl : [:class:`float`]
+            How long a miss is remembered in seconds, keep it short, new ids appear all the time.
+
+        max_size : [:class:`int`]
+            The amount of remembered misses, the oldest one is dropped first.
+
+        known : Optional[Dict[:class:`str`, :class:`KnownIds`]]
+            The existing ids per entity, `anime`, `episode` or `song`. Ids that the bitmap
+            rejects are answered locally without ever asking the Api.
+
+        metrics : Optional[:class:`metrics.ClientMetrics`]
+            Counts the hits and misses as the `not_found` cache.
+
+        Examples
+        --------
+        >>> known = {'anime': KnownIds.from_jsonl('anime.jsonl')}
+        >>> api = AniApi(token, negative_cache=NegativeCache(ttl=30, known=known))
+        >>> api.get_anime(999999).status_code  # answered locally
+        404
+        """
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.known = known or {}
+        self.metrics = metrics
+
+        # The lookups that were answered locally, by the bitmap or a remembered miss, and the ones that weren't.
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+        self._misses: 'OrderedDict[Tuple[str, int], float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if self.metrics is not None:
+            self.metrics.record_cache('not_found', hit)
+
+    def is_missing(self, entity: str, _id: int) -> bool:
+        """ True when the id is known not to exist, the request can be skipped """
+
+        known = self.known.get(entity)
+
+        if known is not None and known.rejects(_id):
+            self.rejected += 1
+            self._count(True)
+            return True
+
+        key = (entity, _id)
+
+        with self._lock:
+            expires = self._misses.get(key)
+
+            if expires is not None and expires <= time.monotonic():
+                del self._misses[key]
+                expires = None
+
+            self._count(expires is not None)
+
+        return expires is not None
+
+    def record(self, entity: str, _id: int, status_code: int) -> None:
+        """ Remembers a 404, a 200 forgets an earlier miss and marks the id as known """
+
+        key = (entity, _id)
+
+        if status_code == 404:
+            with self._lock:
+                self._misses[key] = time.monotonic() + self.ttl
+                self._misses.move_to_end(key)
+
+                while len(self._misses) > self.max_size:
+                    self._misses.popitem(last=False)
+
+        elif status_code == 200:
+            known = self.known.get(entity)
+
+            with self._lock:
+                self._misses.pop(key, None)
+
+                if known is not None:
+                    known.add(_id)
+
+    def invalidate(self, entity: str, _id: int) -> bool:
+        """ Forgets a miss, e.x. when the id was just created. Returns if it was remembered """
+
+        with self._lock:
+            return self._misses.pop((entity, _id), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._misses.clear()
+
+    def __len__(self) -> int:
+        return len(self._misses)
+
+    def __repr__(self):
+        return f'<size={len(self._misses)} hits={self.hits} misses={self.misses} rejected={self.rejected}>'
@@ -0,0 +1,123 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, Iterator
+
+from deadline import Deadline
+from objects import DataObj
+
+
+def iter_pages(method: Callable, deadline: Deadline = None, **kwargs) -> Iterator[DataObj]:
+    """ Yields every page of a list request, e.x. `iter_pages(api.get_anime, status=1)`.
+
+    Parameters
+    ----------
+    method : Callable
+        A list method of :class:`wrapper.AniApi`, e.x. `api.get_episode`.
+
+    deadline : Optional[:class:`Deadline`]
+        When the deadline is spent, the iteration stops cleanly after the last complete page.
+
+    kwargs
+        The filters for the list request, `page` sets the first page.
+
+    Returns
+    -------
+    Iterator[:class:`DataObj`]
+        The pages, until the last page or the deadline.
+
+    Raises
+    ------
+    RuntimeError
+        When a page answers anything but 200 or 404, e.x. a 503 that ran out of retries.
+    """
+
+    page = kwargs.pop('page', 1)
+
+    while deadline is None or not deadline.expired:
+        try:
+            with deadline or nullcontext():
+                ctx = method(page=page, **kwargs)
+        except TimeoutError:
+            if deadline is not None and deadline.expired:
+                return
+            raise
+
+        # The Api answers a page past the end or a filter without matches with 404.
+        if ctx.status_code == 404:
+            return
+
+        data = ctx.data
+
+        if ctx.status_code != 200 or not isinstance(data, DataObj):
+            raise RuntimeError(f'The page {page} answered {ctx.status_code}: {ctx.message}')
+
+        if not data.documents:
+            return
+
+        yield data
+
+        if page >= data.last_page:
+            return
+
+        page += 1
+
+
+def get_many(method: Callable, ids: Iterable[int], deadline: Deadline = None) -> Dict[int, object]:
+    """ Looks up many ids one after the other, e.x. `get_many(api.get_anime, [1, 2, 3])`.
+
+    Parameters
+    ----------
+    method : Callable
+        A get method of :class:`wrapper.AniApi` that takes an id.
+
+    ids : Iterable[:class:`int`]
+        The ids to look up.
+
+    deadline : Optional[:class:`Deadline`]
+        When the deadline is spent, the objects found so far are returned.
+
+    Returns
+    -------
+    Dict[:class:`int`, :class:`object`]
+        The found objects by id, ids that don't exist are left out.
+    """
+
+    found = {}
+
+    for _id in ids:
+        if deadline is not None and deadline.expired:
+            break
+
+        try:
+            with deadline or nullcontext():
+                ctx = method(_id)
+        except TimeoutError:
+            if deadline is not None and deadline.expired:
+                break
+            raise
+
+        if ctx.status_code == 200:
+            found[_id] = ctx.data
+
+    return found
@@ -0,0 +1,116 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+class ConnectionPool:
+    def __init__(self, factory: Callable, size: int = 4):
+        """ A thread safe pool of connections.
+
+        A :class:`http.client.HTTPConnection` can only handle one request at a time,
+        the pool hands every thread its own connection and keeps them open for reuse.
+
+        Parameters
+        ----------
+        factory : Callable[[], :class:`connection.ApiConnection`]
+            Creates a new connection, it's called lazily up to `size` times.
+
+        size : [:class:`int`]
+            The maximum amount of connections.
+        """
+
+        self.factory = factory
+        self.size = size
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None):
+        """ Takes an idle connection or creates a new one, blocks when all connections are in use.
+
+        Raises
+        ------
+        queue.Empty
+            When no connection got free within the timeout.
+        """
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self.factory()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn) -> None:
+        self._idle.put(conn)
+
+    def discard(self, conn) -> None:
+        """ Closes a connection instead of releasing it, its place in the pool is free again """
+
+        conn.close()
+
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator:
+        conn = self.acquire(timeout)
+
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """ Closes all idle connections, they reconnect on their next request """
+
+        idle = []
+
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+        for conn in idle:
+            conn.close()
+            self._idle.put(conn)
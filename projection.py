@@ -0,0 +1,126 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import sys
+from dataclasses import MISSING, dataclass, fields, is_dataclass, make_dataclass
+from typing import Dict, Optional, Tuple
+
+# The projected objects don't need a `__dict__`, slots are only there since python 3.10.
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# The checked field names per (model, projection), a projection is only checked on its first use.
+_CHECKED: Dict[Tuple[type, type], Tuple[str, ...]] = {}
+
+
+def project(model: type, *names: str, name: Optional[str] = None) -> type:
+    """ Creates a lightweight frozen dataclass with only the given fields of a model.
+
+    The fields keep the type and the default of the model, every other field of the
+    document is skipped while the objects are built.
+
+    Parameters
+    ----------
+    model : [:class:`type`]
+        The full object, e.x. :class:`AnimeObj`.
+
+    names : [:class:`str`]
+        The fields to keep.
+
+    name : Optional[:class:`str`]
+        The class name, defaults to e.x. `AnimeObjProjection`.
+
+    Raises
+    ------
+    ValueError
+        When a field isn't part of the model or no field is given.
+
+    Examples
+    --------
+    >>> Card = project(AnimeObj, 'id', 'titles', 'score')
+    >>> api.get_anime(projection=Card, genres='Action').data.documents[0].score
+    """
+
+    if not names:
+        raise ValueError('A projection needs at least one field')
+
+    known = {f.name: f for f in fields(model)}
+    unknown = [n for n in names if n not in known]
+
+    if unknown:
+        raise ValueError(f'{model.__name__} has no fields {unknown}')
+
+    # The fields with a default have to come last, as on the model.
+    spec = []
+
+    for f in sorted((known[n] for n in dict.fromkeys(names)), key=lambda f: f.default is not MISSING):
+        spec.append((f.name, f.type) if f.default is MISSING else (f.name, f.type, f.default))
+
+    return make_dataclass(name or f'{model.__name__}Projection', spec, frozen=True, **_SLOTS)
+
+
+def projected_fields(model: type, projection: type) -> Tuple[str, ...]:
+    """ Returns the fields of the projection, after checking that the model has all of them
+
+    Raises
+    ------
+    ValueError
+        When the projection isn't a dataclass or has fields that the model doesn't have.
+    """
+
+    key = (model, projection)
+    names = _CHECKED.get(key)
+
+    if names is not None:
+        return names
+
+    if model is None or not is_dataclass(projection):
+        raise ValueError(f'{projection!r} is not a projection of {getattr(model, "__name__", model)}')
+
+    names = tuple(f.name for f in fields(projection))
+    unknown = set(names) - {f.name for f in fields(model)}
+
+    if unknown:
+        raise ValueError(f'{model.__name__} has no fields {unknown}')
+
+    _CHECKED[key] = names
+    return names
+
+
+@dataclass(frozen=True, **_SLOTS)
+class AnimeCard:
+    """ The fields of an anime that a list view needs, without the descriptions, sagas or recommendations """
+
+    # The anime id.
+    id: int
+
+    # The titles organized by the locales.
+    titles: Dict[str, str]
+
+    # The score from 0 up to 100.
+    score: float
+
+    # The cover image url.
+    cover_image: str
+
+    def __repr__(self):
+        return f'<id={self.id} title={next(iter(self.titles.values()), None)!r} score={self.score}>'
+
@@ -0,0 +1,109 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+import time
+from typing import Optional
+
+from objects import RateLimit
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 90, per: float = 60.0, burst: Optional[int] = None):
+        """ A thread safe token bucket that keeps concurrent callers below the Api's rate limit.
+
+        Parameters
+        ----------
+        rate : [:class:`float`]
+            The amount of requests that are allowed per `per` seconds.
+
+        per : [:class:`float`]
+            The window in seconds. Default is 60, the AniApi allows 90 requests per minute.
+
+        burst : Optional[:class:`int`]
+            The amount of requests that can be sent at once, defaults to 1.
+        """
+
+        self.rate = rate / per
+        self.capacity = float(burst or 1)
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # The total time that callers waited inside `acquire`.
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """ Blocks until a request can be sent.
+
+        Parameters
+        ----------
+        timeout : Optional[:class:`float`]
+            The maximum time to wait, None waits forever.
+
+        Returns
+        -------
+        :class:`bool`
+            False when the timeout was reached before a token was free.
+        """
+
+        start = time.monotonic()
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited += now - start
+                    return True
+
+                wait = (1 - self._tokens) / self.rate
+
+            if timeout is not None:
+                left = timeout - (time.monotonic() - start)
+
+                if left <= 0:
+                    return False
+
+                wait = min(wait, left)
+
+            time.sleep(wait)
+
+    def update(self, ratelimit: RateLimit) -> None:
+        """ Drains the bucket when the Api reports that no requests are remaining """
+
+        try:
+            remaining = int(getattr(ratelimit, 'remaining', None))
+        except (TypeError, ValueError):
+            return
+
+        if remaining <= 0:
+            with self._lock:
+                self._refill(time.monotonic())
+                self._tokens = min(self._tokens, 0.0)
@@ -0,0 +1,313 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from endpoints import ENDPOINTS
+from utils import InvalidParamsValueException
+from utils.genres import genres as FALLBACK_GENRES
+
+# The resource types of `/resources/{version}/{type}`.
+GENRES = 0
+LOCALES = 1
+
+
+@dataclass(frozen=True)
+class ResourceSet:
+    """ The genres and locales of one resource version, replaced as a whole on refresh """
+
+    # The resource version, e.x. `1.0`.
+    version: str
+
+    # The genres and locales in the order of the Api.
+    genres: Tuple[str, ...]
+    locales: Tuple[str, ...]
+
+    # Where the data came from, `api`, `file` or `fallback`, and when it was fetched from the Api.
+    source: str = 'fallback'
+    fetched: float = 0.0
+
+    # The lookups, the genre index by name and by the case folded name.
+    genre_index: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+    folded_genres: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+    locale_set: frozenset = field(default=frozenset(), repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'genre_index', {name: i for i, name in enumerate(self.genres)})
+        object.__setattr__(self, 'folded_genres', {name.casefold(): i for i, name in enumerate(self.genres)})
+        object.__setattr__(self, 'locale_set', frozenset(self.locales))
+
+    def __repr__(self):
+        return f'<version={self.version!r} genres={len(self.genres)} locales={len(self.locales)} ' \
+               f'source={self.source!r}>'
+
+
+def _key(version) -> str:
+    return str(float(version)) if isinstance(version, (int, float)) else str(version)
+
+
+class Resources:
+    def __init__(self, make_client: Callable = None, version: float = 1.0, path: Optional[str] = None,
+                 refresh: Optional[float] = None, preload: bool = True, fallback_ttl: float = 60.0):
+        """ Keeps the genre and locale resources in memory, one download per version.
+
+        A version is loaded from the file first, then from the Api and when both
+        aren't available the static list of `utils.genres` is used, until the
+        download is tried again after `fallback_ttl` seconds.
+
+        Parameters
+        ----------
+        make_client : Optional[Callable[[], :class:`wrapper.AniApi`]]
+            Creates the client for the downloads, without it the resources stay offline.
+
+        version : [:class:`float`]
+            The default version for the lookups.
+
+        path : Optional[:class:`str`]
+            The JSON file that keeps the downloaded resources between runs.
+
+        refresh : Optional[:class:`float`]
+            Downloads the loaded versions again every `refresh` seconds from a daemon thread.
+
+        preload : [:class:`bool`]
+            Loads the default version right away.
+
+        fallback_ttl : [:class:`float`]
+            How long the static list stands in for a version that failed to download.
+
+        Examples
+        --------
+        >>> resources = Resources(lambda: AniApi(token), path='resources.json', refresh=3600)
+        >>> resources.is_genre('Action')
+        True
+        >>> api = AniApi(token, resources=resources)
+        """
+
+        self.make_client = make_client
+        self.version = _key(version)
+        self.path = path
+        self.refresh = refresh
+        self.fallback_ttl = fallback_ttl
+
+        # The error of the last failed download, None when it worked.
+        self.last_error: Optional[BaseException] = None
+
+        self._sets: Dict[str, ResourceSet] = {}
+        # When the versions that only have the fallback are downloaded again, as `time.monotonic` value.
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if preload:
+            self.get()
+
+        if refresh:
+            self.start()
+
+    # Loading and persisting.
+
+    def _read_file(self) -> Dict[str, dict]:
+        if self.path is None:
+            return {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_file(self) -> None:
+        if self.path is None:
+            return
+
+        with self._lock:
+            state = {version: {'genres': list(s.genres), 'locales': list(s.locales), 'fetched': s.fetched}
+                     for version, s in self._sets.items() if s.source != 'fallback'}
+
+        tmp = f'{self.path}.tmp'
+
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+        os.replace(tmp, self.path)
+
+    def download(self, version=None) -> ResourceSet:
+        """ Downloads a version from the Api and keeps it, also in the file.
+
+        Raises
+        ------
+        RuntimeError
+            When there is no `make_client` or the Api didn't answer with 200.
+        """
+
+        version = _key(version or self.version)
+
+        if self.make_client is None:
+            raise RuntimeError('The resources can only be downloaded with a make_client')
+
+        client = self.make_client()
+        data = {}
+
+        try:
+            for _type, name in ((GENRES, 'genres'), (LOCALES, 'locales')):
+                res = client.get_requests(ENDPOINTS['resources'], version, _type)
+
+                if res.get('status_code') != 200 or not isinstance(res.get('data'), dict):
+                    raise RuntimeError(f'The {name} of version {version} answered {res.get("status_code")}')
+
+                data[name] = tuple(res['data'].get(name) or ())
+        finally:
+            client.close()
+
+        resources = ResourceSet(version, data['genres'], data['locales'], source='api', fetched=time.time())
+
+        with self._lock:
+            self._sets[version] = resources
+
+        self._write_file()
+        return resources
+
+    def get(self, version=None) -> ResourceSet:
+        """ Returns the resources of a version, loads them on the first use """
+
+        version = _key(version or self.version)
+        resources = self._sets.get(version)
+
+        if resources is not None and (resources.source != 'fallback' or not self._retry_due(version)):
+            return resources
+
+        if resources is None:
+            stored = self._read_file().get(version)
+
+            if stored is not None:
+                resources = ResourceSet(version, tuple(stored['genres']), tuple(stored['locales']), source='file',
+                                        fetched=stored.get('fetched', 0.0))
+
+                with self._lock:
+                    return self._sets.setdefault(version, resources)
+
+        if self.make_client is not None:
+            try:
+                return self.download(version)
+            except (OSError, RuntimeError) as e:
+                self.last_error = e
+
+        if resources is None:
+            # Nothing is known about the locales offline, they aren't validated then.
+            resources = ResourceSet(version, tuple(FALLBACK_GENRES), ())
+
+        with self._lock:
+            self._retry_at[version] = time.monotonic() + self.fallback_ttl
+            return self._sets.setdefault(version, resources)
+
+    def _retry_due(self, version: str) -> bool:
+        """ True for one caller once the fallback of a version is stale, it downloads the version again """
+
+        if self.make_client is None:
+            return False
+
+        with self._lock:
+            if time.monotonic() < self._retry_at.get(version, 0.0):
+                return False
+
+            self._retry_at[version] = time.monotonic() + self.fallback_ttl
+            return True
+
+    # The background refresh.
+
+    def start(self) -> None:
+        if self._thread is not None or not self.refresh:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='resources-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh):
+            for version in list(self._sets):
+                try:
+                    self.download(version)
+                    self.last_error = None
+                except (OSError, RuntimeError) as e:
+                    # The old resources stay in use.
+                    self.last_error = e
+
+    # The lookups, they never touch the network once the version is loaded.
+
+    @property
+    def genres(self) -> Tuple[str, ...]:
+        return self.get().genres
+
+    @property
+    def locales(self) -> Tuple[str, ...]:
+        return self.get().locales
+
+    def is_genre(self, name: str, version=None) -> bool:
+        return name.casefold() in self.get(version).folded_genres
+
+    def genre_index(self, name: str, version=None) -> Optional[int]:
+        """ Returns the position of the genre, e.x. for bitsets, None when it's unknown """
+
+        resources = self.get(version)
+        index = resources.genre_index.get(name)
+        return index if index is not None else resources.folded_genres.get(name.casefold())
+
+    def is_locale(self, code: str, version=None) -> bool:
+        return code in self.get(version).locale_set
+
+    def validate(self, params: Dict[str, object]) -> None:
+        """ Checks the `genres` and `locale` request parameters against the known resources
+
+        Raises
+        ------
+        InvalidParamsValueException
+            When a genre or the locale is unknown.
+        """
+
+        resources = self.get()
+        genres = params.get('genres')
+
+        if genres is not None:
+            names: Iterable[str] = genres.split(',') if isinstance(genres, str) else genres
+            unknown = [name for name in names if name.strip().casefold() not in resources.folded_genres]
+
+            if unknown:
+                raise InvalidParamsValueException(f'Unknown genres: {unknown}')
+
+        locale = params.get('locale')
+
+        if locale is not None and resources.locale_set and locale not in resources.locale_set:
+            raise InvalidParamsValueException(f'Unknown locale: {locale!r}')
+
+    def __repr__(self):
+        return f'<version={self.version!r} loaded={list(self._sets.values())}>'
@@ -0,0 +1,186 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import random
+import threading
+import time
+from http.client import HTTPException
+from typing import FrozenSet, Iterable
+
+from utils import CircuitOpenError
+
+# The errors that are caused by the network or the upstream and not by the request itself.
+RETRYABLE_ERRORS = (OSError, HTTPException)
+
+
+class RetryPolicy:
+    def __init__(self, retries: int = 3, backoff: float = 0.1, max_backoff: float = 5.0,
+                 budget: float = 0.2, methods: Iterable[str] = ('GET', 'PUT', 'DELETE'),
+                 statuses: Iterable[int] = (500, 502, 503, 504)):
+        """ Retries idempotent requests with exponential backoff and full jitter.
+
+        The retry budget limits the retries to a share of the requests, so a
+        failing upstream doesn't get multiplied traffic from every client.
+
+        Parameters
+        ----------
+        retries : [:class:`int`]
+            The maximum retries per request.
+
+        backoff : [:class:`float`]
+            The base delay in seconds, the upper bound doubles with every retry.
+
+        max_backoff : [:class:`float`]
+            The upper bound for a single delay.
+
+        budget : [:class:`float`]
+            The retries that are earned per request, e.x. 0.2 allows one retry per five requests.
+
+        methods : Iterable[:class:`str`]
+            The request methods that are safe to send again. `POST` isn't by default.
+
+        statuses : Iterable[:class:`int`]
+            The status codes that will be retried, add 429 to retry rate limited requests too.
+        """
+
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.methods: FrozenSet[str] = frozenset(methods)
+        self.statuses: FrozenSet[int] = frozenset(statuses)
+
+        # Start with a few retries, so the first failures can be retried too.
+        self._max_tokens = max(10.0, retries)
+        self._tokens = float(retries)
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int) -> float:
+        """ The full jitter delay before the given (0 based) retry """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self._max_tokens, self._tokens + self.budget)
+
+    def should_retry(self, method: str, attempt: int) -> bool:
+        """ Takes a retry from the budget when the method and the attempt allows it """
+
+        if method not in self.methods or attempt >= self.retries:
+            return False
+
+        with self._lock:
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """ Fails fast while the upstream is unhealthy.
+
+        After `failure_threshold` failures in a row the breaker opens and every
+        request raises :class:`CircuitOpenError` without touching the network.
+        After `reset_timeout` seconds one probe request is let through, its
+        outcome closes or opens the breaker again. One breaker can be shared
+        between many connections.
+
+        Parameters
+        ----------
+        failure_threshold : [:class:`int`]
+            The failures in a row that open the breaker.
+
+        reset_timeout : [:class:`float`]
+            The seconds to wait before a probe request is allowed.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self) -> bool:
+        """ Call before a request. Returns True when the request is the probe of a half open breaker,
+        it has to end with `success`, `failure` or `release`.
+
+        Raises
+        ------
+        CircuitOpenError
+            When the breaker is open.
+        """
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            self.rejected += 1
+
+        raise CircuitOpenError('The circuit breaker is open, the upstream is unhealthy')
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self) -> None:
+        """ Ends a probe without an outcome, e.x. when it raised a cassette miss, the next request probes again """
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def __repr__(self):
+        return f'<state={self.state} failures={self.failures} opened={self.opened} rejected={self.rejected}>'
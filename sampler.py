@@ -0,0 +1,223 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import copy_context
+from typing import Callable, Iterator, Optional, Union
+
+from bulk import TRANSIENT_ERRORS
+from deadline import Deadline
+from objects import AnimeObj, SongObj
+from ratelimit import RateLimiter
+
+# The most items the Api returns per random request.
+MAX_BATCH = 50
+
+# A request that raised one of these or answered anything but 200 counts as failed.
+FAILED_ERRORS = TRANSIENT_ERRORS + (RuntimeError,)
+
+
+class RandomSampler:
+    def __init__(self, make_client: Callable, kind: str = 'anime', nsfw: bool = False, workers: int = 4,
+                 limiter: Optional[RateLimiter] = None, patience: int = 5):
+        """ Collects large random samples with concurrent `/random` requests.
+
+        Every request asks for the maximum of 50 items, a request costs the same
+        rate limit token no matter how many items it returns.
+
+        Parameters
+        ----------
+        make_client : Callable[[], :class:`wrapper.AniApi`]
+            Creates a client, every worker thread gets its own connection, e.x. `lambda: AniApi(token)`.
+
+        kind : [:class:`str`]
+            `anime` or `song`.
+
+        nsfw : [:class:`bool`]
+            Include NSFW animes, only for `anime`.
+
+        workers : [:class:`int`]
+            The amount of concurrent requests.
+
+        limiter : Optional[:class:`RateLimiter`]
+            Shared between all workers, defaults to the Api's limit of 90 requests per minute.
+
+        patience : [:class:`int`]
+            The sample stops after this many requests in a row brought no new item, e.x. when the
+            catalog is smaller than the target. When they all failed, the last error is raised.
+
+        Raises
+        ------
+        ValueError
+            When the kind is neither `anime` nor `song`.
+
+        Examples
+        --------
+        >>> sampler = RandomSampler(lambda: AniApi(token), workers=8)
+        >>> ids = [anime.id for anime in sampler.sample(2000)]
+        """
+
+        if kind not in ('anime', 'song'):
+            raise ValueError(f'Unknown kind {kind!r}, use anime or song')
+
+        self.make_client = make_client
+        self.kind = kind
+        self.nsfw = nsfw
+        self.workers = workers
+        self.limiter = limiter or RateLimiter()
+        self.patience = patience
+
+        # The sent requests, the items that were seen before and the failed requests of the last sample.
+        self.calls = 0
+        self.duplicates = 0
+        self.errors = 0
+
+        self._local = threading.local()
+
+    def _fetch(self, stop: threading.Event, deadline: Optional[Deadline]):
+        """ Sends one random request, returns the items, None when it was stopped before sending.
+
+        Raises
+        ------
+        RuntimeError
+            When the request answered anything but 200, e.x. a 429 or a 5xx that ran out of retries.
+        """
+
+        while not self.limiter.acquire(timeout=0.1):
+            if stop.is_set() or (deadline is not None and deadline.expired):
+                return None
+
+        if stop.is_set():
+            return None
+
+        client = getattr(self._local, 'client', None)
+
+        if client is None:
+            client = self._local.client = self.make_client()
+
+        try:
+            with deadline or nullcontext():
+                if self.kind == 'anime':
+                    ctx = client.get_random_anime(MAX_BATCH, self.nsfw)
+                else:
+                    ctx = client.get_random_song(MAX_BATCH)
+        except TRANSIENT_ERRORS:
+            client.close()
+            raise
+
+        self.limiter.update(ctx.ratelimit)
+
+        if ctx.status_code != 200 or not isinstance(ctx.data, list):
+            raise RuntimeError(f'The random {self.kind} request answered {ctx.status_code}: {ctx.message}')
+
+        return ctx.data
+
+    def sample(self, target: int, deadline: Deadline = None) -> Iterator[Union[AnimeObj, SongObj]]:
+        """ Yields unique items as the responses arrive, until `target` items were yielded.
+
+        Parameters
+        ----------
+        target : [:class:`int`]
+            The amount of unique items.
+
+        deadline : Optional[:class:`Deadline`]
+            When it's spent, the sample stops with the items found so far.
+
+        Returns
+        -------
+        Iterator[Union[:class:`AnimeObj`, :class:`SongObj`]]
+            The items, every id only once. Fewer than `target` when the catalog ran
+            out or the deadline was spent.
+
+        Raises
+        ------
+        OSError
+            The last error, when `patience` requests in a row failed.
+
+        RuntimeError
+            The last error, when `patience` requests in a row answered anything but 200.
+        """
+
+        if target <= 0:
+            return
+
+        self.calls = self.duplicates = self.errors = 0
+
+        seen = set()
+        stop = threading.Event()
+        idle = failed = 0
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sampler')
+
+        try:
+            # Every submit needs its own context copy, so the requests become children of the caller's span.
+            pending = {executor.submit(copy_context().run, self._fetch, stop, deadline) for _ in range(self.workers)}
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        items = future.result()
+                    except FAILED_ERRORS as e:
+                        if deadline is not None and deadline.expired:
+                            return
+
+                        self.calls += 1
+                        self.errors += 1
+                        idle, failed = idle + 1, failed + 1
+
+                        if failed >= self.patience:
+                            raise e
+                    else:
+                        if items is None:
+                            continue
+
+                        self.calls += 1
+                        new = 0
+
+                        for item in items:
+                            if item.id in seen:
+                                self.duplicates += 1
+                                continue
+
+                            seen.add(item.id)
+                            new += 1
+                            yield item
+
+                            if len(seen) >= target:
+                                return
+
+                        idle, failed = (0 if new else idle + 1), 0
+
+                    if idle >= self.patience:
+                        return
+
+                    if deadline is None or not deadline.expired:
+                        pending.add(executor.submit(copy_context().run, self._fetch, stop, deadline))
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __repr__(self):
+        return f'<kind={self.kind!r} calls={self.calls} duplicates={self.duplicates} errors={self.errors}>'
@@ -0,0 +1,244 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import datetime
+import json
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple, Union
+
+from changes import AnimeChange, StatusChanged
+from objects import AnimeObj
+from utils import AiringDays, AnimeStatus, SeasonPeriod
+
+# A season of a year, e.x. `(SeasonPeriod.SPRING, 2022)`, the year is None when the Api doesn't know it.
+Season = Tuple[SeasonPeriod, Optional[int]]
+
+# The day names of the Api, in any case, e.x. `monday`.
+_DAYS = {day.name.casefold(): day for day in AiringDays}
+
+_EMPTY: FrozenSet[int] = frozenset()
+
+
+def airing_day(value) -> Optional[AiringDays]:
+    """ Converts the `weekly_airing_day` of the Api, a day name or number, None when it's missing or unknown """
+
+    if value is None or value == '':
+        return None
+
+    if isinstance(value, str) and not value.isdigit():
+        return _DAYS.get(value.strip().casefold())
+
+    try:
+        return AiringDays(int(value))
+    except ValueError:
+        return None
+
+
+class ScheduleIndex:
+    def __init__(self, animes: Iterable[Union[AnimeObj, dict]] = (),
+                 statuses: Iterable[int] = (AnimeStatus.RELEASING,)):
+        """ The weekly airing schedule, day -> season -> anime ids.
+
+        The index is updated one anime at a time, a query only looks up the
+        prepared sets and never scans the catalog.
+
+        Parameters
+        ----------
+        animes : Iterable[Union[:class:`AnimeObj`, :class:`dict`]]
+            The animes to start with, objects or raw documents, e.x. of a `CatalogExporter` file.
+
+        statuses : Iterable[:class:`int`]
+            The animes with these statuses are indexed, by default only the releasing ones.
+
+        Examples
+        --------
+        >>> index = ScheduleIndex.from_jsonl('anime.jsonl')
+        >>> index.today()
+        frozenset({11, 42})
+        >>> index.airing(AiringDays.Monday, SeasonPeriod.SPRING, 2022)
+        """
+
+        self.statuses = frozenset(int(status) for status in statuses)
+
+        self._index: Dict[AiringDays, Dict[Season, Set[int]]] = {day: {} for day in AiringDays}
+        self._days: Dict[AiringDays, Set[int]] = {day: set() for day in AiringDays}
+        self._slots: Dict[int, Tuple[AiringDays, Season]] = {}
+
+        # The answers per (day, season), frozen on the first query and dropped when their slot changes.
+        self._frozen: Dict[Tuple[AiringDays, Optional[Season]], FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+
+        for anime in animes:
+            self.update(anime)
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> 'ScheduleIndex':
+        """ Builds the index from a JSON Lines catalog, e.x. of `export.CatalogExporter` or `crawl.ShardedCrawler` """
+
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls((json.loads(line) for line in f if line.strip()), **kwargs)
+
+    # Incremental updates.
+
+    def _add(self, day: AiringDays, season: Season, anime_id: int) -> None:
+        self._index[day].setdefault(season, set()).add(anime_id)
+        self._days[day].add(anime_id)
+        self._frozen.pop((day, season), None)
+        self._frozen.pop((day, None), None)
+
+    def _discard(self, day: AiringDays, season: Season, anime_id: int) -> None:
+        seasons = self._index[day]
+        seasons[season].discard(anime_id)
+
+        if not seasons[season]:
+            del seasons[season]
+
+        self._days[day].discard(anime_id)
+        self._frozen.pop((day, season), None)
+        self._frozen.pop((day, None), None)
+
+    def _get(self, day: AiringDays, season: Optional[Season]) -> FrozenSet[int]:
+        key = (day, season)
+        ids = self._frozen.get(key)
+
+        if ids is not None:
+            return ids
+
+        with self._lock:
+            ids = self._days[day] if season is None else self._index[day].get(season, _EMPTY)
+            ids = self._frozen[key] = frozenset(ids)
+
+        return ids
+
+    def update(self, anime: Union[AnimeObj, dict]) -> bool:
+        """ Puts an anime into its slot, or takes it out when it doesn't air anymore.
+
+        Parameters
+        ----------
+        anime : Union[:class:`AnimeObj`, :class:`dict`]
+            The anime or its raw document, it needs the `id`, `status`, `weekly_airing_day`,
+            `season_period` and `season_year` fields.
+
+        Returns
+        -------
+        :class:`bool`
+            If the index changed.
+        """
+
+        get = anime.get if isinstance(anime, dict) else lambda name: getattr(anime, name, None)
+        anime_id = get('id')
+        day = airing_day(get('weekly_airing_day'))
+        slot = None
+
+        if day is not None and get('status') in self.statuses:
+            try:
+                period = SeasonPeriod(get('season_period'))
+            except ValueError:
+                period = SeasonPeriod.UNKNOWN
+
+            slot = (day, (period, get('season_year')))
+
+        with self._lock:
+            old = self._slots.get(anime_id)
+
+            if old == slot:
+                return False
+
+            if old is not None:
+                self._discard(*old, anime_id)
+                del self._slots[anime_id]
+
+            if slot is not None:
+                self._add(*slot, anime_id)
+                self._slots[anime_id] = slot
+
+        return True
+
+    def remove(self, anime_id: int) -> bool:
+        """ Takes an anime out, e.x. when it was deleted. Returns if it was indexed """
+
+        with self._lock:
+            old = self._slots.pop(anime_id, None)
+
+            if old is not None:
+                self._discard(*old, anime_id)
+
+        return old is not None
+
+    def on_change(self, event: AnimeChange) -> None:
+        """ Takes an anime out when it stops releasing, e.x. `poller.subscribe(index.on_change, StatusChanged)`.
+        The poller doesn't know the airing day, a new releasing anime needs an `update` with the full object.
+        """
+
+        if isinstance(event, StatusChanged) and event.current not in self.statuses:
+            self.remove(event.anime_id)
+
+    # The queries.
+
+    def airing(self, day: Union[AiringDays, int, str], period: Optional[SeasonPeriod] = None,
+               year: Optional[int] = None) -> FrozenSet[int]:
+        """ The ids of the animes that air on the day, of one season when `period` is given """
+
+        day = airing_day(day)
+
+        if day is None:
+            return _EMPTY
+
+        return self._get(day, None if period is None else (SeasonPeriod(period), year))
+
+    def today(self, tz: Optional[datetime.tzinfo] = None) -> FrozenSet[int]:
+        """ The ids of the animes that air today, in the given timezone or the local one """
+
+        # `weekday` starts on monday, `AiringDays` on sunday.
+        return self._get(AiringDays((datetime.datetime.now(tz).weekday() + 1) % 7), None)
+
+    def week(self, period: Optional[SeasonPeriod] = None,
+             year: Optional[int] = None) -> Dict[AiringDays, FrozenSet[int]]:
+        """ The ids per day, of one season when `period` is given """
+        return {day: self.airing(day, period, year) for day in AiringDays}
+
+    def seasons(self, day: Union[AiringDays, int, str]) -> Dict[Season, FrozenSet[int]]:
+        """ The ids per season of one day """
+
+        day = airing_day(day)
+
+        if day is None:
+            return {}
+
+        with self._lock:
+            seasons = list(self._index[day])
+
+        return {season: self._get(day, season) for season in seasons}
+
+    def slot(self, anime_id: int) -> Optional[Tuple[AiringDays, Season]]:
+        """ The day and season of an anime, None when it isn't indexed """
+        return self._slots.get(anime_id)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, anime_id: int) -> bool:
+        return anime_id in self._slots
+
+    def __repr__(self):
+        days = ' '.join(f'{day.name}={len(ids)}' for day, ids in self._days.items())
+        return f'<animes={len(self._slots)} {days}>'
@@ -0,0 +1,494 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from fixtures import LOCALES, make_catalog, make_user
+from utils.genres import genres as GENRES
+
+# How the query filters of the list routes match the documents, `eq` compares the value,
+# `in` matches one of the comma separated values, `all` needs all of them, `text` searches a substring.
+FILTERS = {
+    'anime': {'title': ('titles', 'text'), 'anilist_id': ('anilist_id', 'eq'), 'mal_id': ('mal_id', 'eq'),
+              'tmdb_id': ('tmdb_id', 'eq'), 'formats': ('format', 'in'), 'status': ('status', 'eq'),
+              'year': ('season_year', 'eq'), 'season': ('season_period', 'eq'), 'genres': ('genres', 'all')},
+    'episode': {'anime_id': ('anime_id', 'eq'), 'number': ('number', 'eq'), 'is_dub': ('is_dub', 'eq'),
+                'locale': ('locale', 'eq')},
+    'song': {'anime_id': ('anime_id', 'eq'), 'title': ('title', 'text'), 'artist': ('artist', 'text'),
+             'year': ('year', 'eq'), 'season': ('season', 'eq'), 'type': ('type', 'eq')},
+    'user': {'username': ('username', 'text'), 'email': ('email', 'text')},
+    'user_story': {'anime_id': ('anime_id', 'eq'), 'user_id': ('user_id', 'eq'), 'status': ('status', 'eq')},
+}
+
+NAMES = {'anime': 'Anime', 'episode': 'Episode', 'song': 'Song', 'user': 'User', 'user_story': 'UserStory'}
+
+
+def _matches(doc: dict, field: str, mode: str, value: str) -> bool:
+    have = doc.get(field)
+
+    if mode == 'text':
+        texts = have.values() if isinstance(have, dict) else (have or '',)
+        return any(value.lower() in str(text).lower() for text in texts)
+
+    if mode == 'all':
+        return all(v.strip().lower() in (g.lower() for g in have) for v in value.split(','))
+
+    if mode == 'in':
+        return str(have).lower() in (v.strip().lower() for v in value.split(','))
+
+    return str(have).lower() == value.lower()
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # The default backlog of 5 drops connects under load, the clients then wait a second for the syn retry.
+    request_queue_size = 128
+
+
+class StandInServer:
+    def __init__(self, animes: int = 1000, users: int = 100, seed: int = 0, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 500,
+                 rate_limit: int = 90, per: float = 60.0):
+        """ A local stand-in for the AniApi that serves a generated catalog, see `fixtures.make_catalog`.
+
+        Parameters
+        ----------
+        animes : [:class:`int`]
+            The size of the catalog, every anime has 3 episodes and 2 songs.
+
+        users : [:class:`int`]
+            The amount of users, user 1 is the one behind every valid token.
+
+        seed : [:class:`int`]
+            The seed for the catalog and the injected latency and errors.
+
+        host : [:class:`str`]
+            The address to bind to.
+
+        port : [:class:`int`]
+            The port to bind to, 0 picks a free one, check `server.port`.
+
+        latency : [:class:`float`]
+            The delay in seconds before every response.
+
+        jitter : [:class:`float`]
+            A random extra delay between 0 and `jitter` seconds.
+
+        error_rate : [:class:`float`]
+            The share of requests that fail with `error_status`, e.x. 0.01 for 1%.
+
+        error_status : [:class:`int`]
+            The status code of the injected errors.
+
+        rate_limit : [:class:`int`]
+            The requests per token and window, more are answered with 429. 0 turns the limit off.
+
+        per : [:class:`float`]
+            The length of the rate limit window in seconds.
+
+        Examples
+        --------
+        >>> with StandInServer(latency=0.02) as server:
+        ...     api = AniApi(host=server.host, port=server.port, scheme='http')
+        ...     api.get_anime(1)
+        """
+
+        catalog = make_catalog(animes, seed)
+
+        self.documents: Dict[str, List[dict]] = {**catalog,
+                                                 'user': [make_user(i) for i in range(1, users + 1)],
+                                                 'user_story': []}
+        self._by_id = {name: {doc['id']: doc for doc in docs} for name, docs in self.documents.items()}
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.per = per
+
+        # The amount of handled requests and how they ended.
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+
+        self._random = random.Random(seed)
+        self._windows: Dict[str, Tuple[float, int]] = {}
+        self._fail: List[int] = []
+        self._next_story = 1
+        self._lock = threading.Lock()
+
+        self._server = _HTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> 'StandInServer':
+        """ Serves from a daemon thread """
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='aniapi-stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def fail_next(self, count: int = 1, status: int = 500) -> None:
+        """ The next `count` requests fail with the status, e.x. 429 or 503 """
+
+        with self._lock:
+            self._fail.extend([status] * count)
+
+    def _ratelimit(self, key: str) -> Tuple[bool, Dict[str, str]]:
+        """ A fixed window per token, returns if the request is allowed and the `X-RateLimit-*` headers """
+
+        if not self.rate_limit:
+            return True, {}
+
+        now = time.time()
+
+        with self._lock:
+            start, used = self._windows.get(key, (now, 0))
+
+            if now - start >= self.per:
+                start, used = now, 0
+
+            allowed = used < self.rate_limit
+
+            if allowed:
+                used += 1
+
+            self._windows[key] = (start, used)
+
+        reset = max(0, int(start + self.per - now + 0.999))
+
+        headers = {'X-RateLimit-Limit': str(self.rate_limit),
+                   'X-RateLimit-Remaining': str(self.rate_limit - used),
+                   'X-RateLimit-Reset': str(reset)}
+
+        if not allowed:
+            headers['Retry-After'] = str(reset)
+
+        return allowed, headers
+
+    def _injected(self) -> Optional[int]:
+        with self._lock:
+            if self._fail:
+                return self._fail.pop(0)
+
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+
+        return None
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    # The routes, every one returns the status code, the message and the data.
+
+    def _list(self, name: str, query: Dict[str, str]) -> Tuple[int, str, object]:
+        docs = self.documents[name]
+
+        if 'ids' in query:
+            ids = {int(i) for i in query['ids'].split(',') if i.strip().isdigit()}
+            docs = [doc for doc in docs if doc['id'] in ids]
+
+        for param, (field, mode) in FILTERS[name].items():
+            if param in query:
+                docs = [doc for doc in docs if _matches(doc, field, mode, query[param])]
+
+        if name == 'anime' and query.get('nsfw', 'false').lower() != 'true':
+            docs = [doc for doc in docs if not doc['nsfw']]
+
+        try:
+            page = max(1, int(query.get('page', 1)))
+            per_page = min(100, max(1, int(query.get('per_page', 100))))
+        except ValueError:
+            return 400, 'Invalid pagination', ''
+
+        chunk = docs[(page - 1) * per_page:page * per_page]
+
+        if not chunk:
+            return 404, f'Zero {NAMES[name].lower()}s found', ''
+
+        return 200, f'Page {page}', {'current_page': page, 'count': len(chunk), 'documents': chunk,
+                                     'last_page': -(-len(docs) // per_page)}
+
+    def _one(self, name: str, _id: str) -> Tuple[int, str, object]:
+        doc = self._by_id[name].get(int(_id)) if _id.isdigit() else None
+
+        if doc is None:
+            return 404, f'{NAMES[name]} not found', ''
+
+        return 200, f'{NAMES[name]} found', doc
+
+    def _random_docs(self, name: str, count: str, nsfw: str = 'false') -> Tuple[int, str, object]:
+        docs = self.documents[name]
+
+        if name == 'anime' and nsfw.lower() != 'true':
+            docs = [doc for doc in docs if not doc['nsfw']]
+
+        count = min(50, max(1, int(count))) if count.isdigit() else 1
+
+        with self._lock:
+            chunk = self._random.sample(docs, min(count, len(docs)))
+
+        return 200, f'Random {NAMES[name].lower()}s', chunk
+
+    def _resources(self, version: str, _type: str) -> Tuple[int, str, object]:
+        if _type == '0':
+            return 200, 'Resources found', {'genres': list(GENRES)}
+
+        if _type == '1':
+            return 200, 'Resources found', {'locales': list(LOCALES)}
+
+        return 404, 'Resource not found', ''
+
+    def _auth_me(self, token: str) -> Tuple[int, str, object]:
+        if not token:
+            return 401, 'Unauthorized', ''
+
+        return 200, 'Me found', make_user(1, confidential=True)
+
+    def _write_story(self, body: dict) -> Tuple[int, str, object]:
+        if not {'user_id', 'anime_id', 'status'} <= set(body):
+            return 400, 'Missing fields', ''
+
+        stories = self._by_id['user_story']
+
+        with self._lock:
+            if 'id' in body:
+                story = stories.get(body['id'])
+
+                if story is None:
+                    return 404, 'UserStory not found', ''
+
+                story.update(body)
+                return 200, 'UserStory updated', story
+
+            story = {'id': self._next_story, 'current_episode': 0, 'current_episode_ticks': 0, **body}
+            self._next_story += 1
+
+            stories[story['id']] = story
+            self.documents['user_story'].append(story)
+
+        return 200, 'UserStory created', story
+
+    def _delete(self, name: str, _id: str) -> Tuple[int, str, object]:
+        with self._lock:
+            doc = self._by_id[name].pop(int(_id), None) if _id.isdigit() else None
+
+            if doc is None:
+                return 404, f'{NAMES[name]} not found', ''
+
+            self.documents[name].remove(doc)
+
+        return 200, f'{NAMES[name]} deleted', ''
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: dict, token: str) -> Tuple[int, str, object]:
+        """ Dispatches one request, returns the status code, the message and the data """
+
+        parts = [part for part in path.split('/') if part]
+
+        if not parts or parts[0] != 'v1':
+            return 404, 'Not found', ''
+
+        name, args = (parts[1] if len(parts) > 1 else ''), parts[2:]
+
+        if method == 'GET':
+            if name in FILTERS and not args:
+                return self._list(name, query)
+
+            if name in FILTERS and len(args) == 1:
+                return self._one(name, args[0])
+
+            if name == 'random' and args and args[0] in ('anime', 'song') and len(args) > 1:
+                return self._random_docs(*args[:3])
+
+            if name == 'resources' and len(args) == 2:
+                return self._resources(*args)
+
+            if name == 'auth' and args == ['me']:
+                return self._auth_me(token)
+
+        elif method in ('POST', 'PUT'):
+            if name == 'user_story':
+                return self._write_story(body)
+
+            if name == 'user' and 'id' in body:
+                user = self._by_id['user'].get(body['id'])
+                return (200, 'User updated', user) if user else (404, 'User not found', '')
+
+        elif method == 'DELETE' and name in ('user_story', 'user') and len(args) == 1:
+            return self._delete(name, args[0])
+
+        return 404, 'Not found', ''
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            # The headers and the body are written separately, without this every response waits for the ack.
+            disable_nagle_algorithm = True
+
+            def _read_body(self) -> dict:
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    raw = b''
+
+                    while True:
+                        size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                        chunk = self.rfile.read(size + 2)[:size]
+
+                        if not size:
+                            break
+
+                        raw += chunk
+                else:
+                    raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+                try:
+                    body = json.loads(raw or b'{}')
+                except ValueError:
+                    return {}
+
+                return body if isinstance(body, dict) else {}
+
+            def _send(self, status: int, message: str, data, headers: Dict[str, str]):
+                payload = json.dumps({'status_code': status, 'message': message, 'data': data,
+                                      'version': '1'}).encode('utf-8')
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+
+                for key, value in headers.items():
+                    self.send_header(key, value)
+
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self):
+                body = self._read_body() if self.command in ('POST', 'PUT') else {}
+
+                with server._lock:
+                    server.requests += 1
+
+                delay = server._delay()
+
+                if delay:
+                    time.sleep(delay)
+
+                auth = self.headers.get('Authorization', '')
+                token = auth[7:].strip() if auth.startswith('Bearer ') else ''
+
+                allowed, headers = server._ratelimit(token or self.client_address[0])
+
+                if not allowed:
+                    with server._lock:
+                        server.throttled += 1
+
+                    return self._send(429, 'Too Many Requests', '', headers)
+
+                status = server._injected()
+
+                if status is not None:
+                    with server._lock:
+                        server.errors += 1
+
+                    return self._send(status, 'Injected error', '', headers)
+
+                split = urlsplit(self.path)
+
+                try:
+                    status, message, data = server.route(self.command, split.path, dict(parse_qsl(split.query)),
+                                                         body, token)
+                except (KeyError, TypeError, ValueError) as e:
+                    status, message, data = 400, f'Bad request: {e}', ''
+
+                self._send(status, message, data, headers)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Serves a generated AniApi catalog on a local port.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--animes', type=int, default=1000, help='the size of the catalog')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='the delay per response in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='a random extra delay up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='the share of requests that fail')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--rate-limit', type=int, default=90, help='requests per token and window, 0 for none')
+    parser.add_argument('--per', type=float, default=60.0, help='the rate limit window in seconds')
+    args = parser.parse_args(argv)
+
+    server = StandInServer(animes=args.animes, seed=args.seed, host=args.host, port=args.port,
+                           latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           error_status=args.error_status, rate_limit=args.rate_limit, per=args.per)
+
+    print(f'Serving {args.animes} animes on {server.url}')
+
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
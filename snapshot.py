@@ -0,0 +1,289 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import mmap
+import struct
+from array import array
+from dataclasses import asdict, fields
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+from objects import AnimeObj
+
+# File layout:
+#   header    : magic, version, row count, column count
+#   directory : one u64 offset per column
+#   columns   : `count` fixed width values per column, rows are sorted by `id`
+#   heap      : utf-8 strings, referenced by (u32 offset, u32 length) pairs
+MAGIC = b'ANISNAP\x00'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHHII')
+_NULL_INT = -(1 << 63)
+_NULL_REF = 0xFFFFFFFF
+
+# The column kind per field: `q` int64, `d` float64, `?` bool, `s` string, `j` json encoded string.
+COLUMNS = (('id', 'q'),
+           ('anilist_id', 'q'),
+           ('mal_id', 'q'),
+           ('tmdb_id', 'q'),
+           ('format', 'q'),
+           ('status', 'q'),
+           ('titles', 'j'),
+           ('descriptions', 'j'),
+           ('episodes_count', 'q'),
+           ('cover_image', 's'),
+           ('has_cover_image', '?'),
+           ('genres', 'j'),
+           ('sagas', 'j'),
+           ('score', 'd'),
+           ('nsfw', '?'),
+           ('recommendations', 'j'),
+           ('trailer_url', 's'),
+           ('sequel', 'q'),
+           ('prequel', 'q'),
+           ('cover_color', 's'),
+           ('banner_image', 's'),
+           ('episode_duration', 'q'),
+           ('start_date', 's'),
+           ('end_date', 's'),
+           ('weekly_airing_day', 's'),
+           ('season_period', 'q'),
+           ('season_year', 'q'))
+
+_STRUCTS = {'q': struct.Struct('<q'),
+            'd': struct.Struct('<d'),
+            '?': struct.Struct('<B'),
+            's': struct.Struct('<II'),
+            'j': struct.Struct('<II')}
+
+# The columns have to follow `AnimeObj`, this also runs under `python -O`.
+if [name for name, _ in COLUMNS] != [f.name for f in fields(AnimeObj)]:
+    raise RuntimeError('The snapshot columns are out of date with AnimeObj')
+
+
+def write_snapshot(path: str, animes: Iterable[Union[AnimeObj, dict]]) -> int:
+    """ Write the given animes into a binary snapshot file.
+
+    Parameters
+    ----------
+    path : [:class:`str`]
+        The file to write the snapshot to.
+
+    animes : Iterable[Union[:class:`AnimeObj`, :class:`dict`]]
+        The animes to store, either as objects or as the dicts the Api returns.
+
+    Returns
+    -------
+    :class:`int`
+        The amount of rows written.
+    """
+
+    rows = [anime if isinstance(anime, dict) else asdict(anime) for anime in animes]
+    rows.sort(key=lambda row: row['id'])
+
+    heap = bytearray()
+    heap_index: Dict[str, int] = {}
+    columns = []
+
+    def ref(value: Optional[str]):
+        if value is None:
+            return _NULL_REF, 0
+
+        raw = value.encode('utf-8')
+        offset = heap_index.get(value)
+
+        if offset is None:
+            offset = heap_index[value] = len(heap)
+            heap.extend(raw)
+
+        return offset, len(raw)
+
+    for name, kind in COLUMNS:
+        col = bytearray()
+        pack = _STRUCTS[kind].pack
+
+        for row in rows:
+            value = row.get(name)
+
+            if kind == 'q':
+                col += pack(_NULL_INT if value is None else int(value))
+            elif kind == 'd':
+                col += pack(float('nan') if value is None else float(value))
+            elif kind == '?':
+                col += pack(2 if value is None else int(bool(value)))
+            elif kind == 's':
+                col += pack(*ref(value))
+            else:
+                col += pack(*ref(None if value is None else json.dumps(value, separators=(',', ':'))))
+
+        columns.append(col)
+
+    offset = _HEADER.size + 8 * len(COLUMNS)
+    directory = array('Q')
+
+    for col in columns:
+        directory.append(offset)
+        offset += len(col)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(rows), len(COLUMNS)))
+        f.write(directory.tobytes())
+
+        for col in columns:
+            f.write(col)
+
+        f.write(heap)
+
+    return len(rows)
+
+
+class AnimeRecord:
+    """ A lazy view on one snapshot row, fields are decoded when accessed """
+
+    __slots__ = ('_snapshot', '_row')
+
+    def __init__(self, snapshot: 'AnimeSnapshot', row: int):
+        self._snapshot = snapshot
+        self._row = row
+
+    def __getattr__(self, name: str) -> Any:
+        return self._snapshot.value(name, self._row)
+
+    def to_obj(self) -> AnimeObj:
+        """ Decodes every field and builds a regular :class:`AnimeObj` """
+        return AnimeObj(**{name: self._snapshot.value(name, self._row) for name, _ in COLUMNS})
+
+    def __repr__(self) -> str:
+        return f'<id={self.id} title={next(iter(self.titles.values()), None)!r} nsfw={self.nsfw}>'
+
+
+class AnimeSnapshot:
+    def __init__(self, path: str):
+        """ Opens a snapshot file written by :func:`write_snapshot` with `mmap`.
+
+        Nothing gets decoded on open, so every process that opens the same file
+        shares the page cache and only pays for the rows it actually touches.
+
+        Parameters
+        ----------
+        path : [:class:`str`]
+            The snapshot file.
+
+        Raises
+        ------
+        ValueError
+            When the file is not a snapshot or has an unsupported version.
+        """
+
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self._count, ncols = _HEADER.unpack_from(self._mm, 0)
+
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            self._mm.close()
+            raise ValueError(f'{path!r} is not a supported anime snapshot')
+
+        offsets = struct.unpack_from(f'<{ncols}Q', self._mm, _HEADER.size)
+        self._columns = {name: (offset, kind, _STRUCTS[kind])
+                         for (name, kind), offset in zip(COLUMNS, offsets)}
+
+        # The heap starts right after the last column.
+        self._heap = offsets[-1] + self._count * _STRUCTS[COLUMNS[-1][1]].size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, row: int) -> AnimeRecord:
+        if row < 0:
+            row += self._count
+
+        if not 0 <= row < self._count:
+            raise IndexError('snapshot row out of range')
+
+        return AnimeRecord(self, row)
+
+    def __iter__(self) -> Iterator[AnimeRecord]:
+        return (AnimeRecord(self, row) for row in range(self._count))
+
+    def value(self, name: str, row: int) -> Any:
+        """ Decode a single field of a row.
+
+        Raises
+        ------
+        AttributeError
+            When the field does not exist on :class:`AnimeObj`.
+        """
+
+        try:
+            offset, kind, st = self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+        values = st.unpack_from(self._mm, offset + row * st.size)
+
+        if kind == 'q':
+            return None if values[0] == _NULL_INT else values[0]
+
+        if kind == 'd':
+            return None if values[0] != values[0] else values[0]
+
+        if kind == '?':
+            return None if values[0] == 2 else bool(values[0])
+
+        start, length = values
+
+        if start == _NULL_REF:
+            return None
+
+        start += self._heap
+        text = self._mm[start:start + length].decode('utf-8')
+        return text if kind == 's' else json.loads(text)
+
+    def find(self, anime_id: int) -> Optional[AnimeRecord]:
+        """ Binary search for an anime by its id, returns None when it's not in the snapshot """
+
+        offset, _, st = self._columns['id']
+        lo, hi = 0, self._count
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = st.unpack_from(self._mm, offset + mid * st.size)[0]
+
+            if value < anime_id:
+                lo = mid + 1
+            elif value > anime_id:
+                hi = mid
+            else:
+                return AnimeRecord(self, mid)
+
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
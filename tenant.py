@@ -0,0 +1,212 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from bulk import TRANSIENT_ERRORS
+from constants import default_header
+from deadline import current_deadline
+from objects import Context
+from pool import ConnectionPool
+from ratelimit import RateLimiter
+from utils import DeadlineExceeded
+
+
+class _Tenant:
+    """ The state per token, the header dict is built once and then reused for every call """
+
+    __slots__ = ('headers', 'limiter', 'calls')
+
+    def __init__(self, headers: dict, limiter: RateLimiter):
+        self.headers = headers
+        self.limiter = limiter
+        self.calls = 0
+
+
+class TenantClient:
+    def __init__(self, make_client: Callable = None, size: int = 8, rate: float = 90, per: float = 60.0,
+                 max_tenants: int = 10_000, acquire_timeout: Optional[float] = None):
+        """ Serves many user tokens over one shared pool of clients.
+
+        Every call picks the token it runs with. The call leases a pooled client, runs with
+        the cached headers of the token and gives the client back. Everything the clients are
+        created with, e.x. an interner, an auth cache or the resources, is shared between all tokens.
+        The Api limits every token on its own, so every token gets its own rate limit bucket.
+
+        Parameters
+        ----------
+        make_client : Optional[Callable[[], :class:`wrapper.AniApi`]]
+            Creates the pooled clients, defaults to a plain :class:`wrapper.AniApi`.
+            The token of the created clients is never used.
+
+        size : [:class:`int`]
+            The maximum amount of clients and so of open connections.
+
+        rate, per : [:class:`float`]
+            The rate limit per token, the AniApi allows 90 requests per minute.
+
+        max_tenants : [:class:`int`]
+            The amount of tokens whose headers and rate limits are kept, the least recently used one is dropped first.
+
+        acquire_timeout : Optional[:class:`float`]
+            How long a call waits for a free client, None waits forever.
+
+        Examples
+        --------
+        >>> shared = StringInterner()
+        >>> client = TenantClient(lambda: AniApi(interner=shared, auth_cache=AuthCache()), size=16)
+        >>> client.call(token, 'get_anime', 11)
+        >>> client.tenant(token).get_user_story(user_id=1)
+        """
+
+        if make_client is None:
+            # Only imported here, the wrapper itself doesn't need this module.
+            from wrapper import AniApi
+            make_client = AniApi
+
+        self.pool = ConnectionPool(make_client, size)
+        self.rate = rate
+        self.per = per
+        self.max_tenants = max_tenants
+        self.acquire_timeout = acquire_timeout
+
+        self._tenants: 'OrderedDict[str, _Tenant]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tenant(self, token: str) -> _Tenant:
+        with self._lock:
+            tenant = self._tenants.get(token)
+
+            if tenant is not None:
+                self._tenants.move_to_end(token)
+                return tenant
+
+            tenant = self._tenants[token] = _Tenant(default_header(token), RateLimiter(self.rate, self.per))
+
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+
+        return tenant
+
+    def headers(self, token: str) -> dict:
+        """ The cached headers of a token, don't change them, they are shared with every call of the token """
+        return self._tenant(token).headers
+
+    def call(self, token: str, method: str, *args, **kwargs) -> Context:
+        """ Runs a method of :class:`wrapper.AniApi` with the given token.
+
+        Parameters
+        ----------
+        token : [:class:`str`]
+            The token of the user, an empty string for the read-only scope.
+
+        method : [:class:`str`]
+            The name of the method, e.x. `get_anime`.
+
+        Returns
+        -------
+        :class:`Context`
+            The response of the method.
+
+        Raises
+        ------
+        AttributeError
+            When the method doesn't exist or isn't public.
+
+        DeadlineExceeded
+            When the current deadline is spent while waiting for the rate limit.
+
+        queue.Empty
+            When no client got free within the `acquire_timeout`.
+        """
+
+        if method.startswith('_'):
+            raise AttributeError(f'{method!r} is not a public method')
+
+        tenant = self._tenant(token)
+        deadline = current_deadline()
+
+        if not tenant.limiter.acquire(None if deadline is None else deadline.remaining()):
+            raise DeadlineExceeded('The deadline was spent while waiting for the rate limit')
+
+        client = self.pool.acquire(self.acquire_timeout)
+
+        try:
+            client.headers = tenant.headers
+            ctx = getattr(client, method)(*args, **kwargs)
+        except TRANSIENT_ERRORS:
+            # The connection is in an unknown state, the next request reconnects.
+            client.close()
+            raise
+        finally:
+            self.pool.release(client)
+
+        tenant.calls += 1
+
+        if isinstance(ctx, Context):
+            tenant.limiter.update(ctx.ratelimit)
+
+        return ctx
+
+    def tenant(self, token: str) -> 'Tenant':
+        """ A view with the methods of :class:`wrapper.AniApi` that always use the given token """
+        return Tenant(self, token)
+
+    def forget(self, token: str) -> bool:
+        """ Drops the headers and the rate limit of a token, e.x. after a logout. Returns if it was known """
+
+        with self._lock:
+            return self._tenants.pop(token, None) is not None
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def __repr__(self):
+        return f'<tenants={len(self._tenants)} size={self.pool.size}>'
+
+
+class Tenant:
+    def __init__(self, client: TenantClient, token: str):
+        """ The methods of :class:`wrapper.AniApi` bound to one token of a :class:`TenantClient`,
+        e.x. `client.tenant(token).get_anime(11)`. It's cheap, create one per request.
+        """
+
+        self.client = client
+        self.token = token
+
+    def __getattr__(self, name: str) -> Callable[..., Context]:
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs) -> Context:
+            return self.client.call(self.token, name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def __repr__(self):
+        return f'<client={self.client!r}>'
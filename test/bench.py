@@ -0,0 +1,238 @@
+""" Offline benchmarks against the recorded responses inside `test/fixtures`.
+
+    python test/bench.py                        run everything
+    python test/bench.py -k build -n 2000       only the benchmarks matching `build`
+    python test/bench.py -o head.json           save the results
+    python test/bench.py --compare base.json    show the change against a saved run
+    python test/bench.py --write-fixtures       regenerate the recorded responses from `fixtures.py`
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from statistics import mean
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'test', 'fixtures')
+
+sys.path.insert(0, ROOT)
+
+from dataproc import create_data_dict  # noqa: E402
+from constants import API_VERSION  # noqa: E402
+from endpoints import ENDPOINTS  # noqa: E402
+from interning import StringInterner  # noqa: E402
+from objects import AnimeObj, EpisodeObj, SongObj, UserBObj, UserSObj  # noqa: E402
+from projection import AnimeCard  # noqa: E402
+from utils import ANIME_REQ, InvalidParamsException  # noqa: E402
+from wrapper import AniApi  # noqa: E402
+
+HEADER = {'X-RateLimit-Limit': '90', 'X-RateLimit-Remaining': '89', 'X-RateLimit-Reset': '0'}
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def documents(name: str) -> list:
+    data = json.loads(fixture(name))['data']
+    return data['documents'] if isinstance(data, dict) and 'documents' in data else data
+
+
+class OfflineApi(AniApi):
+    """ Answers every request with a recorded response, so the whole wrapper path runs without network """
+
+    ROUTES = {'/v1/anime/1': 'anime.json', '/v1/anime': 'anime_page.json', '/v1/episode': 'episode_page.json',
+              '/v1/song': 'song_page.json', '/v1/random/anime': 'random_anime.json', '/v1/user': 'user_page.json',
+              '/v1/auth/me': 'auth_me.json'}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._bodies = {path: fixture(name) for path, name in self.ROUTES.items()}
+
+    def get(self, url: str, headers: dict = None):
+        path = url.split('?', 1)[0].rstrip('/')
+
+        while path not in self._bodies:
+            path = path.rsplit('/', 1)[0]
+
+        return self._bodies[path], HEADER
+
+
+def inline_url(params: dict) -> str:
+    """ The per call work of the wrapper methods before the endpoint registry, only the names were checked """
+
+    invalid = set(params) - set(ANIME_REQ)
+
+    if invalid:
+        raise InvalidParamsException(f'Invalid parameters: {invalid}')
+
+    return f'/{API_VERSION}/anime/?{urlencode(params)}'
+
+
+def write_fixtures() -> None:
+    from fixtures import make_catalog, make_user, page, response
+
+    catalog = make_catalog(100)
+    files = {'anime.json': response(catalog['anime'][0]),
+             'anime_page.json': response(page(catalog['anime'], 1, 25)),
+             'episode_page.json': response(page(catalog['episode'], 1, 100)),
+             'song_page.json': response(page(catalog['song'], 1, 100)),
+             'random_anime.json': response(catalog['anime'][25:75]),
+             'user_page.json': response(page([make_user(i) for i in range(1, 101)], 1, 100)),
+             'auth_me.json': response(make_user(1, confidential=True))}
+
+    os.makedirs(FIXTURES, exist_ok=True)
+
+    for name, data in files.items():
+        with open(os.path.join(FIXTURES, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def benchmarks():
+    """ Returns the benchmarks as (name, function) pairs, every function runs one operation """
+
+    anime_page = fixture('anime_page.json')
+    random_anime = fixture('random_anime.json')
+    animes = documents('anime_page.json')
+    episodes = documents('episode_page.json')
+    songs = documents('song_page.json')
+    users = documents('user_page.json')
+    me = json.loads(fixture('auth_me.json'))['data']
+
+    anime = ENDPOINTS['anime']
+    params = {'title': 'Cowboy Bebop', 'status': 0, 'nsfw': True, 'page': 2, 'per_page': 50}
+
+    interner = StringInterner()
+    interner.intern_document(animes[0])
+
+    api = OfflineApi()
+    interned_api = OfflineApi(interner=StringInterner())
+
+    return [
+        ('decode.anime_page', lambda: create_data_dict(anime_page, HEADER)),
+        ('decode.random_anime', lambda: create_data_dict(random_anime, HEADER)),
+        ('build.anime', lambda: [AnimeObj(**doc) for doc in animes]),
+        ('build.episode', lambda: [EpisodeObj(**doc) for doc in episodes]),
+        ('build.song', lambda: [SongObj(**doc) for doc in songs]),
+        ('build.user', lambda: [UserSObj(**doc) for doc in users]),
+        ('build.auth_me', lambda: UserBObj(**me)),
+        ('url.no_params', lambda: anime.url('', params=anime.validate({}))),
+        ('url.params', lambda: anime.url('', params=anime.validate(params))),
+        ('url.params_inline', lambda: inline_url(params)),
+        ('url.id', lambda: anime.url(1)),
+        ('cache.intern_hit', lambda: interner.intern_document(dict(animes[0]))),
+        ('api.get_anime', lambda: api.get_anime(1)),
+        ('api.get_anime_page', lambda: api.get_anime(page=1, per_page=25)),
+        ('api.get_episode_page', lambda: api.get_episode()),
+        ('api.get_random_anime', lambda: api.get_random_anime(50)),
+        ('api.get_anime_page_interned', lambda: interned_api.get_anime(page=1, per_page=25)),
+        ('api.get_anime_page_card', lambda: api.get_anime(page=1, per_page=25, projection=AnimeCard)),
+    ]
+
+
+def run(func, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    clock = time.perf_counter_ns
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        for _ in range(iterations):
+            start = clock()
+            func()
+            samples.append(clock() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # Measured in a separate pass, tracemalloc slows the calls down too much for the timings.
+    tracemalloc.start()
+    allocations = []
+
+    try:
+        for _ in range(min(iterations, 200)):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            func()
+            allocations.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+
+    return {'iterations': iterations,
+            'mean_us': mean(samples) / 1000,
+            'p50_us': samples[len(samples) // 2] / 1000,
+            'p99_us': samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000,
+            'alloc_bytes': int(mean(allocations))}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def report(results: dict, base: dict = None) -> None:
+    print(f'{"benchmark":<34}{"mean":>10}{"p50":>10}{"p99":>10}{"alloc":>10}' + (f'{"change":>10}' if base else ''))
+
+    for name, r in results.items():
+        line = f'{name:<34}{r["mean_us"]:>8.2f}us{r["p50_us"]:>8.2f}us{r["p99_us"]:>8.2f}us' \
+               f'{r["alloc_bytes"] / 1024:>8.1f}KB'
+
+        if base:
+            before = base.get(name)
+            line += f'{(r["p50_us"] / before["p50_us"] - 1) * 100:>+9.1f}%' if before else f'{"new":>10}'
+
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the wrapper hot paths.')
+    parser.add_argument('-k', dest='pattern', default='', help='only run the benchmarks containing this text')
+    parser.add_argument('-n', dest='iterations', type=int, default=1000, help='timed iterations per benchmark')
+    parser.add_argument('-w', dest='warmup', type=int, default=100, help='untimed iterations before timing')
+    parser.add_argument('-o', dest='output', help='write the results as json to this file')
+    parser.add_argument('--compare', help='a results file of an earlier run to compare against')
+    parser.add_argument('--write-fixtures', action='store_true', help='regenerate the recorded responses and exit')
+    args = parser.parse_args(argv)
+
+    if args.write_fixtures:
+        write_fixtures()
+        return 0
+
+    results = {name: run(func, args.iterations, args.warmup)
+               for name, func in benchmarks() if args.pattern in name}
+
+    base = None
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)['results']
+
+    report(results, base)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'commit': commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                       'iterations': args.iterations, 'results': results}, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+""" The shared setup of the tests that run against a `server.StandInServer` """
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+from server import StandInServer  # noqa: E402
+from wrapper import AniApi  # noqa: E402
+
+
+class ServerTestCase(unittest.TestCase):
+    """ Starts one stand-in server per test class, `SERVER` holds its arguments """
+
+    SERVER = {'animes': 20, 'rate_limit': 10 ** 6}
+
+    server: StandInServer
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer(**cls.SERVER).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def client(self, **kwargs) -> AniApi:
+        api = AniApi(host=self.server.host, port=self.server.port, scheme='http', **kwargs)
+        self.addCleanup(api.close)
+        return api
+
+    def sent(self, func) -> int:
+        """ Runs `func` and returns the requests that reached the server """
+
+        before = self.server.requests
+        func()
+        return self.server.requests - before
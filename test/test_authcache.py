@@ -0,0 +1,105 @@
+""" The `auth_me` cache, on its own and against a `server.StandInServer`.
+
+    python -m pytest test/test_authcache.py
+"""
+
+import base64
+import json
+import time
+import unittest
+
+from support import ServerTestCase
+
+from authcache import AuthCache, token_expiry
+from fixtures import make_user
+from objects import UserBObj
+
+
+def make_jwt(**claims) -> str:
+    """ An unsigned token with the given claims, the cache never checks the signature """
+
+    def part(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+    return f'{part({"alg": "HS256"})}.{part(claims)}.signature'
+
+
+class AuthCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.user = UserBObj(**make_user(1, confidential=True))
+
+    def test_token_expiry(self):
+        self.assertEqual(token_expiry(make_jwt(exp=1234)), 1234.0)
+        self.assertIsNone(token_expiry(make_jwt(sub=1)))
+        self.assertIsNone(token_expiry('not a token'))
+
+    def test_ttl(self):
+        cache = AuthCache(ttl=0.05)
+        jwt = make_jwt(sub=1)
+        cache.put(jwt, self.user)
+
+        self.assertIs(cache.get(jwt), self.user)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(jwt))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_exp_claim_shortens_the_ttl(self):
+        cache = AuthCache(ttl=60)
+
+        cache.put(make_jwt(exp=time.time() - 1), self.user)
+        self.assertEqual(len(cache), 0)
+
+        jwt = make_jwt(exp=time.time() + 0.05)
+        cache.put(jwt, self.user)
+        self.assertIs(cache.get(jwt), self.user)
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(jwt))
+
+    def test_lru_bound(self):
+        cache = AuthCache(max_size=2)
+        tokens = [make_jwt(sub=i) for i in range(3)]
+
+        cache.put(tokens[0], self.user)
+        cache.put(tokens[1], self.user)
+        cache.get(tokens[0])
+        cache.put(tokens[2], self.user)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get(tokens[0]))
+        self.assertIsNone(cache.get(tokens[1]))
+
+    def test_invalidate(self):
+        cache = AuthCache()
+        tokens = [make_jwt(sub=i) for i in range(3)]
+
+        for jwt in tokens:
+            cache.put(jwt, self.user)
+
+        self.assertTrue(cache.invalidate(tokens[0]))
+        self.assertFalse(cache.invalidate(tokens[0]))
+        self.assertEqual(cache.invalidate_user(1), 2)
+        self.assertEqual(len(cache), 0)
+
+
+class ClientTest(ServerTestCase):
+    def test_known_token_is_answered_from_memory(self):
+        api = self.client(auth_cache=AuthCache())
+        jwt = make_jwt(sub=1, exp=time.time() + 60)
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.auth_me(jwt).status_code, 200)), 1)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.auth_me(jwt).data.id, 1)), 0)
+
+        api.auth_cache.invalidate(jwt)
+        self.assertEqual(self.sent(lambda: api.auth_me(jwt)), 1)
+
+    def test_rejected_token_isnt_cached(self):
+        api = self.client(auth_cache=AuthCache())
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.auth_me('').status_code, 401)), 1)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.auth_me('').status_code, 401)), 1)
+        self.assertEqual(len(api.auth_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
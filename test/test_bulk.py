@@ -0,0 +1,124 @@
+""" The bulk UserStory upsert against a `server.StandInServer`.
+
+    python -m pytest test/test_bulk.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from bulk import upsert_user_stories
+from deadline import Deadline
+from ratelimit import RateLimiter
+from tracing import Tracer
+from utils import DeadlineExceeded, InvalidParamsException
+
+
+class BulkTest(ServerTestCase):
+    def make_client(self):
+        return self.client(token='token')
+
+    def upsert(self, records: list, **kwargs) -> list:
+        kwargs.setdefault('limiter', RateLimiter(10 ** 6, 1))
+        return upsert_user_stories(self.make_client, records, workers=kwargs.pop('workers', 1), backoff=0, **kwargs)
+
+    def stories(self, user_id: int) -> list:
+        return [s for s in self.server.documents['user_story'] if s['user_id'] == user_id]
+
+    def test_creates_and_updates(self):
+        results = self.upsert([{'user_id': 10, 'anime_id': i, 'status': 0} for i in range(1, 6)], workers=3)
+
+        self.assertEqual([r.index for r in results], list(range(5)))
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(sorted(s['anime_id'] for s in self.stories(10)), [1, 2, 3, 4, 5])
+
+        story = self.stories(10)[0]
+        update = dict(story, status=2, current_episode=3, current_episode_ticks=100)
+        results = self.upsert([update])
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(self.server._by_id['user_story'][story['id']]['status'], 2)
+        self.assertEqual(len(self.stories(10)), 5)
+
+    def test_5xx_create_is_looked_up_before_it_is_sent_again(self):
+        self.server.fail_next(1, 503)
+
+        sent = self.sent(lambda: self.assertTrue(self.upsert(
+            [{'user_id': 11, 'anime_id': 1, 'status': 0}])[0].ok))
+
+        # The failed create, the lookup and the create again.
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(self.stories(11)), 1)
+
+    def test_lost_response_doesnt_duplicate(self):
+        created = []
+
+        def make_client():
+            client = self.make_client()
+            create = client.create_user_story
+
+            def lossy(*args, **kwargs):
+                ctx = create(*args, **kwargs)
+                created.append(ctx)
+
+                # The Api wrote it, but the answer never arrived.
+                if len(created) == 1:
+                    raise TimeoutError('The read timed out')
+
+                return ctx
+
+            client.create_user_story = lossy
+            return client
+
+        results = upsert_user_stories(make_client, [{'user_id': 12, 'anime_id': 1, 'status': 0}],
+                                      limiter=RateLimiter(10 ** 6, 1), backoff=0)
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].attempts, 2)
+        self.assertEqual(results[0].ctx.data['anime_id'], 1)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(self.stories(12)), 1)
+
+    def test_429_create_is_sent_again_without_a_lookup(self):
+        self.server.fail_next(1, 429)
+
+        sent = self.sent(lambda: self.assertTrue(self.upsert(
+            [{'user_id': 13, 'anime_id': 1, 'status': 0}])[0].ok))
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(self.stories(13)), 1)
+
+    def test_broken_record_isnt_retried(self):
+        results = self.upsert([{'user_id': 14, 'anime_id': 1, 'status': 0, 'id': 1}])
+
+        self.assertFalse(results[0].ok)
+        self.assertIsInstance(results[0].error, KeyError)
+        self.assertEqual(results[0].attempts, 1)
+
+        with self.assertRaises(InvalidParamsException):
+            self.make_client().create_user_story(14, 1, 0, bogus=1)
+
+    def test_writes_are_children_of_the_callers_span(self):
+        tracer = Tracer()
+
+        with tracer.span('import') as parent:
+            results = upsert_user_stories(lambda: self.client(token='token', tracer=tracer),
+                                          [{'user_id': 16, 'anime_id': i, 'status': 0} for i in range(1, 4)],
+                                          workers=3, limiter=RateLimiter(10 ** 6, 1))
+
+        self.assertTrue(all(r.ok for r in results))
+
+        writes = [span for span in tracer.exporter.spans if span.name == 'AniApi.create_user_story']
+        self.assertEqual(len(writes), 3)
+        self.assertEqual({(span.trace_id, span.parent_id) for span in writes}, {(parent.trace_id, parent.span_id)})
+
+    def test_spent_deadline(self):
+        results = self.upsert([{'user_id': 15, 'anime_id': 1, 'status': 0}], deadline=Deadline(0))
+
+        self.assertIsInstance(results[0].error, DeadlineExceeded)
+        self.assertEqual(results[0].attempts, 0)
+        self.assertEqual(self.stories(15), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
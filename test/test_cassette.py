@@ -0,0 +1,75 @@
+""" Recording requests against a `server.StandInServer` and replaying them without it.
+
+    python -m pytest test/test_cassette.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from support import ServerTestCase
+
+from cassette import Cassette
+from utils import CassetteMissError
+
+
+class CassetteTest(ServerTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'cassette.jsonl')
+
+    def record(self, *calls):
+        """ Records the given `(method, args)` calls and returns their responses """
+
+        with Cassette(self.path, mode='record') as cassette:
+            api = self.client(cassette=cassette)
+            responses = [getattr(api, method)(*args) for method, args in calls]
+
+        self.assertEqual(cassette.recorded, len(calls))
+        return responses
+
+    def test_replay_matches_the_recording(self):
+        self.server.fail_next(1, 503)
+        failed, anime, page = self.record(('get_anime', (1,)), ('get_anime', (1,)), ('get_anime', ()))
+
+        cassette = Cassette(self.path, speed=0)
+        api = self.client(cassette=cassette)
+
+        def replay():
+            # The same url answers in the recorded order.
+            self.assertEqual(api.get_anime(1).status_code, failed.status_code)
+            self.assertEqual(api.get_anime(1).data, anime.data)
+            self.assertEqual(api.get_anime().data.documents, page.data.documents)
+
+        self.assertEqual(self.sent(replay), 0)
+        self.assertEqual(cassette.played, 3)
+
+    def test_repeat(self):
+        self.record(('get_anime', (2,)))
+
+        api = self.client(cassette=Cassette(self.path, speed=0))
+        self.assertEqual(api.get_anime(2).status_code, 200)
+        self.assertEqual(api.get_anime(2).status_code, 200)
+
+        api = self.client(cassette=Cassette(self.path, speed=0, repeat=False))
+        self.assertEqual(api.get_anime(2).status_code, 200)
+
+        with self.assertRaises(CassetteMissError):
+            api.get_anime(2)
+
+    def test_unrecorded_request(self):
+        self.record(('get_anime', (2,)))
+
+        api = self.client(cassette=Cassette(self.path, speed=0))
+
+        with self.assertRaises(CassetteMissError):
+            api.get_anime(3)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Cassette(self.path, mode='rewind')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+""" The releasing poller against a `server.StandInServer` whose catalog changes between polls.
+
+    python -m pytest test/test_changes.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from changes import AnimeChange, NewEpisode, ReleasingPoller, ScoreChanged, StatusChanged
+from utils import AnimeStatus
+
+
+class PollerTest(ServerTestCase):
+    SERVER = dict(ServerTestCase.SERVER, animes=200)
+
+    def setUp(self):
+        listed = [doc for doc in self.server.documents['anime'] if not doc['nsfw']]
+        self.releasing = [doc for doc in listed if doc['status'] == AnimeStatus.RELEASING]
+        self.finished = [doc for doc in listed if doc['status'] == AnimeStatus.FINISHED]
+
+        self.poller = ReleasingPoller(self.client, per_page=5)
+        self.events = []
+        self.poller.subscribe(self.events.append)
+
+        self.assertEqual(self.poller.poll(), [])
+        self.assertEqual(len(self.poller), len(self.releasing))
+
+    def change(self, doc: dict, **fields) -> None:
+        """ Changes an anime of the server, until the end of the test """
+
+        self.addCleanup(doc.update, {name: doc[name] for name in fields})
+        doc.update(fields)
+
+    def test_unchanged_poll(self):
+        self.assertEqual(self.poller.poll(), [])
+
+        # Every page is listed again, but none of them needs a diff.
+        pages = -(-len(self.releasing) // 5)
+        self.assertEqual((self.poller.requests, self.poller.skipped_pages), (pages, pages))
+
+    def test_new_episode(self):
+        doc = self.releasing[0]
+        self.change(doc, episodes_count=doc['episodes_count'] + 2)
+
+        event, = self.poller.poll()
+
+        self.assertIsInstance(event, NewEpisode)
+        self.assertEqual((event.anime_id, event.current - event.previous), (doc['id'], 2))
+        self.assertEqual(self.events, [event])
+
+    def test_score_changed(self):
+        doc = self.releasing[0]
+        self.change(doc, score=doc['score'] + 1)
+
+        event, = self.poller.poll()
+
+        self.assertIsInstance(event, ScoreChanged)
+        self.assertEqual((event.anime_id, event.previous, event.current), (doc['id'], doc['score'] - 1, doc['score']))
+
+    def test_finished_anime_is_removed(self):
+        doc = self.releasing[0]
+        self.change(doc, status=AnimeStatus.FINISHED)
+
+        event, = self.poller.poll()
+
+        self.assertIsInstance(event, StatusChanged)
+        self.assertEqual((event.previous, event.current), (AnimeStatus.RELEASING, AnimeStatus.FINISHED))
+        self.assertEqual(len(self.poller), len(self.releasing) - 1)
+
+        # It isn't looked up again.
+        self.assertEqual(self.poller.poll(), [])
+
+    def test_new_releasing_anime(self):
+        doc = self.finished[0]
+        self.change(doc, status=AnimeStatus.RELEASING)
+
+        event, = self.poller.poll()
+
+        self.assertIsInstance(event, StatusChanged)
+        self.assertEqual((event.anime_id, event.previous, event.current), (doc['id'], None, AnimeStatus.RELEASING))
+
+    def test_subscribed_kinds(self):
+        episodes = []
+        self.poller.subscribe(episodes.append, NewEpisode)
+
+        doc = self.releasing[0]
+        self.change(doc, episodes_count=doc['episodes_count'] + 1, score=doc['score'] + 1)
+
+        events = self.poller.poll()
+
+        self.assertEqual({type(event) for event in events}, {NewEpisode, ScoreChanged})
+        self.assertTrue(all(isinstance(event, AnimeChange) for event in self.events))
+        self.assertEqual([type(event) for event in episodes], [NewEpisode])
+
+    def test_failed_poll_keeps_the_state(self):
+        doc = self.releasing[0]
+        self.change(doc, score=doc['score'] + 1)
+        self.server.fail_next(1, 503)
+
+        with self.assertRaises(RuntimeError):
+            self.poller.poll()
+
+        self.assertEqual([type(event) for event in self.poller.poll()], [ScoreChanged])
+
+
+if __name__ == '__main__':
+    unittest.main()
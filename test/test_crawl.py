@@ -0,0 +1,90 @@
+""" The sharded crawler against a `server.StandInServer`.
+
+    python -m pytest test/test_crawl.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from support import ServerTestCase
+
+import crawl
+from crawl import ShardedCrawler
+from pagination import iter_pages
+
+
+class CrawlTest(ServerTestCase):
+    SERVER = dict(ServerTestCase.SERVER, animes=60)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(tmp.name, 'anime.jsonl')
+
+    def crawler(self, **kwargs) -> ShardedCrawler:
+        return ShardedCrawler(self.server.url, processes=2, shards=3, rate=10 ** 6, per=1, **kwargs)
+
+    def expected(self, **filters) -> list:
+        return [anime.id for page in iter_pages(self.client().get_anime, per_page=5, **filters)
+                for anime in page.documents]
+
+    def ids(self) -> list:
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def test_split(self):
+        self.assertEqual(ShardedCrawler.split(2, 11, 3), [(2, 5), (6, 8), (9, 11)])
+        self.assertEqual(ShardedCrawler.split(2, 3, 8), [(2, 2), (3, 3)])
+        self.assertEqual(ShardedCrawler.split(2, 1, 4), [])
+
+    def test_crawl_is_merged_in_page_order(self):
+        report = self.crawler().crawl('anime', self.path, per_page=5)
+
+        self.assertEqual(self.ids(), self.expected())
+        self.assertEqual(report.records, len(self.ids()))
+        self.assertEqual(report.pages, report.last_page)
+        self.assertEqual(len(report.shards), 4)
+        self.assertEqual(os.listdir(self.dir), ['anime.jsonl'])
+        self.assertTrue(all(pid > 0 for pid in report.per_worker()))
+
+    def test_filters(self):
+        self.crawler().crawl('anime', self.path, per_page=5, status=1)
+
+        self.assertEqual(self.ids(), self.expected(status=1))
+
+    def test_no_matches(self):
+        report = self.crawler().crawl('anime', self.path, title='no such title')
+
+        self.assertEqual(self.ids(), [])
+        self.assertEqual(report.records, 0)
+
+    def test_failed_shard_fails_the_crawl(self):
+        page = crawl._page
+
+        def fail_a_shard(*args):
+            data = page(*args)
+            # The first page worked, a page of a shard gets an error that isn't retried.
+            self.server.fail_next(1, 400)
+            return data
+
+        crawl._page = fail_a_shard
+        self.addCleanup(setattr, crawl, '_page', page)
+
+        with self.assertRaises(RuntimeError):
+            self.crawler().crawl('anime', self.path, per_page=5)
+
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            ShardedCrawler('ftp://127.0.0.1')
+
+        with self.assertRaises(ValueError):
+            self.crawler().crawl('manga', self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
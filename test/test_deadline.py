@@ -0,0 +1,83 @@
+""" The request deadlines against a slow `server.StandInServer`.
+
+    python -m pytest test/test_deadline.py
+"""
+
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from support import ServerTestCase
+
+from deadline import Deadline, current_deadline
+from retry import RetryPolicy
+from utils import DeadlineExceeded
+
+
+class DeadlineTest(unittest.TestCase):
+    def test_nested_deadline_only_shortens(self):
+        with Deadline(0.1) as outer:
+            with Deadline(10) as inner:
+                self.assertIs(current_deadline(), inner)
+                self.assertLessEqual(inner.expires, outer.expires)
+
+            self.assertIs(current_deadline(), outer)
+
+        self.assertIsNone(current_deadline())
+
+    def test_clamp(self):
+        deadline = Deadline(1)
+
+        self.assertLessEqual(deadline.clamp(5), 1)
+        self.assertEqual(deadline.clamp(0.01), 0.01)
+        self.assertLessEqual(deadline.clamp(None), 1)
+        self.assertEqual(Deadline(0).clamp(5), 0)
+
+    def test_check(self):
+        Deadline(1).check()
+
+        with self.assertRaises(DeadlineExceeded):
+            Deadline(0).check()
+
+    def test_copied_context_reaches_threads(self):
+        with Deadline(1) as deadline, ThreadPoolExecutor(1) as pool:
+            self.assertIs(pool.submit(copy_context().run, current_deadline).result(), deadline)
+            self.assertIsNone(pool.submit(current_deadline).result())
+
+
+class SlowServerTest(ServerTestCase):
+    SERVER = dict(ServerTestCase.SERVER, latency=0.3)
+
+    def test_spent_deadline_sends_nothing(self):
+        api = self.client()
+
+        with self.assertRaises(DeadlineExceeded):
+            with Deadline(0):
+                self.assertEqual(self.sent(lambda: api.get_anime(1)), 0)
+
+    def test_slow_response_is_cut_off(self):
+        api = self.client(timeout=10)
+        start = time.monotonic()
+
+        with self.assertRaises(TimeoutError):
+            with Deadline(0.1):
+                api.get_anime(1)
+
+        self.assertLess(time.monotonic() - start, 0.25)
+
+    def test_retries_stop_at_the_deadline(self):
+        api = self.client(timeout=10, retry=RetryPolicy(retries=10, backoff=0))
+        # The first try fails after 0.3s, the second one is cut off by the deadline.
+        self.server.fail_next(2, 503)
+        start = time.monotonic()
+
+        with self.assertRaises(TimeoutError):
+            with Deadline(0.5):
+                api.get_anime(1)
+
+        self.assertLess(time.monotonic() - start, 0.65)
+
+
+if __name__ == '__main__':
+    unittest.main()
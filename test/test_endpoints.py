@@ -0,0 +1,87 @@
+""" The endpoint registry, its parameter checks and its urls.
+
+    python -m pytest test/test_endpoints.py
+"""
+
+import unittest
+from urllib.parse import urlencode
+
+from support import ServerTestCase
+
+from endpoints import ENDPOINTS, Endpoint, Many
+from utils import AnimeFormat, AnimeStatus, InvalidParamsException, InvalidParamsValueException
+
+
+class ValidateTest(unittest.TestCase):
+    def setUp(self):
+        self.anime = ENDPOINTS['anime']
+
+    def test_normalizes_values(self):
+        params = self.anime.validate({'status': AnimeStatus.RELEASING, 'year': '2020', 'nsfw': True,
+                                      'with_episodes': 'False', 'formats': [AnimeFormat.TV, 1], 'ids': '1,2',
+                                      'genres': 'Action,Drama', 'title': 'Cowboy'})
+
+        self.assertEqual(params, {'status': 1, 'year': 2020, 'nsfw': 'true', 'with_episodes': 'false',
+                                  'formats': f'{int(AnimeFormat.TV)},1', 'ids': '1,2', 'genres': 'Action,Drama',
+                                  'title': 'Cowboy'})
+
+    def test_empty_params(self):
+        self.assertEqual(self.anime.validate({}), {})
+
+    def test_unknown_param(self):
+        with self.assertRaises(InvalidParamsException):
+            self.anime.validate({'bogus': 1})
+
+        with self.assertRaises(InvalidParamsException):
+            ENDPOINTS['random_anime'].validate({'page': 1})
+
+    def test_bad_type(self):
+        for params in ({'year': 'last year'}, {'page': None}, {'nsfw': 'maybe'}, {'nsfw': 1}, {'ids': '1,two'}):
+            with self.subTest(params=params), self.assertRaises(InvalidParamsValueException):
+                self.anime.validate(params)
+
+    def test_bad_enum_value(self):
+        for params in ({'status': 9}, {'status': 'releasing'}, {'formats': [0, 99]}, {'season': -1}):
+            with self.subTest(params=params), self.assertRaises(InvalidParamsValueException):
+                self.anime.validate(params)
+
+    def test_bool_for_an_int_becomes_a_number(self):
+        self.assertEqual(self.anime.validate({'year': True}), {'year': 1})
+
+
+class UrlTest(unittest.TestCase):
+    def test_matches_urlencode(self):
+        endpoint = Endpoint('anime/{}', params=frozenset(('title', 'page', 'genres')),
+                            types={'page': int, 'genres': Many(str)})
+        params = endpoint.validate({'title': 'Fate/Zero & Co ü', 'page': 2, 'genres': 'Sci-Fi'})
+
+        self.assertEqual(endpoint.url('', params=params), '/v1/anime/?' + urlencode(params))
+        self.assertEqual(endpoint.url(12), '/v1/anime/12')
+
+    def test_segments(self):
+        self.assertEqual(ENDPOINTS['random_anime'].url(50, 'false'), '/v1/random/anime/50/false')
+
+
+class ClientTest(ServerTestCase):
+    def test_invalid_params_arent_sent(self):
+        api = self.client()
+
+        def invalid():
+            with self.assertRaises(InvalidParamsValueException):
+                api.get_anime(status=9)
+
+            with self.assertRaises(InvalidParamsException):
+                api.get_anime(bogus=1)
+
+        self.assertEqual(self.sent(invalid), 0)
+
+    def test_valid_params_reach_the_server(self):
+        api = self.client()
+        ctx = api.get_anime(status=AnimeStatus.FINISHED, per_page=5)
+
+        self.assertEqual(ctx.status_code, 200)
+        self.assertTrue(all(anime.status == AnimeStatus.FINISHED for anime in ctx.data.documents))
+
+
+if __name__ == '__main__':
+    unittest.main()
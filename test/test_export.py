@@ -0,0 +1,111 @@
+""" The catalog export against a `server.StandInServer`.
+
+    python -m pytest test/test_export.py
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from support import ServerTestCase
+
+from export import CatalogExporter
+
+
+class ExportTest(ServerTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def exporter(self, name: str = 'catalog.jsonl', **kwargs) -> CatalogExporter:
+        return CatalogExporter(self.client(), os.path.join(self.dir, name), **kwargs)
+
+    @staticmethod
+    def ids(path: str, compress: bool = False) -> list:
+        with (gzip.open if compress else open)(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def interrupted(self, exporter: CatalogExporter) -> None:
+        """ Exports the first page, the second one fails """
+
+        def fail_second_page(stats):
+            if stats.pages == 1:
+                self.server.fail_next(1, 503)
+
+        with self.assertRaises(RuntimeError):
+            exporter.export(per_page=5, progress=fail_second_page)
+
+        self.assertEqual(exporter.load_checkpoint()['anime']['page'], 1)
+
+    def expected(self) -> list:
+        exporter = self.exporter('expected.jsonl')
+        exporter.export(per_page=5)
+        return self.ids(exporter.path_for('anime'))
+
+    def test_export(self):
+        exporter = self.exporter()
+        stats = exporter.export(per_page=5)
+        ids = self.ids(os.path.join(self.dir, 'catalog.anime.jsonl'))
+
+        self.assertEqual(stats.records, len(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(exporter.load_checkpoint()['anime']['done'])
+
+        # A finished entity isn't requested again.
+        self.assertEqual(self.sent(lambda: exporter.export(per_page=5)), 0)
+
+    def test_resume(self):
+        exporter = self.exporter()
+        self.interrupted(exporter)
+
+        stats = exporter.export(per_page=5)
+
+        self.assertEqual(self.ids(exporter.path_for('anime')), self.expected())
+        self.assertEqual(stats.pages, stats.last_page - 1)
+
+    def test_partial_line_is_cut_off(self):
+        exporter = self.exporter()
+        self.interrupted(exporter)
+
+        # A crash in the middle of writing the second page.
+        with open(exporter.path_for('anime'), 'ab') as f:
+            f.write(b'{"id":')
+
+        exporter.export(per_page=5)
+
+        self.assertEqual(self.ids(exporter.path_for('anime')), self.expected())
+
+    def test_gzip(self):
+        exporter = self.exporter('catalog.jsonl.gz', compress=True)
+        self.interrupted(exporter)
+        exporter.export(per_page=5)
+
+        self.assertEqual(self.ids(exporter.path_for('anime'), compress=True), self.expected())
+
+    def test_other_page_size_or_filters_dont_resume(self):
+        exporter = self.exporter()
+        self.interrupted(exporter)
+
+        with self.assertRaises(ValueError):
+            exporter.export(per_page=10)
+
+        with self.assertRaises(ValueError):
+            exporter.export(per_page=5, status=0)
+
+        exporter.export(per_page=10, resume=False)
+        self.assertEqual(self.ids(exporter.path_for('anime')), self.expected())
+
+    def test_path_for(self):
+        self.assertTrue(self.exporter('{entity}.jsonl').path_for('song').endswith('song.jsonl'))
+        self.assertTrue(self.exporter('catalog').path_for('song').endswith('catalog.song'))
+
+    def test_unknown_entity(self):
+        with self.assertRaises(ValueError):
+            self.exporter().export('manga')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+""" Hedged requests against a `server.StandInServer` with a slow primary.
+
+    python -m pytest test/test_hedge.py
+"""
+
+import threading
+import time
+import unittest
+
+from support import ServerTestCase
+
+from hedge import Hedger
+
+
+class HedgeTest(ServerTestCase):
+    def setUp(self):
+        self.slow = []
+        lock = threading.Lock()
+
+        def delay() -> float:
+            # The primary gets the slow delay, its hedge is only sent later.
+            with lock:
+                return self.slow.pop() if self.slow else 0.0
+
+        self.server._delay = delay
+        self.addCleanup(vars(self.server).pop, '_delay')
+
+    def hedged_client(self):
+        hedger = Hedger(min_delay=0.1, max_rate=1.0, pool_size=2)
+        self.addCleanup(hedger.close)
+
+        api = self.client(hedger=hedger)
+
+        # The hedger only hedges once it knows the usual latency.
+        for _ in range(hedger.latency.min_samples):
+            api.get_anime(1)
+
+        return api, hedger
+
+    def test_loser_is_cancelled_at_once(self):
+        api, hedger = self.hedged_client()
+
+        def calls():
+            for _ in range(2):
+                self.slow.append(3.0)
+                start = time.monotonic()
+
+                self.assertEqual(api.get_anime(1).status_code, 200)
+
+                # The second call would wait for the first loser's pool place without the cancel.
+                self.assertLess(time.monotonic() - start, 1.0)
+
+        # The primaries and the hedges, an aborted loser isn't sent again.
+        self.assertEqual(self.sent(calls), 4)
+        self.assertEqual(hedger.hedge_wins, 2)
+        self.assertLessEqual(hedger.pool._created, hedger.pool_size)
+
+    def test_fast_answer_isnt_hedged(self):
+        api, hedger = self.hedged_client()
+
+        hedges = hedger.hedges
+
+        self.assertEqual(self.sent(lambda: api.get_anime(1)), 1)
+        self.assertEqual(hedger.hedges, hedges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+""" The request timing hooks against a `server.StandInServer`.
+
+    python -m pytest test/test_hooks.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from deadline import Deadline
+from retry import CircuitBreaker
+from utils import CircuitOpenError, DeadlineExceeded
+
+
+class HooksTest(ServerTestCase):
+    def timed_client(self, **kwargs):
+        api = self.client(**kwargs)
+        timings = []
+        api.add_hook(timings.append)
+        return api, timings
+
+    def test_phases(self):
+        api, timings = self.timed_client()
+        api.get_anime(1)
+
+        timing, = timings
+        self.assertEqual((timing.method, timing.endpoint, timing.status), ('GET', 'anime/{}', 200))
+        self.assertGreater(timing.bytes, 0)
+        self.assertEqual(timing.attempts, 1)
+        self.assertIsNone(timing.error)
+        self.assertGreater(timing.ttfb, 0)
+        self.assertGreaterEqual(timing.total, timing.connect + timing.ttfb + timing.read)
+
+    def test_open_circuit_is_timed_as_an_error(self):
+        api, timings = self.timed_client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+        self.server.fail_next(1, 503)
+        api.get_anime(1)
+
+        with self.assertRaises(CircuitOpenError):
+            api.get_anime(3)
+
+        self.assertEqual(len(timings), 2)
+        self.assertEqual(timings[0].status, 503)
+        self.assertIsInstance(timings[1].error, CircuitOpenError)
+        self.assertEqual((timings[1].endpoint, timings[1].status, timings[1].attempts), ('anime/{}', None, 0))
+
+    def test_spent_deadline_is_timed_as_an_error(self):
+        api, timings = self.timed_client()
+
+        with self.assertRaises(DeadlineExceeded):
+            with Deadline(0):
+                api.get_anime(3)
+
+        timing, = timings
+        self.assertIsInstance(timing.error, DeadlineExceeded)
+        self.assertEqual(timing.endpoint, 'anime/{}')
+
+    def test_remove_hook(self):
+        api, timings = self.timed_client()
+        api.remove_hook(timings.append)
+        api.get_anime(1)
+
+        self.assertEqual(timings, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+""" Keeps the cost of `import wrapper` in check, see `python -X importtime`.
+
+    python -m pytest test/test_import_time.py     check the budget
+    python test/test_import_time.py               print the slowest modules of the wrapper
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The own import time of the wrapper's modules in milliseconds, the standard library isn't counted.
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 40))
+
+# Optional features that `import wrapper` must not pull in, they are imported by the ones that use them.
+OPTIONAL = ('authcache', 'cassette', 'hedge', 'notfound', 'resources', 'sampler', 'metrics', 'server', 'loadgen',
+            'export', 'snapshot', 'concurrent.futures', 'asyncio')
+
+REPO_MODULES = {name[:-3] for name in os.listdir(ROOT) if name.endswith('.py')} | {'utils'}
+
+
+def import_times(statement: str = 'import wrapper') -> dict:
+    """ Returns the own import time in microseconds per module, from `-X importtime` """
+
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT, capture_output=True,
+                         text=True, check=True).stderr
+
+    times = {}
+
+    for line in out.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        own, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(own)
+
+    return times
+
+
+def repo_time(times: dict) -> int:
+    return sum(us for name, us in times.items() if name.split('.')[0] in REPO_MODULES)
+
+
+def loaded_modules(statement: str) -> set:
+    out = subprocess.run([sys.executable, '-c', f'{statement}; import sys; print("\\n".join(sys.modules))'],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return set(out.split())
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_budget(self):
+        # The best of a few runs, a single run is too noisy on a busy machine.
+        best = min(repo_time(import_times()) for _ in range(5)) / 1000
+
+        self.assertLessEqual(best, BUDGET_MS, f'import wrapper spends {best:.1f}ms in its own modules')
+
+    def test_optional_features_stay_unloaded(self):
+        loaded = loaded_modules('import wrapper')
+
+        self.assertEqual([name for name in OPTIONAL if name in loaded], [])
+
+    def test_utils_loads_lazily(self):
+        loaded = loaded_modules('import wrapper')
+
+        self.assertNotIn('utils.enums', loaded)
+        self.assertNotIn('utils.flags', loaded)
+
+        # The endpoint checks need both, they are loaded on the first use of the registry.
+        loaded = loaded_modules('import wrapper, endpoints; endpoints.ENDPOINTS')
+        self.assertIn('utils.enums', loaded)
+        self.assertIn('utils.flags', loaded)
+
+        loaded = loaded_modules('from utils import AnimeStatus')
+        self.assertIn('utils.enums', loaded)
+        self.assertNotIn('utils.flags', loaded)
+
+
+if __name__ == '__main__':
+    runs = [import_times() for _ in range(5)]
+    best = min(runs, key=repo_time)
+
+    print(f'own modules: {repo_time(best) / 1000:.1f}ms of {sum(best.values()) / 1000:.1f}ms, '
+          f'budget {BUDGET_MS:g}ms\n')
+
+    for name, us in sorted(best.items(), key=lambda item: -item[1])[:20]:
+        print(f'{us / 1000:>8.2f}ms  {name}{"  (own)" if name.split(".")[0] in REPO_MODULES else ""}')
@@ -0,0 +1,74 @@
+""" The string interner, on its own and while a client builds objects from a `server.StandInServer`.
+
+    python -m pytest test/test_interning.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from interning import StringInterner
+
+
+def fresh(text: str) -> str:
+    """ An equal string that is a different instance """
+    return ''.join(list(text))
+
+
+class InternerTest(unittest.TestCase):
+    def test_equal_strings_share_one_instance(self):
+        interner = StringInterner()
+        first = interner.intern(fresh('Action'))
+        second = interner.intern(fresh('Action'))
+
+        self.assertIs(first, second)
+        self.assertIsNone(interner.intern(None))
+
+        stats = interner.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (1, 1, 1))
+        self.assertGreater(stats.bytes_saved, 0)
+
+    def test_bounds(self):
+        interner = StringInterner(max_size=1, max_length=4)
+        long = fresh('Adventure')
+
+        self.assertIs(interner.intern(long), long)
+        interner.intern('Gore')
+        interner.intern('Yuri')
+
+        stats = interner.stats()
+        self.assertEqual((stats.size, stats.rejected), (1, 1))
+
+        interner.clear()
+        self.assertEqual(interner.stats().size, 0)
+        self.assertEqual(interner.stats().rejected, 1)
+
+    def test_document(self):
+        interner = StringInterner()
+        docs = [interner.intern_document({'titles': {fresh('en'): 'A'}, 'genres': [fresh('Action')],
+                                          'format': 1, 'weekly_airing_day': fresh('monday'), 'sagas': None})
+                for _ in range(2)]
+
+        self.assertIs(next(iter(docs[0]['titles'])), next(iter(docs[1]['titles'])))
+        self.assertIs(docs[0]['genres'][0], docs[1]['genres'][0])
+        self.assertIs(docs[0]['weekly_airing_day'], docs[1]['weekly_airing_day'])
+        self.assertEqual(docs[0]['format'], 1)
+
+
+class ClientTest(ServerTestCase):
+    def test_built_objects_share_strings(self):
+        interner = StringInterner()
+        api = self.client(interner=interner)
+        animes = api.get_anime(per_page=10).data.documents + api.get_anime(page=2, per_page=10).data.documents
+
+        genres = {}
+
+        for anime in animes:
+            for genre in anime.genres:
+                self.assertIs(genres.setdefault(genre, genre), genre)
+
+        self.assertGreater(interner.stats().hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+""" The kept-alive connection against a `server.StandInServer` that closes idle connections.
+
+    python -m pytest test/test_keepalive.py
+"""
+
+import time
+import unittest
+
+from support import ServerTestCase
+
+# The server closes a connection after it was idle this many seconds.
+IDLE_TIMEOUT = 0.05
+
+
+class KeepAliveTest(ServerTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server._server.RequestHandlerClass.timeout = IDLE_TIMEOUT
+
+    def setUp(self):
+        self.api = self.client(token='token')
+        self.connects = 0
+        connect = self.api.connect
+
+        def counted():
+            self.connects += 1
+            connect()
+
+        self.api.connect = counted
+
+    def test_get_reuses_the_connection(self):
+        self.api.get_anime(1)
+        sock = self.api.sock
+
+        self.assertIsNotNone(sock)
+        self.assertEqual(self.api.get_anime(2).status_code, 200)
+        self.assertIs(self.api.sock, sock)
+        self.assertEqual(self.connects, 1)
+
+    def test_get_on_a_closed_connection_is_sent_again(self):
+        self.api.get_anime(1)
+        time.sleep(IDLE_TIMEOUT * 4)
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(self.api.get_anime(2).status_code, 200)), 1)
+        self.assertEqual(self.connects, 2)
+
+    def test_post_on_a_closed_connection_isnt_sent_again(self):
+        self.api.get_anime(1)
+        time.sleep(IDLE_TIMEOUT * 4)
+
+        def post():
+            with self.assertRaises(ConnectionError):
+                self.api.create_user_story(20, 1, 0)
+
+        self.assertEqual(self.sent(post), 0)
+        self.assertEqual(self.connects, 1)
+        self.assertEqual([s for s in self.server.documents['user_story'] if s['user_id'] == 20], [])
+
+    def test_post_closes_the_connection(self):
+        self.api.create_user_story(21, 1, 0)
+
+        self.assertIsNone(self.api.sock)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+""" The load generator against a `server.StandInServer`.
+
+    python -m pytest test/test_loadgen.py
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from support import ServerTestCase
+
+from loadgen import LoadGenerator, LoadReport, main, parse_mix, parse_slos
+
+
+class ParseTest(unittest.TestCase):
+    def test_mix(self):
+        self.assertEqual(parse_mix('anime=6, episode'), [('anime', 6.0), ('episode', 1.0)])
+
+        for text in ('manga=1', 'anime=0', 'anime=-1'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_mix(text)
+
+    def test_slos(self):
+        self.assertEqual(parse_slos(['p99=0.25', 'throughput=200']), {'p99': 0.25, 'throughput': 200.0})
+
+        with self.assertRaises(ValueError):
+            parse_slos(['p42=1'])
+
+    def test_check(self):
+        report = LoadReport(mode='sync', concurrency=1, duration=1.0, throughput=50, error_rate=0.02,
+                            latency={'p99': 0.3})
+
+        self.assertEqual(report.check({'p99': 0.5, 'throughput': 10, 'error_rate': 0.05}), [])
+        self.assertEqual(len(report.check({'p99': 0.25, 'throughput': 100, 'error_rate': 0.01})), 3)
+
+        # A latency that wasn't measured fails.
+        self.assertEqual(report.check({'p50': 1}), ['p50 inf > 1'])
+
+
+class LoadTest(ServerTestCase):
+    def generator(self, **kwargs) -> LoadGenerator:
+        kwargs.setdefault('duration', 0.2)
+        return LoadGenerator(self.server.url, concurrency=2, ids=20, **kwargs)
+
+    def test_modes(self):
+        for mode in ('sync', 'pooled', 'async'):
+            with self.subTest(mode=mode):
+                report = self.generator(mode=mode, pool_size=1).run()
+
+                self.assertGreater(report.requests, 0)
+                self.assertEqual(report.errors, 0)
+                self.assertEqual(sum(report.operations.values()), report.requests)
+                self.assertLessEqual(report.latency['p50'], report.latency['max'])
+
+    def test_rate(self):
+        report = self.generator(mix=parse_mix('anime'), rate=20, duration=0.5).run()
+
+        # The burst of 20 and about 10 more within the half second.
+        self.assertLess(report.requests, 40)
+        self.assertGreater(report.ratelimit_wait, 0)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            self.generator(mode='threads')
+
+        with self.assertRaises(ValueError):
+            LoadGenerator('ftp://127.0.0.1')
+
+    def test_main(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        output = os.path.join(tmp.name, 'report.json')
+        args = [self.server.url, '-c', '1', '-d', '0.2', '--ids', '20', '--mix', 'anime']
+
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(args + ['--slo', 'error_rate=0', '-o', output]), 0)
+            self.assertEqual(main(args + ['--slo', 'throughput=1000000']), 1)
+
+        self.assertIn('SLO error_rate=0 PASS', out.getvalue())
+        self.assertIn('SLO throughput=1e+06 FAIL', out.getvalue())
+
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['failed'], [])
+
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(args + ['--mix', 'manga'])
+
+
+class ErrorTest(ServerTestCase):
+    SERVER = dict(ServerTestCase.SERVER, error_rate=0.5, error_status=503)
+
+    def test_errors_are_counted(self):
+        report = LoadGenerator(self.server.url, concurrency=2, duration=0.2, ids=20).run()
+
+        self.assertGreater(report.errors, 0)
+        self.assertEqual(report.error_types.get('503'), report.errors)
+        self.assertAlmostEqual(report.error_rate, report.errors / report.requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+""" The metrics registry, and the client metrics against a `server.StandInServer`.
+
+    python -m pytest test/test_metrics.py
+"""
+
+import unittest
+import urllib.error
+import urllib.request
+
+from support import ServerTestCase
+
+from metrics import CONTENT_TYPE, ClientMetrics, MetricsRegistry, serve
+from retry import CircuitBreaker
+from utils import CircuitOpenError
+
+
+class RegistryTest(unittest.TestCase):
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.counter('calls_total', 'The calls.', ('kind',)).inc(2, kind='a')
+        registry.gauge('level', 'The level.').set(0.5)
+        registry.histogram('took_seconds', 'The duration.', buckets=(0.1, 1)).observe(0.5)
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP calls_total The calls.', '# TYPE calls_total counter', 'calls_total{kind="a"} 2',
+            '# HELP level The level.', '# TYPE level gauge', 'level 0.5',
+            '# HELP took_seconds The duration.', '# TYPE took_seconds histogram',
+            'took_seconds_bucket{le="0.1"} 0', 'took_seconds_bucket{le="1"} 1', 'took_seconds_bucket{le="+Inf"} 1',
+            'took_seconds_sum 0.5', 'took_seconds_count 1',
+        ])
+
+    def test_escaped_labels(self):
+        registry = MetricsRegistry()
+        registry.counter('calls_total', 'The calls.', ('kind',)).inc(kind='a "b"\n')
+
+        self.assertIn('calls_total{kind="a \\"b\\"\\n"} 1', registry.render())
+
+    def test_counter_function(self):
+        registry = MetricsRegistry()
+        calls = [3]
+        counter = registry.counter('calls_total', 'The calls.')
+        counter.set_function(lambda: calls[0])
+
+        calls[0] += 1
+        self.assertEqual(counter.value(), 4)
+        self.assertIn('calls_total 4', registry.render())
+
+    def test_misuse(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('calls_total', 'The calls.', ('kind',))
+
+        self.assertIs(registry.counter('calls_total', 'The calls.', ('kind',)), counter)
+
+        with self.assertRaises(ValueError):
+            registry.gauge('calls_total', 'The calls.')
+
+        with self.assertRaises(ValueError):
+            counter.inc(other='a')
+
+    def test_serve(self):
+        registry = MetricsRegistry()
+        registry.gauge('level', 'The level.').set(1)
+
+        server = serve(registry, port=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://%s:%d' % server.server_address
+
+        with urllib.request.urlopen(url + '/metrics') as res:
+            self.assertEqual(res.headers['Content-Type'], CONTENT_TYPE)
+            self.assertIn(b'level 1', res.read())
+
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(url + '/other')
+
+        cm.exception.close()
+        self.assertEqual(cm.exception.code, 404)
+
+
+class ClientMetricsTest(ServerTestCase):
+    def test_requests(self):
+        metrics = ClientMetrics()
+        api = self.client()
+        metrics.attach(api)
+
+        api.get_anime(1)
+        api.get_anime(2)
+
+        self.assertEqual(metrics.requests.value(endpoint='anime/{}', status=200), 2)
+        self.assertGreater(metrics.bytes.value(endpoint='anime/{}'), 0)
+        self.assertIn('aniapi_request_duration_seconds_count{endpoint="anime/{}"} 2', metrics.registry.render())
+
+    def test_open_circuit(self):
+        metrics = ClientMetrics()
+        api = self.client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+        metrics.attach(api)
+
+        self.server.fail_next(1, 503)
+        api.get_anime(1)
+
+        with self.assertRaises(CircuitOpenError):
+            api.get_anime(3)
+
+        self.assertEqual(metrics.requests.value(endpoint='anime/{}', status=503), 1)
+        self.assertEqual(metrics.errors.value(endpoint='anime/{}', error='CircuitOpenError'), 1)
+        self.assertEqual(metrics.breaker.value(breaker='default'), ClientMetrics.BREAKER_STATES['open'])
+
+        text = metrics.registry.render()
+        self.assertIn('# TYPE aniapi_circuit_breaker_rejected_total counter', text)
+        self.assertIn('aniapi_circuit_breaker_rejected_total{breaker="default"} 1', text)
+        self.assertNotIn('status="None"', text)
+
+    def test_cache_lookups(self):
+        metrics = ClientMetrics()
+        metrics.record_cache('auth', True)
+        metrics.record_cache('auth', False)
+        metrics.record_cache('auth', True)
+
+        self.assertEqual(metrics.cache.value(cache='auth', result='hit'), 2)
+        self.assertEqual(metrics.cache.value(cache='auth', result='miss'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+""" The negative cache and the known id bitmap, on their own and inside the client.
+
+    python -m pytest test/test_notfound.py
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from support import ServerTestCase
+
+from notfound import KnownIds, NegativeCache
+
+
+class KnownIdsTest(unittest.TestCase):
+    def test_rejects(self):
+        known = KnownIds([1, 2, 5])
+
+        self.assertEqual(known.max_id, 5)
+        self.assertEqual(len(known), 3)
+
+        # Ids that can't exist.
+        self.assertTrue(known.rejects(0))
+        self.assertTrue(known.rejects(-1))
+        self.assertTrue(known.rejects(3))
+
+        self.assertFalse(known.rejects(1))
+        self.assertFalse(known.rejects(5))
+
+        # Ids above the highest known id may have been added since, they are never rejected.
+        self.assertFalse(known.rejects(6))
+        self.assertFalse(known.rejects(10 ** 9))
+        self.assertNotIn(6, known)
+
+    def test_add_ignores_invalid_ids(self):
+        known = KnownIds([0, -3])
+
+        self.assertEqual(known.max_id, 0)
+        self.assertEqual(len(known), 0)
+
+    def test_save_load_round_trip(self):
+        known = KnownIds([1, 7, 8, 9, 1000])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'anime.ids')
+            known.save(path)
+            loaded = KnownIds.load(path)
+
+            with open(path, 'wb') as f:
+                f.write(b'NOPE' + bytes(8))
+
+            with self.assertRaises(ValueError):
+                KnownIds.load(path)
+
+        self.assertEqual(loaded.max_id, 1000)
+        self.assertEqual(len(loaded), len(known))
+        self.assertEqual([i for i in range(1002) if i in loaded], [1, 7, 8, 9, 1000])
+
+    def test_from_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'anime.jsonl')
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{"id": 2}\n\n{"id": 4}\n')
+
+            known = KnownIds.from_jsonl(path)
+
+        self.assertEqual([i for i in range(6) if i in known], [2, 4])
+
+
+class NegativeCacheTest(unittest.TestCase):
+    def test_ttl_expiry(self):
+        cache = NegativeCache(ttl=0.05)
+        cache.record('anime', 9, 404)
+
+        self.assertTrue(cache.is_missing('anime', 9))
+        self.assertFalse(cache.is_missing('episode', 9))
+
+        time.sleep(0.06)
+
+        self.assertFalse(cache.is_missing('anime', 9))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_bound(self):
+        cache = NegativeCache(max_size=2)
+
+        for _id in (1, 2, 3):
+            cache.record('anime', _id, 404)
+
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.is_missing('anime', 1))
+        self.assertTrue(cache.is_missing('anime', 3))
+
+        # A repeated miss moves to the end, the oldest other one is dropped.
+        cache.record('anime', 2, 404)
+        cache.record('anime', 4, 404)
+
+        self.assertTrue(cache.is_missing('anime', 2))
+        self.assertFalse(cache.is_missing('anime', 3))
+
+    def test_found_forgets_the_miss(self):
+        known = KnownIds([1])
+        cache = NegativeCache(known={'anime': known})
+
+        cache.record('anime', 3, 404)
+        cache.record('anime', 3, 200)
+
+        self.assertFalse(cache.is_missing('anime', 3))
+        self.assertIn(3, known)
+
+    def test_known_ids_are_answered_locally(self):
+        cache = NegativeCache(known={'anime': KnownIds([1, 3])})
+
+        self.assertTrue(cache.is_missing('anime', 2))
+        self.assertFalse(cache.is_missing('anime', 4))
+        self.assertEqual((cache.rejected, cache.hits, cache.misses), (1, 1, 1))
+
+
+class ClientTest(ServerTestCase):
+    def test_repeated_miss_is_not_sent(self):
+        api = self.client(negative_cache=NegativeCache())
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(9999).status_code, 404)), 1)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(9999).status_code, 404)), 0)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 200)), 1)
+
+    def test_rejected_id_is_not_sent(self):
+        api = self.client(negative_cache=NegativeCache(known={'anime': KnownIds([1, 3])}))
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(2).status_code, 404)), 0)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(0).status_code, 404)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+""" The page iteration against a `server.StandInServer`.
+
+    python -m pytest test/test_pagination.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from deadline import Deadline
+from pagination import get_many, iter_pages
+
+
+class PaginationTest(ServerTestCase):
+    def test_every_page(self):
+        api = self.client()
+        pages = list(iter_pages(api.get_anime, per_page=5))
+
+        self.assertEqual(len(pages), pages[0].last_page)
+        self.assertEqual([page.current_page for page in pages], list(range(1, len(pages) + 1)))
+
+    def test_no_matches(self):
+        api = self.client()
+
+        self.assertEqual(list(iter_pages(api.get_anime, title='no such title')), [])
+
+    def test_error_page_raises(self):
+        api = self.client()
+        pages = iter_pages(api.get_anime, per_page=5)
+
+        next(pages)
+        self.server.fail_next(1, 503)
+
+        with self.assertRaises(RuntimeError):
+            next(pages)
+
+    def test_spent_deadline_stops_cleanly(self):
+        api = self.client()
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(list(iter_pages(api.get_anime, Deadline(0))), [])), 0)
+
+    def test_get_many_leaves_out_missing_ids(self):
+        api = self.client()
+
+        self.assertEqual(sorted(get_many(api.get_anime, [1, 2, 10 ** 6])), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
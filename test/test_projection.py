@@ -0,0 +1,71 @@
+""" The field projections, on their own and for a client against a `server.StandInServer`.
+
+    python -m pytest test/test_projection.py
+"""
+
+import dataclasses
+import unittest
+
+from support import ServerTestCase
+
+from objects import AnimeObj, EpisodeObj
+from projection import AnimeCard, project, projected_fields
+
+
+class ProjectTest(unittest.TestCase):
+    def test_project(self):
+        Small = project(AnimeObj, 'score', 'id', 'titles', 'id')
+
+        self.assertEqual(Small.__name__, 'AnimeObjProjection')
+        self.assertEqual([f.name for f in dataclasses.fields(Small)], ['score', 'id', 'titles'])
+        self.assertEqual(projected_fields(AnimeObj, Small), ('score', 'id', 'titles'))
+
+        small = Small(score=80, id=1, titles={'en': 'A'})
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            small.score = 90
+
+    def test_bad_fields(self):
+        with self.assertRaises(ValueError):
+            project(AnimeObj)
+
+        with self.assertRaises(ValueError):
+            project(AnimeObj, 'id', 'bogus')
+
+    def test_projection_of_another_model(self):
+        with self.assertRaises(ValueError):
+            projected_fields(EpisodeObj, AnimeCard)
+
+        with self.assertRaises(ValueError):
+            projected_fields(AnimeObj, dict)
+
+
+class ClientTest(ServerTestCase):
+    def test_list_and_single_objects(self):
+        api = self.client()
+        full = api.get_anime(1).data
+
+        card = api.get_anime(1, projection=AnimeCard).data
+        self.assertIsInstance(card, AnimeCard)
+        self.assertEqual((card.id, card.titles, card.score, card.cover_image),
+                         (full.id, full.titles, full.score, full.cover_image))
+
+        Ids = project(AnimeObj, 'id', name='Ids')
+        page = api.get_anime(per_page=5, projection=Ids).data
+        self.assertEqual(len(page.documents), 5)
+        self.assertTrue(all(type(doc) is Ids for doc in page.documents))
+
+        self.assertTrue(all(isinstance(anime, Ids) for anime in api.get_random_anime(3, projection=Ids).data))
+
+    def test_wrong_model_isnt_sent(self):
+        api = self.client()
+
+        def wrong():
+            with self.assertRaises(ValueError):
+                api.get_episode(projection=AnimeCard)
+
+        self.assertEqual(self.sent(wrong), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+""" The resource cache against a `server.StandInServer` that fails at startup.
+
+    python -m pytest test/test_resources.py
+"""
+
+import time
+import unittest
+
+from support import ServerTestCase
+
+from resources import Resources
+
+
+class ResourcesTest(ServerTestCase):
+    def test_failed_download_is_tried_again(self):
+        self.server.fail_next(1, 503)
+        resources = Resources(self.client, fallback_ttl=0.05)
+
+        self.assertEqual(resources.get().source, 'fallback')
+        self.assertIsNotNone(resources.last_error)
+
+        # Within the ttl the fallback is used without another download.
+        self.assertEqual(self.sent(resources.get), 0)
+
+        time.sleep(0.06)
+
+        self.assertEqual(resources.get().source, 'api')
+        self.assertTrue(resources.locales)
+
+    def test_fallback_isnt_reported_as_found(self):
+        self.server.fail_next(1, 503)
+        api = self.client(resources=Resources(self.client, fallback_ttl=60))
+
+        self.server.fail_next(1, 503)
+        self.assertEqual(api.get_resources(1.0, 0).status_code, 503)
+
+        self.assertEqual(api.get_resources(1.0, 0).status_code, 200)
+
+    def test_downloaded_resources_are_answered_from_memory(self):
+        api = self.client(resources=Resources(self.client))
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_resources(1.0, 1).status_code, 200)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+""" The retries and the circuit breaker of the connection against a `server.StandInServer`.
+
+    python -m pytest test/test_retry.py
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from support import ServerTestCase
+
+from cassette import Cassette
+from retry import CircuitBreaker, RetryPolicy
+from utils import CassetteMissError, CircuitOpenError
+
+
+class RetryTest(ServerTestCase):
+    def test_retries_5xx(self):
+        api = self.client(retry=RetryPolicy(backoff=0))
+        self.server.fail_next(2, 503)
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 200)), 3)
+
+    def test_gives_up_after_the_retries(self):
+        api = self.client(retry=RetryPolicy(retries=2, backoff=0))
+        self.server.fail_next(3, 500)
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 500)), 3)
+
+    def test_429_only_when_configured(self):
+        api = self.client(retry=RetryPolicy(backoff=0))
+        self.server.fail_next(1, 429)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 429)), 1)
+
+        api = self.client(retry=RetryPolicy(backoff=0, statuses=(429, 503)))
+        self.server.fail_next(2, 429)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 200)), 3)
+
+    def test_budget_exhaustion(self):
+        # The budget starts with one token per retry and earns nothing back.
+        api = self.client(retry=RetryPolicy(retries=3, backoff=0, budget=0))
+        self.server.fail_next(5, 503)
+
+        self.assertEqual(self.sent(lambda: api.get_anime(1)), 4)
+        self.assertEqual(self.sent(lambda: self.assertEqual(api.get_anime(1).status_code, 503)), 1)
+
+
+class CircuitBreakerTest(ServerTestCase):
+    def test_opens_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        api = self.client(breaker=breaker)
+        self.server.fail_next(2, 503)
+
+        api.get_anime(1)
+        api.get_anime(1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        before = self.server.requests
+
+        with self.assertRaises(CircuitOpenError):
+            api.get_anime(1)
+
+        self.assertEqual(self.server.requests, before)
+        self.assertEqual(breaker.rejected, 1)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        api = self.client(breaker=breaker)
+
+        # A failed probe opens the breaker again.
+        self.server.fail_next(2, 503)
+        api.get_anime(1)
+        time.sleep(0.06)
+        self.assertEqual(api.get_anime(1).status_code, 503)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.opened, 2)
+
+        # A successful one closes it.
+        time.sleep(0.06)
+        self.assertEqual(api.get_anime(1).status_code, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.failure()
+        time.sleep(0.06)
+
+        self.assertTrue(breaker.before())
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.before()
+
+    def test_probe_without_an_outcome_is_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'empty.jsonl')
+            open(path, 'w').close()
+
+            api = self.client(breaker=breaker, cassette=Cassette(path, repeat=False))
+            breaker.failure()
+            time.sleep(0.06)
+
+            with self.assertRaises(CassetteMissError):
+                api.get_anime(1)
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.before())
+
+
+if __name__ == '__main__':
+    unittest.main()
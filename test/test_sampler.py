@@ -0,0 +1,61 @@
+""" The random sampler against a `server.StandInServer`.
+
+    python -m pytest test/test_sampler.py
+"""
+
+import unittest
+
+from support import ServerTestCase
+
+from ratelimit import RateLimiter
+from sampler import RandomSampler
+
+
+class SamplerTest(ServerTestCase):
+    def sampler(self, **kwargs) -> RandomSampler:
+        kwargs.setdefault('limiter', RateLimiter(10 ** 6, 1))
+        return RandomSampler(self.client, **kwargs)
+
+    def test_unique_items(self):
+        sampler = self.sampler(workers=2)
+        items = list(sampler.sample(10))
+
+        self.assertEqual(len(items), 10)
+        self.assertEqual(len({item.id for item in items}), 10)
+        self.assertEqual(sampler.errors, 0)
+
+    def test_small_catalog_stops_after_patience(self):
+        sampler = self.sampler(workers=1, patience=3)
+        items = list(sampler.sample(10 ** 4))
+
+        self.assertEqual(len({item.id for item in items}), len(items))
+        self.assertLess(len(items), 10 ** 4)
+
+    def test_error_status_counts_as_failed(self):
+        sampler = self.sampler(workers=1, patience=3)
+        self.server.fail_next(1, 429)
+
+        self.assertEqual(len(list(sampler.sample(5))), 5)
+        self.assertEqual(sampler.errors, 1)
+
+    def test_failing_upstream_raises(self):
+        sampler = self.sampler(workers=1, patience=3)
+        self.server.fail_next(3, 503)
+
+        with self.assertRaises(RuntimeError):
+            list(sampler.sample(5))
+
+        self.assertEqual((sampler.calls, sampler.errors), (3, 3))
+
+    def test_empty_sample_sends_nothing(self):
+        sampler = self.sampler()
+
+        self.assertEqual(self.sent(lambda: self.assertEqual(list(sampler.sample(0)), [])), 0)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            RandomSampler(self.client, kind='manga')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+""" The weekly airing schedule index.
+
+    python -m pytest test/test_schedule.py
+"""
+
+import datetime
+import json
+import os
+import tempfile
+import unittest
+
+import support  # noqa: F401
+
+from changes import StatusChanged
+from fixtures import make_anime
+from objects import AnimeObj
+from schedule import ScheduleIndex, airing_day
+from utils import AiringDays, AnimeStatus, SeasonPeriod
+
+
+def anime(anime_id: int, day: str = 'monday', status: int = AnimeStatus.RELEASING,
+          period: int = SeasonPeriod.SPRING, year: int = 2022) -> dict:
+    return dict(make_anime(anime_id), weekly_airing_day=day, status=status, season_period=period, season_year=year)
+
+
+class ScheduleTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ScheduleIndex([anime(1), anime(2, 'Tuesday'), anime(3, period=SeasonPeriod.FALL),
+                                    anime(4, status=AnimeStatus.FINISHED), anime(5, day=None),
+                                    AnimeObj(**anime(6, year=2021))])
+
+    def test_airing(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.airing(AiringDays.Monday), {1, 3, 6})
+        self.assertEqual(self.index.airing('MONDAY', SeasonPeriod.SPRING, 2022), {1})
+        self.assertEqual(self.index.airing(2), {2})
+        self.assertEqual(self.index.airing('someday'), frozenset())
+        self.assertEqual(self.index.slot(3), (AiringDays.Monday, (SeasonPeriod.FALL, 2022)))
+        self.assertNotIn(4, self.index)
+
+    def test_update_drops_the_frozen_answers(self):
+        monday = self.index.airing(AiringDays.Monday)
+        spring = self.index.airing(AiringDays.Monday, SeasonPeriod.SPRING, 2022)
+
+        self.assertTrue(self.index.update(anime(1, 'friday')))
+        self.assertFalse(self.index.update(anime(1, 'friday')))
+
+        # The answers that were handed out stay as they were.
+        self.assertEqual(monday, {1, 3, 6})
+        self.assertEqual(self.index.airing(AiringDays.Monday), {3, 6})
+        self.assertEqual(self.index.airing(AiringDays.Monday, SeasonPeriod.SPRING, 2022), set())
+        self.assertIsNot(self.index.airing(AiringDays.Monday, SeasonPeriod.SPRING, 2022), spring)
+        self.assertEqual(self.index.airing(AiringDays.Friday), {1})
+
+        self.assertTrue(self.index.update(anime(1, 'friday', status=AnimeStatus.FINISHED)))
+        self.assertEqual(self.index.airing(AiringDays.Friday), set())
+
+    def test_remove_drops_the_frozen_answers(self):
+        self.assertEqual(self.index.airing(AiringDays.Tuesday), {2})
+
+        self.assertTrue(self.index.remove(2))
+        self.assertFalse(self.index.remove(2))
+
+        self.assertEqual(self.index.airing(AiringDays.Tuesday), set())
+        self.assertEqual(self.index.seasons(AiringDays.Tuesday), {})
+
+    def test_status_change_event(self):
+        self.index.airing(AiringDays.Monday)
+        self.index.on_change(StatusChanged(1, None, AnimeStatus.RELEASING, AnimeStatus.FINISHED))
+
+        self.assertEqual(self.index.airing(AiringDays.Monday), {3, 6})
+
+    def test_seasons_and_week(self):
+        self.assertEqual(self.index.seasons('monday'), {(SeasonPeriod.SPRING, 2022): {1},
+                                                        (SeasonPeriod.FALL, 2022): {3},
+                                                        (SeasonPeriod.SPRING, 2021): {6}})
+        self.assertEqual(self.index.week(SeasonPeriod.SPRING, 2022)[AiringDays.Monday], {1})
+        self.assertEqual(sum(map(len, self.index.week().values())), 4)
+
+    def test_today(self):
+        tz = datetime.timezone.utc
+        day = AiringDays((datetime.datetime.now(tz).weekday() + 1) % 7)
+
+        self.assertEqual(self.index.today(tz), self.index.airing(day))
+
+    def test_airing_day(self):
+        self.assertEqual(airing_day(' Sunday '), AiringDays.Sunday)
+        self.assertEqual(airing_day('6'), AiringDays.Saturday)
+        self.assertIsNone(airing_day(''))
+        self.assertIsNone(airing_day(7))
+
+    def test_from_jsonl(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'anime.jsonl')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(anime(1)) + '\n\n' + json.dumps(anime(2, status=AnimeStatus.FINISHED)) + '\n')
+
+        self.assertEqual(ScheduleIndex.from_jsonl(path).airing('monday'), {1})
+        self.assertEqual(ScheduleIndex.from_jsonl(path, statuses=(0, 1)).airing('monday'), {1, 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+""" Writing and reading the binary anime snapshots.
+
+    python -m pytest test/test_snapshot.py
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import support  # noqa: F401
+
+from fixtures import make_anime
+from objects import AnimeObj
+from snapshot import AnimeSnapshot, write_snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'catalog.snap')
+
+        # Every third id, so there are gaps to miss.
+        self.docs = [make_anime(i) for i in range(3, 150, 3)]
+        random.Random(0).shuffle(self.docs)
+
+    def open(self, docs: list) -> AnimeSnapshot:
+        self.assertEqual(write_snapshot(self.path, docs), len(docs))
+
+        snapshot = AnimeSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_round_trip(self):
+        snapshot = self.open(self.docs)
+        ordered = sorted(self.docs, key=lambda doc: doc['id'])
+
+        self.assertEqual(len(snapshot), len(self.docs))
+        self.assertEqual([record.to_obj() for record in snapshot], [AnimeObj(**doc) for doc in ordered])
+        self.assertEqual(snapshot[-1].id, ordered[-1]['id'])
+
+    def test_objects_and_dicts(self):
+        snapshot = self.open([AnimeObj(**self.docs[0]), self.docs[1]])
+
+        self.assertEqual({record.id for record in snapshot}, {self.docs[0]['id'], self.docs[1]['id']})
+
+    def test_missing_values(self):
+        doc = dict(self.docs[0], anilist_id=None, titles=None, cover_image=None, has_cover_image=None, score=None)
+        nan = dict(self.docs[1], score=float('nan'))
+
+        snapshot = self.open([doc, nan])
+        record = snapshot.find(doc['id'])
+
+        self.assertEqual(record.to_obj(), AnimeObj(**doc))
+        self.assertIsNone(record.anilist_id)
+        self.assertIsNone(record.has_cover_image)
+        self.assertEqual(record.titles, None)
+        self.assertEqual(record.genres, doc['genres'])
+
+        # NaN is how a missing float is stored, it reads back as None.
+        self.assertIsNone(snapshot.find(nan['id']).score)
+
+    def test_find(self):
+        snapshot = self.open(self.docs)
+
+        for doc in self.docs:
+            self.assertEqual(snapshot.find(doc['id']).titles, doc['titles'])
+
+        for anime_id in (0, 1, 4, 148, 10 ** 6, -1):
+            self.assertIsNone(snapshot.find(anime_id))
+
+        self.assertIsNone(self.open([]).find(1))
+
+    def test_bad_access(self):
+        snapshot = self.open(self.docs)
+
+        with self.assertRaises(IndexError):
+            snapshot[len(self.docs)]
+
+        with self.assertRaises(AttributeError):
+            snapshot[0].bogus
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 64)
+
+        with self.assertRaises(ValueError):
+            AnimeSnapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
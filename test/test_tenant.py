@@ -0,0 +1,91 @@
+""" The multi-tenant client against a `server.StandInServer`.
+
+    python -m pytest test/test_tenant.py
+"""
+
+import socket
+import unittest
+
+from support import ServerTestCase
+
+from deadline import Deadline
+from tenant import TenantClient
+from utils import DeadlineExceeded
+from wrapper import AniApi
+
+
+class TenantTest(ServerTestCase):
+    SERVER = dict(ServerTestCase.SERVER, rate_limit=1000)
+
+    def tenants(self, **kwargs) -> TenantClient:
+        client = TenantClient(lambda: AniApi(host=self.server.host, port=self.server.port, scheme='http'), **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_every_token_is_limited_on_its_own(self):
+        client = self.tenants(size=2, rate=10 ** 6, per=1)
+
+        for _ in range(3):
+            client.call('alice', 'get_anime', 1)
+
+        bob = client.tenant('bob').get_anime(1)
+        alice = client.call('alice', 'get_anime', 1)
+
+        # The server counts per token, the pooled clients don't mix them up.
+        self.assertEqual((int(alice.ratelimit.remaining), int(bob.ratelimit.remaining)), (996, 999))
+        self.assertEqual(client.headers('alice')['Authorization'], 'Bearer alice')
+        self.assertLessEqual(client.pool._created, 2)
+
+    def test_own_rate_limit_stops_at_the_deadline(self):
+        client = self.tenants(rate=1, per=60)
+        client.call('carol', 'get_anime', 1)
+
+        def limited():
+            with self.assertRaises(DeadlineExceeded):
+                with Deadline(0.05):
+                    client.call('carol', 'get_anime', 1)
+
+        self.assertEqual(self.sent(limited), 0)
+
+        # Another token isn't held up.
+        self.assertEqual(client.call('dave', 'get_anime', 1).status_code, 200)
+
+    def test_least_recently_used_token_is_dropped(self):
+        client = self.tenants(max_tenants=2, rate=10 ** 6, per=1)
+
+        for token in ('a', 'b', 'a', 'c'):
+            client.call(token, 'get_anime', 1)
+
+        self.assertEqual(len(client), 2)
+        self.assertFalse(client.forget('b'))
+        self.assertTrue(client.forget('a'))
+        self.assertEqual(len(client), 1)
+
+    def test_private_methods(self):
+        client = self.tenants()
+
+        with self.assertRaises(AttributeError):
+            client.call('a', '_get_by_id', 'anime', 1, None, {})
+
+        with self.assertRaises(AttributeError):
+            client.tenant('a')._decode
+
+        with self.assertRaises(AttributeError):
+            client.call('a', 'no_such_method')
+
+    def test_connection_error_gives_the_client_back(self):
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            port = closed.getsockname()[1]
+
+        client = TenantClient(lambda: AniApi(host='127.0.0.1', port=port, scheme='http'), size=1)
+        self.addCleanup(client.close)
+
+        # With a lost client the second call would wait forever for the only one.
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                client.call('a', 'get_anime', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+""" The tracing spans, on their own and for a client against a `server.StandInServer`.
+
+    python -m pytest test/test_tracing.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from support import ServerTestCase
+
+from ratelimit import RateLimiter
+from sampler import RandomSampler
+from tracing import JsonFileExporter, Tracer, current_span
+
+
+class TracerTest(unittest.TestCase):
+    def test_nested_spans(self):
+        tracer = Tracer()
+
+        with tracer.span('outer', kind='test') as outer:
+            with tracer.span('inner') as inner:
+                self.assertIs(current_span(), inner)
+
+            self.assertIs(current_span(), outer)
+
+        self.assertIsNone(current_span())
+
+        self.assertEqual([span.name for span in tracer.exporter.spans], ['inner', 'outer'])
+        self.assertEqual((inner.trace_id, inner.parent_id), (outer.trace_id, outer.span_id))
+        self.assertIsNone(outer.parent_id)
+        self.assertEqual(outer.attributes, {'kind': 'test'})
+        self.assertGreaterEqual(outer.duration, inner.duration)
+        self.assertEqual([line.split()[0] for line in tracer.exporter.tree(outer.trace_id)], ['outer', 'inner'])
+
+    def test_error(self):
+        tracer = Tracer()
+
+        with self.assertRaises(KeyError):
+            with tracer.span('broken'):
+                raise KeyError('id')
+
+        self.assertEqual(tracer.exporter.spans[0].error, "KeyError: 'id'")
+
+    def test_json_file_exporter(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'spans.jsonl')
+
+        tracer = Tracer(JsonFileExporter(path))
+
+        with tracer.span('outer'):
+            with tracer.span('inner', page=1):
+                pass
+
+        with open(path, encoding='utf-8') as f:
+            spans = [json.loads(line) for line in f]
+
+        self.assertEqual([(span['name'], span['attributes']) for span in spans], [('inner', {'page': 1}),
+                                                                                  ('outer', {})])
+
+
+class ClientTest(ServerTestCase):
+    def test_request_is_a_child_of_the_call(self):
+        tracer = Tracer()
+        api = self.client(tracer=tracer)
+        api.get_anime(1)
+
+        request, call = tracer.exporter.spans
+
+        self.assertEqual((call.name, request.name), ('AniApi.get_anime', 'GET'))
+        self.assertEqual(request.parent_id, call.span_id)
+        self.assertEqual(request.attributes['url.template'], 'anime/{}')
+        self.assertEqual(request.attributes['http.status'], 200)
+
+    def test_untraced_client_makes_no_spans(self):
+        tracer = Tracer()
+
+        with tracer.span('outer'):
+            self.client().get_anime(1)
+
+        self.assertEqual([span.name for span in tracer.exporter.spans], ['outer'])
+
+    def test_sampler_requests_are_children_of_the_callers_span(self):
+        tracer = Tracer()
+        sampler = RandomSampler(lambda: self.client(tracer=tracer), workers=3, limiter=RateLimiter(10 ** 6, 1))
+
+        with tracer.span('sample') as parent:
+            self.assertEqual(len(list(sampler.sample(5))), 5)
+
+        calls = [span for span in tracer.exporter.spans if span.name == 'AniApi.get_random_anime']
+        self.assertTrue(calls)
+        self.assertEqual({(span.trace_id, span.parent_id) for span in calls}, {(parent.trace_id, parent.span_id)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#  MIT License
+#
+#  Copyright (c) 2022 by exersalza
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: ContextVar[Optional['Span']] = ContextVar('span', default=None)
+
+
+@dataclass
+class Span:
+    """ One timed operation, e.x. a public `AniApi` call or one http request """
+
+    # The name of the operation, e.x. `AniApi.get_anime` or `GET`.
+    name: str
+
+    # All spans of one call tree share the trace id.
+    trace_id: str
+
+    # The id of this span.
+    span_id: str
+
+    # The id of the surrounding span, None for the root span.
+    parent_id: Optional[str] = None
+
+    # The start and end time as unix timestamps.
+    start: float = 0.0
+    end: float = 0.0
+
+    # Extra information, e.x. `url.template`, `page` or `http.status`.
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    # The error message when the operation raised.
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def __repr__(self):
+        return f'<name={self.name!r} span_id={self.span_id} parent_id={self.parent_id} ' \
+               f'duration={self.duration:.4f} attributes={self.attributes}>'
+
+
+class InMemoryExporter:
+    def __init__(self):
+        """ Keeps the finished spans in a list, useful for tests and ad-hoc profiling """
+
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def tree(self, trace_id: str) -> List[str]:
+        """ Returns the spans of a trace as indented lines, children below their parent """
+
+        spans = [s for s in self.spans if s.trace_id == trace_id]
+        children: Dict[Optional[str], List[Span]] = {}
+
+        for span in sorted(spans, key=lambda s: s.start):
+            children.setdefault(span.parent_id, []).append(span)
+
+        lines = []
+
+        def walk(parent: Optional[str], depth: int):
+            for span in children.get(parent, []):
+                lines.append(f'{"  " * depth}{span.name} {span.duration * 1000:.1f}ms {span.attributes}')
+                walk(span.span_id, depth + 1)
+
+        walk(None, 0)
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class JsonFileExporter:
+    def __init__(self, path: str):
+        """ Appends every finished span as one JSON line to the file """
+
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), default=str) + '\n'
+
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        """ Creates spans and hands the finished ones to the exporter.
+
+        Parameters
+        ----------
+        exporter : Optional
+            Any object with an `export(span)` method, defaults to an :class:`InMemoryExporter`.
+        """
+
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """ Opens a span as a child of the current span """
+
+        parent = _current.get()
+        span = Span(name=name,
+                    trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+                    span_id=os.urandom(8).hex(),
+                    parent_id=parent.span_id if parent else None,
+                    start=time.time(),
+                    attributes=attributes)
+        token = _current.set(span)
+
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            span.end = time.time()
+            _current.reset(token)
+            self.exporter.export(span)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def traced(method):
+    """ Opens a span named after the method when the client has a tracer """
+
+    name = f'AniApi.{method.__name__}'
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = self.tracer
+
+        if tracer is None:
+            return method(self, *args, **kwargs)
+
+        with tracer.span(name):
+            return method(self, *args, **kwargs)
+
+    return wrapper
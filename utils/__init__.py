@@ -1,4 +1,41 @@
-from .enums import *
+import importlib
+
 from .errors import *
-from .flags import *
+# `genres` stays eager, the list shadows its own submodule and a lazy import would hand out the module.
 from .genres import *
+
+# The names of the lazily imported submodules, they are loaded on the first access.
+_LAZY = {'AiringDays': 'enums',
+         'AnimeFormat': 'enums',
+         'AnimeStatus': 'enums',
+         'SeasonPeriod': 'enums',
+         'SongTypes': 'enums',
+         'UserStoryStatus': 'enums',
+         'ANIME_REQ': 'flags',
+         'EPISODE_REQ': 'flags',
+         'PAGINATION': 'flags',
+         'SONG_REQ': 'flags',
+         'UPDATE_USER_REQ': 'flags',
+         'USER_REQ': 'flags',
+         'USER_STORY_REQ': 'flags'}
+
+
+def __getattr__(name):
+    submodule = _LAZY.get(name)
+
+    if submodule is None:
+        if name in ('enums', 'flags'):
+            return importlib.import_module(f'.{name}', __name__)
+
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{submodule}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+__all__ = [name for name in globals() if not name.startswith('_') and name != 'importlib'] + list(_LAZY)
@@ -31,3 +31,22 @@ class InvalidParamsValueException(BaseException):
     """
     This exception is raised when an invalid parameter value is given.
     """
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    This exception is raised when the circuit breaker is open and the request wasn't sent.
+    It's a :class:`ConnectionError`, so it can be handled like any other connection problem.
+    """
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    This exception is raised when the time budget of a :class:`deadline.Deadline` is spent.
+    """
+
+
+class CassetteMissError(LookupError):
+    """
+    This exception is raised when a replaying :class:`cassette.Cassette` has no recorded response for a request.
+    """
@@ -21,22 +21,37 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from urllib.parse import urlencode
+import time
+from typing import TYPE_CHECKING
 
 from connection import ApiConnection
 from constants import API_VERSION, default_header
 from dataproc import create_data_dict
-from objects import AnimeObj, DataObj, EpisodeObj, SongObj, UserSObj, UserBObj
+import endpoints
+from endpoints import Endpoint
+from interning import StringInterner
+from objects import DataObj, RateLimit, UserBObj
 from objects import Context as Ctx
-from utils import (InvalidParamsException,
-                   ANIME_REQ,
-                   EPISODE_REQ,
-                   SONG_REQ,
-                   InvalidParamsValueException, UPDATE_USER_REQ, USER_REQ, USER_STORY_REQ)
+from projection import projected_fields
+from retry import CircuitBreaker, RetryPolicy
+from tracing import Tracer, traced
+from utils import InvalidParamsException
+
+if TYPE_CHECKING:
+    # The optional features are only imported by the ones that use them, this keeps `import wrapper` cheap.
+    from authcache import AuthCache
+    from cassette import Cassette
+    from hedge import Hedger
+    from notfound import NegativeCache
+    from resources import Resources
 
 
 class AniApi(ApiConnection):
-    def __init__(self, token: str = ''):
+    def __init__(self, token: str = '', timeout: float = None, connect_timeout: float = None,
+                 interner: StringInterner = None, retry: RetryPolicy = None, breaker: CircuitBreaker = None,
+                 hedger: 'Hedger' = None, tracer: Tracer = None, host: str = 'api.aniapi.com', port: int = None,
+                 scheme: str = 'https', cassette: 'Cassette' = None, resources: 'Resources' = None,
+                 auth_cache: 'AuthCache' = None, negative_cache: 'NegativeCache' = None):
         """ This is the Base Class for the AniApi wrapper.
         This class will only contain the resources given at the docs,
         oauth will be extended by the other classes.
@@ -51,51 +66,181 @@ class AniApi(ApiConnection):
             The API Token you get from https://aniapi.com/profile.
             If your application is inside the read-only scope then you don't need to provide a token.
 
-        timeout : [:class:`int`]
-            The timeout for the connection.
+        timeout : Optional[:class:`float`]
+            The read timeout for the connection in seconds, None blocks forever.
+
+        connect_timeout : Optional[:class:`float`]
+            The timeout for connecting, defaults to `timeout`.
+
+        interner : Optional[:class:`StringInterner`]
+            When given, repeating strings like locales or genres share one instance
+            between all the built objects. Check `interner.stats()` for the saved memory.
+
+        retry : Optional[:class:`RetryPolicy`]
+            Retries idempotent requests on connection errors and 5xx responses.
+
+        breaker : Optional[:class:`CircuitBreaker`]
+            Fails fast while the upstream is unhealthy, can be shared between clients.
+
+        hedger : Optional[:class:`Hedger`]
+            Opt-in, hedges slow `GET` requests with a second copy on another pooled connection.
+
+        tracer : Optional[:class:`Tracer`]
+            Opens a span per public call and a child span per http request.
+
+        host, port, scheme : Optional
+            Where the Api lives, e.x. `host='127.0.0.1', port=8080, scheme='http'` for a
+            local `server.StandInServer`.
+
+        cassette : Optional[:class:`Cassette`]
+            Records the traffic to a file, or replays a recording without any network.
+
+        resources : Optional[:class:`Resources`]
+            Answers `get_resources` from memory and checks the `genres` and `locale` filters.
+
+        auth_cache : Optional[:class:`AuthCache`]
+            Answers `auth_me` from memory for tokens that were validated before.
+
+        negative_cache : Optional[:class:`NegativeCache`]
+            Answers `get_anime`, `get_episode` and `get_song` with an id locally, when the id
+            answered 404 a moment ago or can't exist.
         """
 
-        super().__init__()
+        super().__init__(timeout=timeout, connect_timeout=connect_timeout,
+                         retry=retry, breaker=breaker, hedger=hedger, host=host, port=port, scheme=scheme,
+                         cassette=cassette)
 
         # Define default headers with token
         self.headers = default_header(token)
+        self.interner = interner
+        self.tracer = tracer
+        self.resources = resources
+        self.auth_cache = auth_cache
+        self.negative_cache = negative_cache
+
+    def _build(self, obj, doc: dict, names: tuple = None):
+        """ Converts a raw document into the given object, interning the repeating values first.
+        With `names` only these fields are kept, the others are dropped before anything is built.
+        """
+
+        if names is not None:
+            doc = {name: doc[name] for name in names if name in doc}
+
+        if self.interner is not None:
+            self.interner.intern_document(doc)
 
-    def get_requests(self, _id, url, params, obj) -> dict:
-        """ For development method. this method will be used later to make it easier
-        to implement new endpoints.
+        return obj(**doc)
+
+    def get_requests(self, endpoint: Endpoint, *segments, headers: dict = None, projection: type = None,
+                     **params) -> dict:
+        """ Sends a `GET` request to a declared endpoint and converts the response.
+        New endpoints only need an entry inside `endpoints.ENDPOINTS`.
 
         Parameters
         ----------
-        _id : [:class:`int`]
-            The id for the url for a specific endpoint e.s. `/anime/{id}`.
-        url : [:class:`str`]
-            The url identifier for the endpoint e.s. `anime`.
+        endpoint : [:class:`Endpoint`]
+            The endpoint from `endpoints.ENDPOINTS`.
+        segments
+            The values for the url path e.s. the id for `/anime/{id}`.
+        headers : Optional[:class:`dict`]
+            Other headers than the default headers, e.s. for `auth_me`.
+        projection : Optional[:class:`type`]
+            A dataclass with a part of the fields of the endpoint's model, see `projection.project`.
         params : [:class:`dict`]
             The extra filter arguments to deliver
-        obj : [:class:`object`]
-            The object for the conversion
 
         Returns
         -------
         :class:`dict`
             The converted response
+
+        Raises
+        ------
+        InvalidParamsException
+            When a parameter is not supported by the endpoint.
+
+        InvalidParamsValueException
+            When a parameter has a wrong value.
+
+        ValueError
+            When the projection has fields that the endpoint's model doesn't have.
         """
 
-        res, headers = self.get(f'/{API_VERSION}/{url}/{_id}?{urlencode(params)}', headers=self.headers)
-        data = create_data_dict(res, headers)
+        obj = endpoint.model
+        names = None
+
+        if projection is not None:
+            names = projected_fields(obj, projection)
+            obj = projection
 
-        if _id:
-            data['data'] = obj(**data.get('data'))
-            return data
+        if params and self.resources is not None:
+            self.resources.validate(params)
 
-        if data.get('data', False):
-            data['data']['documents'] = [obj(**i) for i in data['data']['documents']]
-            data['data'] = DataObj(**data['data'])
+        url = endpoint.url(*segments, params=endpoint.validate(params))
+
+        if self.tracer is not None:
+            self._span_attributes = {'url.template': endpoint.path, 'page': params.get('page')}
+
+        # An error is timed under the template as well, e.x. an open circuit.
+        self._endpoint = endpoint.path
+        res, header = self.get(url, headers=headers or self.headers)
+
+        start = time.perf_counter()
+        data = create_data_dict(res, header)
+        decoded = time.perf_counter()
+
+        payload = data.get('data')
+
+        if obj is not None and payload and data.get('status_code', 200) == 200:
+            if isinstance(payload, list):
+                data['data'] = [self._build(obj, i, names) for i in payload]
+            elif isinstance(payload, dict) and 'documents' in payload:
+                payload['documents'] = [self._build(obj, i, names) for i in payload['documents']]
+                data['data'] = DataObj(**payload)
+            elif isinstance(payload, dict):
+                data['data'] = self._build(obj, payload, names)
+
+        if self._timing is not None:
+            self._finish_timing(endpoint.path, decode=decoded - start, build=time.perf_counter() - decoded)
+
+        return data
+
+    def _get_by_id(self, name: str, _id, projection: type, params: dict) -> dict:
+        """ The same as `get_requests`, but an id that is known to be missing is answered locally """
+
+        cache = self.negative_cache
+
+        if cache is None or _id == '':
+            return self.get_requests(endpoints.ENDPOINTS[name], _id, projection=projection, **params)
+
+        try:
+            _id = int(_id)
+        except (TypeError, ValueError):
+            return self.get_requests(endpoints.ENDPOINTS[name], _id, projection=projection, **params)
+
+        if cache.is_missing(name, _id):
+            return {'ratelimit': RateLimit(limit=None, remaining=None, reset=None), 'data': '', 'status_code': 404,
+                    'message': f'{name.capitalize()} not found'}
+
+        data = self.get_requests(endpoints.ENDPOINTS[name], _id, projection=projection, **params)
+        cache.record(name, _id, data.get('status_code'))
+
+        return data
+
+    def _decode(self, res: bytes, header) -> dict:
+        """ The same as `create_data_dict`, but it also finishes the timing of the request """
+
+        start = time.perf_counter()
+        data = create_data_dict(res, header)
+
+        if self._timing is not None:
+            self._finish_timing(decode=time.perf_counter() - start)
 
         return data
 
     # Here comes all the Anime related methods.
-    def get_anime(self, anime_id: int = '', **kwargs) -> Ctx:
+    @traced
+    def get_anime(self, anime_id: int = '', projection: type = None, **kwargs) -> Ctx:
         """ Get an Anime object list from the API.
         You can provide an ID or query parameters to get a single AnimeObject (:class:`Anime`) or an :class:`list`
         of objects.
@@ -109,6 +254,9 @@ class AniApi(ApiConnection):
             When you provide an ID, you can't use the
             `**kwargs` parameter.
 
+        projection : Optional[:class:`type`]
+            Builds only these fields, e.x. `projection.AnimeCard` or `project(AnimeObj, 'id', 'score')`.
+
         **kwargs : Optional[:class:`dict`]
             The parameters that you want to use to spice up your request.
             Supported Parameters can be found inside the `utils.flags` file.
@@ -120,9 +268,12 @@ class AniApi(ApiConnection):
 
         Raises
         -------
-        InvalidFlagsException
+        InvalidParamsException
             When you try to use any flags that are not supported.
 
+        InvalidParamsValueException
+            When a flag has a value that is not supported, e.x. a `status` outside of `AnimeStatus`.
+
         Examples
         ---------
         >>> from wrapper import AniApi
@@ -131,16 +282,12 @@ class AniApi(ApiConnection):
         <status_code=200 message='Anime found' data=<id=1 title='Cowboy Bebop' episodes=26 status=0> version='1'>
         """
 
-        invalid = set(kwargs) - set(ANIME_REQ)
-
-        if invalid:
-            raise InvalidParamsException(f'Invalid parameters: {invalid}')
-
-        data = self.get_requests(anime_id, 'anime', kwargs, AnimeObj)
+        data = self._get_by_id('anime', anime_id, projection, kwargs)
 
         return Ctx(**data)
 
-    def get_random_anime(self, count: int = 1, nsfw: bool = False) -> Ctx:
+    @traced
+    def get_random_anime(self, count: int = 1, nsfw: bool = False, projection: type = None) -> Ctx:
         """ Get one or more random Animes from the API.
 
         Parameters
@@ -151,6 +298,9 @@ class AniApi(ApiConnection):
         nsfw : :class:`bool`
             If you want to get NSFW Animes. Default is False.
 
+        projection : Optional[:class:`type`]
+            Builds only the fields of the projection, see `projection.project`.
+
         Returns
         -------
         :class:`Ctx`
@@ -160,19 +310,18 @@ class AniApi(ApiConnection):
         -------
         ValueError
             The count can't be less than 1 or more than 50. The api return 50 at max.
+            For bigger samples use :class:`sampler.RandomSampler`.
         """
 
         if count > 50 or count < 1:
             raise ValueError('Count must be less than 50 and more or equal to 1')
 
-        res, header = self.get(f'/{API_VERSION}/random/anime/{count}/{nsfw}', headers=self.headers)
-        data = create_data_dict(res, header)
-
-        data['data'] = [AnimeObj(**anime) for anime in data['data']]
+        data = self.get_requests(endpoints.ENDPOINTS['random_anime'], count, nsfw, projection=projection)
         return Ctx(**data)
 
     # Here comes all the Episode related methods.
-    def get_episode(self, episode_id: int = '', **kwargs) -> Ctx:
+    @traced
+    def get_episode(self, episode_id: int = '', projection: type = None, **kwargs) -> Ctx:
         """ Get an Episode from the API.
 
         Parameters
@@ -181,6 +330,9 @@ class AniApi(ApiConnection):
             Give an ID to get a Specific Episode, note that all other
             parameters get dumped when you provide an ID.
 
+        projection : Optional[:class:`type`]
+            Builds only the fields of the projection, see `projection.project`.
+
         **kwargs :
             Apply filter like `anime_id` or enter a `pagination` valid filter
             can be found inside the `utils.flags` file.
@@ -191,7 +343,11 @@ class AniApi(ApiConnection):
             A context object with the query returns and the rate limit information.
         Raises
         -------
-        InvalidFlagsException
+        InvalidParamsException
+            When you try to use any flags that are not supported.
+
+        InvalidParamsValueException
+            When a flag has a value that is not supported.
 
         Examples
         ---------
@@ -201,16 +357,12 @@ class AniApi(ApiConnection):
         <status_code=200 message='Episode found' data=<id=1 anime_id=1 number=1 locale=en> version='1'>
         """
 
-        invalid = set(kwargs) - set(EPISODE_REQ)
-
-        if invalid:
-            raise InvalidParamsValueException(f'Invalid parameters: {invalid}')
-
-        data = self.get_requests(episode_id, 'episode', kwargs, EpisodeObj)
+        data = self._get_by_id('episode', episode_id, projection, kwargs)
         return Ctx(**data)
 
     # Here are the song related methods.
-    def get_song(self, song_id: int = '', **kwargs) -> Ctx:
+    @traced
+    def get_song(self, song_id: int = '', projection: type = None, **kwargs) -> Ctx:
         """ Get from 1 up to 100 songs at the time from the Api
 
         Parameters
@@ -219,6 +371,9 @@ class AniApi(ApiConnection):
             Give an ID to get a Specific Song, note that all other parameters
             get dumped when you provide an ID.
 
+        projection : Optional[:class:`type`]
+            Builds only the fields of the projection, see `projection.project`.
+
         kwargs : Optional[:class:`dict`]
             Apply filter like `anime_id` or enter a `pagination` valid filter can
             be found inside the `utils.flags` file
@@ -230,15 +385,11 @@ class AniApi(ApiConnection):
             A context object with the query returns and the rate limit information.
         """
 
-        invalid = set(kwargs) - set(SONG_REQ)
-
-        if invalid:
-            raise InvalidParamsException(f'Invalid parameters: {invalid}')
-
-        data = self.get_requests(song_id, 'song', kwargs, SongObj)
+        data = self._get_by_id('song', song_id, projection, kwargs)
         return Ctx(**data)
 
-    def get_random_song(self, count: int = 1) -> Ctx:
+    @traced
+    def get_random_song(self, count: int = 1, projection: type = None) -> Ctx:
         """
         It's the same as get_random_anime but for another endpoint and without nsfw tag.
 
@@ -247,6 +398,10 @@ class AniApi(ApiConnection):
         count : :class:`int`
             The amount of songs you want to get. Value should be between 1 and 50.
             When you go over the value you get 50 at max. so I set a cap at 50.
+            For bigger samples use :class:`sampler.RandomSampler`.
+
+        projection : Optional[:class:`type`]
+            Builds only the fields of the projection, see `projection.project`.
 
         Returns
         -------
@@ -257,13 +412,11 @@ class AniApi(ApiConnection):
         if count > 50 or count < 1:
             raise ValueError('Count must be less than 50 and more or equal to 1')
 
-        res, header = self.get(f'/{API_VERSION}/random/song/{count}', headers=self.headers)
-        data = create_data_dict(res, header)
-
-        data['data'] = [SongObj(**song) for song in data['data']]
+        data = self.get_requests(endpoints.ENDPOINTS['random_song'], count, projection=projection)
         return Ctx(**data)
 
     # Resource requests
+    @traced
     def get_resources(self, version: float, _type: int) -> Ctx:
         """ Get the resources of the AniApi
 
@@ -277,17 +430,28 @@ class AniApi(ApiConnection):
             0 = Anime Genres,
             1 = Locales
 
+            With `resources` on the client, both are answered from memory once they were downloaded.
+
         Returns
         -------
         :class:`Ctx`
             A context object with the query returns and the rate limit information.
         """
 
-        res, header = self.get(f'/{API_VERSION}/resources/{version}/{_type}', headers=self.headers)
-        data = create_data_dict(res, header)
+        if self.resources is not None and _type in (0, 1):
+            name = ('genres', 'locales')[_type]
+            resources = self.resources.get(version)
+
+            # The fallback was never fetched, the Api is asked and its answer is returned as it is.
+            if resources.source != 'fallback':
+                return Ctx(ratelimit=RateLimit(limit=None, remaining=None, reset=None),
+                           data={name: list(getattr(resources, name))}, status_code=200, message='Resources found')
+
+        data = self.get_requests(endpoints.ENDPOINTS['resources'], version, _type)
         return Ctx(**data)
 
     # User Story's
+    @traced
     def get_user_story(self, story_id: int = '', **kwargs) -> Ctx:
         """ Get a list or specific UserStory from the API
 
@@ -306,15 +470,10 @@ class AniApi(ApiConnection):
 
         """
 
-        invalid = set(kwargs) - set(USER_STORY_REQ)
-
-        if invalid:
-            raise InvalidParamsException(f'Invalid arguments: {invalid}')
-
-        res, header = self.get(f'/{API_VERSION}/user_story/{story_id}?{urlencode(kwargs)}', self.headers)
-        data = create_data_dict(res, header)
+        data = self.get_requests(endpoints.ENDPOINTS['user_story'], story_id, **kwargs)
         return Ctx(**data)
 
+    @traced
     def create_user_story(self, user_id: int, anime_id: int, status: int, **kwargs) -> Ctx:
         """ This will create a UserStory based on the given parameters.
 
@@ -353,10 +512,11 @@ class AniApi(ApiConnection):
         udata.update(kwargs)
 
         res, header = self.post(url=f'/{API_VERSION}/user_story/', headers=self.headers, data=udata)
-        data = create_data_dict(res, header)
+        data = self._decode(res, header)
 
         return Ctx(**data)
 
+    @traced
     def update_user_story(self, story_id: int, user_id: int, anime_id: int, status: int, ce: int, cet: int) -> Ctx:
         """
         Update a UserStory
@@ -398,10 +558,11 @@ class AniApi(ApiConnection):
                  'status': status, 'current_episode': ce, 'current_episode_ticks': cet}
 
         res, header = self.post(url=f'/{API_VERSION}/user_story', headers=self.headers, data=udata)
-        data = create_data_dict(res, header)
+        data = self._decode(res, header)
 
         return Ctx(**data)
 
+    @traced
     def delete_user_story(self, _id: int) -> Ctx:
         """
         Deletes a UserStory on the provided unique identifier.
@@ -423,12 +584,13 @@ class AniApi(ApiConnection):
         """
 
         res, header = self.delete(url=f'/{API_VERSION}/user_story/{_id}', headers=self.headers)
-        data = create_data_dict(res, header)
+        data = self._decode(res, header)
 
         return Ctx(**data)
 
     # User related stuff
-    def get_user(self, user_id: int = '', **kwargs) -> Ctx:
+    @traced
+    def get_user(self, user_id: int = '', projection: type = None, **kwargs) -> Ctx:
         """
         Get user list of users or when you provide a user_id to get a specific user
 
@@ -437,6 +599,9 @@ class AniApi(ApiConnection):
         user_id : [:class:`int`]
             A UserID for specified search of user.
 
+        projection : Optional[:class:`type`]
+            Builds only the fields of the projection, see `projection.project`.
+
         kwargs
             Bring up pagination or currently two arguments for filtering:
 
@@ -449,14 +614,10 @@ class AniApi(ApiConnection):
             Context object with the query results
         """
 
-        invalid = set(kwargs) - set(USER_REQ)
-
-        if invalid:
-            raise InvalidParamsException(f'Invalid parameters: {invalid}')
-
-        data = self.get_requests(user_id, 'user', kwargs, UserSObj)
+        data = self.get_requests(endpoints.ENDPOINTS['user'], user_id, projection=projection, **kwargs)
         return Ctx(**data)
 
+    @traced
     def update_user(self, user_id: int, gender: int, **kwargs) -> Ctx:
         """ This method will update user information, please read the notes.
 
@@ -484,6 +645,8 @@ class AniApi(ApiConnection):
         https://aniapi.com/docs/resource/user#update-an-user**
         """
 
+        from utils import UPDATE_USER_REQ
+
         invalid = set(kwargs) - set(UPDATE_USER_REQ)
 
         if invalid:
@@ -492,10 +655,11 @@ class AniApi(ApiConnection):
         res, header = self.post(f'/{API_VERSION}/user', headers=self.headers, data={'id': user_id,
                                                                                     'gender': gender,
                                                                                     **kwargs})
-        data = create_data_dict(res, header)
+        data = self._decode(res, header)
 
         return Ctx(**data)
 
+    @traced
     def delete_user(self, _id: int) -> Ctx:
         """
         This method will delete the user with the given id.
@@ -511,10 +675,11 @@ class AniApi(ApiConnection):
         """
 
         res, header = self.delete(f'/{API_VERSION}/user/{_id}', headers=self.headers)
-        data = create_data_dict(res, header)
+        data = self._decode(res, header)
         return Ctx(**data)
 
     # Auth me.
+    @traced
     def auth_me(self, jwt: str) -> Ctx:
         """
         This method will test the given token and return the user
@@ -530,13 +695,24 @@ class AniApi(ApiConnection):
         :class:`Ctx`
             A context object with the response. If the token is invalid you
             will get a status code of 401.
+            With an `auth_cache` a known token is answered from memory, without a rate limit.
         """
 
-        res, header = self.get(f'/{API_VERSION}/auth/me', headers=default_header(jwt))
-        data = create_data_dict(res, header)
+        cache = self.auth_cache
+
+        if cache is not None:
+            user = cache.get(jwt)
+
+            if user is not None:
+                return Ctx(ratelimit=RateLimit(limit=None, remaining=None, reset=None), data=user,
+                           status_code=200, message='Me found')
+
+        data = self.get_requests(endpoints.ENDPOINTS['auth_me'], headers=default_header(jwt))
 
-        if data.get('status_code', 404) != 200:
-            return Ctx(**data)
+        if cache is not None:
+            if data.get('status_code') == 200 and isinstance(data.get('data'), UserBObj):
+                cache.put(jwt, data['data'])
+            elif data.get('status_code') == 401:
+                cache.invalidate(jwt)
 
-        data['data'] = UserBObj(**data.get('data'))
         return Ctx(**data)